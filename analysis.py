@@ -0,0 +1,116 @@
+import os
+import pandas as pd
+import recorder
+
+# Session loading and map building for analyzer.py, kept free of Qt so they can also be used
+# (and benchmarked, see test_applications/benchmarks.py) without a display.
+
+def default_recording():
+    """Newest session under recordings/, falling back to the older single-file recordings."""
+    if os.path.isdir("recordings"):
+        sessions = sorted(d for d in os.listdir("recordings") if os.path.isdir(os.path.join("recordings", d)))
+        if sessions:
+            return os.path.join("recordings", sessions[-1])
+    return "recorded_data.daq" if os.path.exists("recorded_data.daq") else "recorded_data.csv"
+
+def load_session(path, start=None, end=None):
+    """Load a session directory, a .daq recording or a legacy CSV recording into a DataFrame.
+
+    For session directories `start`/`end` are seconds from the start of the
+    session, and only the segments covering that range are read.
+    """
+    if path.endswith(".csv"):
+        return pd.read_csv(path)
+    if os.path.isdir(path) and (start is not None or end is not None):
+        segments = recorder.load_index(path)["segments"]
+        times = [s["first_time"] for s in segments if s["first_time"] is not None]
+        origin = min(times) if times else 0
+        return recorder.load_dataframe(path,
+                                       None if start is None else origin + start,
+                                       None if end is None else origin + end)
+    return recorder.load_dataframe(path)
+
+def reconstruct_time(data):
+    """Absolute time (epoch seconds) for every row, rebuilt from monotonic capture stamps.
+
+    Each snapshot's monotonic "Capture Time" is mapped to wall-clock time
+    with the nearest preceding anchor: the GPS fix (UTC time paired with its
+    capture stamp) when the car has a fix, otherwise the DAQ's periodic
+    "Clock Anchor". Recordings without capture stamps fall back to the
+    client's receive time. Returns None if neither is available.
+    """
+    if "Capture Time" not in data:
+        return data["Receive Time"] if "Receive Time" in data else None
+    capture = pd.to_numeric(data["Capture Time"], errors="coerce")
+    offset = None
+    if "GPS Data.UTC Time" in data and "GPS Data.Capture Time" in data:
+        offset = (pd.to_numeric(data["GPS Data.UTC Time"], errors="coerce") * 1e9
+                  - pd.to_numeric(data["GPS Data.Capture Time"], errors="coerce"))
+    if (offset is None or offset.isna().all()) and "Clock Anchor.Wall Time" in data:
+        offset = (pd.to_numeric(data["Clock Anchor.Wall Time"], errors="coerce")
+                  - pd.to_numeric(data["Clock Anchor.Monotonic"], errors="coerce"))
+    if offset is None or offset.isna().all():
+        return data["Receive Time"] if "Receive Time" in data else None
+    offset = offset.ffill().bfill()
+    return (capture + offset) / 1e9
+
+def find_column(data, keywords):
+    """Find the first column containing any of the keywords (case-insensitive)."""
+    for col in data.columns:
+        for kw in keywords:
+            if kw.lower() in col.lower():
+                return col
+    return None
+
+# Appended to the saved map so the analyzer can reach the Leaflet map object from JavaScript
+MAP_LOOKUP_SCRIPT = """
+            <script>
+                // Dynamically find the map object by querying the DOM
+                const mapContainer = document.querySelector('[id^="map_"]');
+                if (mapContainer) {
+                    const mapId = mapContainer.id;
+                    if (typeof window[mapId] !== 'undefined') {
+                        window.map = window[mapId];
+                    } else {
+                        console.error('Map object not found for ID:', mapId);
+                    }
+                } else {
+                    console.error('Map container not found.');
+                }
+            </script>
+            """
+
+def build_route_map(data, lat_col, lon_col, speed_col=None, rpm_col=None, gear_col=None,
+                    engine_temp_col=None, path="analysisMap.html"):
+    """Draw the recorded route with a marker per sample and save it as HTML; returns the folium map."""
+    import folium
+
+    # Use the first valid GPS coordinate
+    start_coords = (data.iloc[0][lat_col], data.iloc[0][lon_col])
+    race_map = folium.Map(location=start_coords, zoom_start=15)
+
+    # Add route to the map
+    points = []
+    for _, row in data.iterrows():
+        point = (row[lat_col], row[lon_col])
+        points.append(point)
+        folium.CircleMarker(
+            location=point,
+            radius=5,
+            popup=f"Speed: {row.get(speed_col, 'N/A')} km/h\nRPM: {row.get(rpm_col, 'N/A')}\nGear: {row.get(gear_col, 'N/A')}\nEngine Temp: {row.get(engine_temp_col, 'N/A')}",
+            color='blue',
+            fill=True,
+            fill_color='blue'
+        ).add_to(race_map)
+
+    # Draw lines between points
+    folium.PolyLine(points, color='red', weight=2.5, opacity=1).add_to(race_map)
+
+    # Save map to HTML
+    race_map.save(path)
+
+    # Add JavaScript to dynamically identify and initialize the map object
+    with open(path, "a") as f:
+        f.write(MAP_LOOKUP_SCRIPT)
+
+    return race_map
@@ -1,12 +1,12 @@
 import sys
+import argparse
 import pandas as pd
-import numpy as np
 from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget, QLabel, QSlider, QHBoxLayout, QPushButton, QComboBox, QDialog, QTextEdit
 from PyQt5.QtWebEngineWidgets import QWebEngineView
-import folium
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from PyQt5.QtCore import Qt
+from analysis import default_recording, load_session, reconstruct_time, find_column, build_route_map
 
 class DataPointDialog(QDialog):
     def __init__(self, data_dict, parent=None):
@@ -26,13 +26,13 @@ class DataPointDialog(QDialog):
         self.setLayout(layout)
 
 class RaceDataAnalyzer(QMainWindow):
-    def __init__(self):
+    def __init__(self, path=None, start=None, end=None):
         super().__init__()
         self.setWindowTitle("Race Data Analyzer")
         self.setGeometry(100, 100, 800, 600)
 
-        # Load data
-        self.data = pd.read_csv("recorded_data.csv")
+        # Load data, preferring the newest recorded session
+        self.data = load_session(path or default_recording(), start, end)
 
         # Dynamically find relevant columns
         self.timestamp_col = self.find_column(['Timestamp'])
@@ -42,6 +42,7 @@ class RaceDataAnalyzer(QMainWindow):
         self.lat_col = self.find_column(['Latitude'])
         self.lon_col = self.find_column(['Longitude'])
         self.engine_temp_col = self.find_column(['Engine Temperature'])
+        self.time_s = reconstruct_time(self.data)
 
         # Create map
         self.map = self.create_map()
@@ -50,64 +51,20 @@ class RaceDataAnalyzer(QMainWindow):
         self.init_ui()
 
     def find_column(self, keywords):
-        """Find the first column containing any of the keywords (case-insensitive)."""
-        for col in self.data.columns:
-            for kw in keywords:
-                if kw.lower() in col.lower():
-                    return col
-        return None
+        return find_column(self.data, keywords)
 
     def create_map(self):
-        # Use the first valid GPS coordinate
-        start_coords = (self.data.iloc[0][self.lat_col], self.data.iloc[0][self.lon_col])
-        race_map = folium.Map(location=start_coords, zoom_start=15)
-
-        # Add route to the map
-        points = []
-        for _, row in self.data.iterrows():
-            point = (row[self.lat_col], row[self.lon_col])
-            points.append(point)
-            folium.CircleMarker(
-                location=point,
-                radius=5,
-                popup=f"Speed: {row.get(self.speed_col, 'N/A')} km/h\nRPM: {row.get(self.rpm_col, 'N/A')}\nGear: {row.get(self.gear_col, 'N/A')}\nEngine Temp: {row.get(self.engine_temp_col, 'N/A')}",
-                color='blue',
-                fill=True,
-                fill_color='blue'
-            ).add_to(race_map)
-
-        # Draw lines between points
-        folium.PolyLine(points, color='red', weight=2.5, opacity=1).add_to(race_map)
-
-        # Save map to HTML
-        race_map.save("analysisMap.html")
-
-        # Add JavaScript to dynamically identify and initialize the map object
-        with open("analysisMap.html", "a") as f:
-            f.write("""
-            <script>
-                // Dynamically find the map object by querying the DOM
-                const mapContainer = document.querySelector('[id^="map_"]');
-                if (mapContainer) {
-                    const mapId = mapContainer.id;
-                    if (typeof window[mapId] !== 'undefined') {
-                        window.map = window[mapId];
-                    } else {
-                        console.error('Map object not found for ID:', mapId);
-                    }
-                } else {
-                    console.error('Map container not found.');
-                }
-            </script>
-            """)
-
-        return race_map
+        return build_route_map(self.data, self.lat_col, self.lon_col, self.speed_col, self.rpm_col,
+                               self.gear_col, self.engine_temp_col, "analysisMap.html")
 
     def update_info(self, index):
         # Update info label
         row = self.data.iloc[index]
+        timestamp = row.get(self.timestamp_col, 'N/A')
+        if self.time_s is not None and pd.notnull(self.time_s.iloc[index]):
+            timestamp = pd.Timestamp(self.time_s.iloc[index], unit="s").strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
         self.info_label.setText(
-            f"Timestamp: {row.get(self.timestamp_col, 'N/A')}, "
+            f"Timestamp: {timestamp}, "
             f"Speed: {row.get(self.speed_col, 'N/A')} km/h, "
             f"RPM: {row.get(self.rpm_col, 'N/A')}, "
             f"Gear: {row.get(self.gear_col, 'N/A')}, "
@@ -202,8 +159,13 @@ class RaceDataAnalyzer(QMainWindow):
         rpm_ax = self.rpm_canvas.figure.add_subplot(111)
         start = max(0, index - 10)
         end = min(len(self.data), index + 10)
+        # Seconds relative to the current point when capture times are available, else sample offsets
+        if self.time_s is not None and pd.notnull(self.time_s.iloc[index]):
+            x = self.time_s[start:end] - self.time_s.iloc[index]
+        else:
+            x = range(start - index, end - index)
         if self.rpm_col:
-            rpm_ax.plot(range(start - index, end - index), self.data[self.rpm_col][start:end], label='RPM')
+            rpm_ax.plot(x, self.data[self.rpm_col][start:end], label='RPM')
         rpm_ax.axvline(0, color='red', linestyle='--', label='Current Point')
         rpm_ax.set_ylim(0, 18000)  # Limit y-axis for RPM
         rpm_ax.legend()
@@ -212,14 +174,20 @@ class RaceDataAnalyzer(QMainWindow):
         # Update Speed graph
         speed_ax = self.speed_canvas.figure.add_subplot(111)
         if self.speed_col:
-            speed_ax.plot(range(start - index, end - index), self.data[self.speed_col][start:end], label='Speed (km/h)')
+            speed_ax.plot(x, self.data[self.speed_col][start:end], label='Speed (km/h)')
         speed_ax.axvline(0, color='red', linestyle='--', label='Current Point')
         speed_ax.set_ylim(0, 120)  # Limit y-axis for Speed
         speed_ax.legend()
         self.speed_canvas.draw()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Race Data Analyzer")
+    parser.add_argument("recording", nargs="?", help="Session directory, .daq file or CSV (default: newest session)")
+    parser.add_argument("--start", type=float, help="Seconds from session start to load from")
+    parser.add_argument("--end", type=float, help="Seconds from session start to load until")
+    args = parser.parse_args()
+
     app = QApplication(sys.argv)
-    window = RaceDataAnalyzer()
+    window = RaceDataAnalyzer(args.recording, args.start, args.end)
     window.show()
     sys.exit(app.exec_())
\ No newline at end of file
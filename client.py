@@ -2,25 +2,28 @@ import socket
 import sys
 import json
 import threading
-import csv
-import folium  # For map rendering
-import os  # Import os to handle file paths
+import time
+import collections
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
     QPushButton, QMessageBox, QStackedWidget, QGridLayout
 )
-from PyQt5.QtCore import Qt, QTimer, QUrl, QMetaObject, Q_ARG, pyqtSlot
-from PyQt5.QtWebEngineWidgets import QWebEngineView  # For displaying the map
+from PyQt5.QtCore import Qt, QTimer
 from pyqtgraph import PlotWidget
 import pyqtgraph as pg
 import logging
+from decimation import ChannelHistory, MinMaxDecimator
+from recorder import SegmentedRecorder, new_session_dir
+from track_view import PositionBuffer, TrackMapWidget
+from clock_sync import ClockSync, LatencyTracker, make_ping
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
 class MapWindow(QWidget):
-    def __init__(self):
+    def __init__(self, positions):
         super().__init__()
+        self.positions = positions
         self.initUI()
 
     def initUI(self):
@@ -29,41 +32,12 @@ class MapWindow(QWidget):
 
         layout = QVBoxLayout()
 
-        # Web view to display the map
-        self.web_view = QWebEngineView()
-        layout.addWidget(self.web_view)
+        # Native track view drawn from the client's position buffer (no browser engine, works offline)
+        self.track_view = TrackMapWidget(self.positions)
+        layout.addWidget(self.track_view)
 
         self.setLayout(layout)
 
-        # Load the static HTML file
-        map_file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "map.html")
-        self.web_view.setUrl(QUrl.fromLocalFile(map_file_path))
-
-    def update_marker(self, latitude, longitude):
-        # Validate latitude and longitude
-        if not isinstance(latitude, (int, float)) or not isinstance(longitude, (int, float)):
-            logging.error(f"Invalid latitude or longitude: {latitude}, {longitude}")
-            return
-
-        # Log the latitude and longitude
-        # logging.debug(f"Updating marker to latitude: {latitude}, longitude: {longitude}")
-
-        # Ensure this runs in the main thread
-        QMetaObject.invokeMethod(self, "execute_js", Qt.QueuedConnection, 
-                                 Q_ARG(float, latitude), Q_ARG(float, longitude))
-
-    @pyqtSlot(float, float)
-    def execute_js(self, latitude, longitude):
-        js_code = f"updateMarker({latitude}, {longitude});"
-        self.web_view.page().runJavaScript(js_code, self.handle_js_result)
-
-    def handle_js_result(self, result):
-        if result is None:
-            return
-            #logging.debug("JavaScript executed successfully.")
-        else:
-            logging.error(f"JavaScript error: {result}")
-
 
 class TestClientApp(QWidget):
     def __init__(self):
@@ -71,10 +45,16 @@ class TestClientApp(QWidget):
         self.client = None
         self.running = False
         self.recording = False
-        self.csv_file = None
-        self.csv_writer = None
+        self.recorder = None
         self.data = {}
+        self.positions = PositionBuffer()  # GPS trail for the map, kept even while it is closed
         self.map_window = None  # Reference to the Map window
+        # Car-to-pit clock estimate and latency telemetry
+        self.clock_sync = ClockSync()
+        self.capture_latency = LatencyTracker()
+        self.paint_latency = LatencyTracker()
+        self.unpainted = collections.deque()  # receive times (ns) of samples not yet drawn
+        self.diagnostics = None  # Latest metrics reported by the car
         self.initUI()
 
     def initUI(self):
@@ -133,7 +113,13 @@ class TestClientApp(QWidget):
         self.timestamp_label = QLabel("Timestamp: N/A")
         self.timestamp_label.setStyleSheet("font-size: 16px; font-weight: bold; color: blue;")
         timestamp_layout.addWidget(self.timestamp_label)
+        self.latency_label = QLabel("Latency: --")
+        self.latency_label.setStyleSheet("font-size: 14px; color: #555;")
+        timestamp_layout.addWidget(self.latency_label)
         main_layout.addLayout(timestamp_layout)
+        self.diagnostics_label = QLabel("Car diagnostics: --")
+        self.diagnostics_label.setStyleSheet("font-size: 14px; color: #555;")
+        main_layout.addWidget(self.diagnostics_label)
 
         # Data labels in a two-column grid
         self.data_labels = {}
@@ -211,10 +197,14 @@ class TestClientApp(QWidget):
         self.graph_timer.timeout.connect(self.update_graph)
         self.graph_timer.start(1000)
 
-        # Initialize data storage for graphs
-        self.rpm_data = []
-        self.speed_data = []
-        self.max_time_window = 20
+        # Full-session channel histories, decimated to the plot width on every redraw
+        self.rpm_history = ChannelHistory()
+        self.speed_history = ChannelHistory()
+        self.rpm_decimator = MinMaxDecimator(self.rpm_history)
+        self.speed_decimator = MinMaxDecimator(self.speed_history)
+        self.max_time_window = 20  # Seconds of history shown on the graphs
+        self.rpm_graph_widget.setXRange(-self.max_time_window, 0)
+        self.speed_graph_widget.setXRange(-self.max_time_window, 0)
 
     def connect_to_server(self):
         server_host = self.address_input.text()
@@ -227,19 +217,50 @@ class TestClientApp(QWidget):
             self.running = True
             self.stacked_widget.setCurrentWidget(self.connected_screen)
             threading.Thread(target=self.receive_data, daemon=True).start()
+            # Clock-sync pings; the server answers each one with a pong on the data stream
+            self.ping_timer = QTimer()
+            self.ping_timer.timeout.connect(self.send_ping)
+            self.ping_timer.start(2000)
+            self.send_ping()
         except Exception as e:
             print(f"Failed to connect: {e}")
             QMessageBox.critical(self, "Connection Error", f"Failed to connect to server: {e}")
 
+    def send_ping(self):
+        if not self.running:
+            self.ping_timer.stop()
+            return
+        try:
+            self.client.sendall(json.dumps(make_ping()).encode('utf-8') + b'\n')
+        except OSError as e:
+            logging.error(f"Failed to send clock-sync ping: {e}")
+
     def receive_data(self):
         try:
+            # The server sends one JSON message per line
+            stream = self.client.makefile('rb')
             while self.running:
-                data = self.client.recv(1024)
-                if not data:
+                line = stream.readline()
+                if not line:
                     break
-                self.data = json.loads(data.decode())
+                receive_ns = time.monotonic_ns()
+                message = json.loads(line)
+                if "Pong" in message:
+                    self.clock_sync.add_pong(message["Pong"], receive_ns)
+                    continue
+                if "Diagnostics" in message:
+                    # The car's own metrics, a few times a minute; shown, not recorded
+                    self.diagnostics = message["Diagnostics"]
+                    continue
+                self.data = message
+                capture_ns = message.get("Capture Time")
+                if isinstance(capture_ns, int) and self.clock_sync.synced:
+                    self.capture_latency.add(receive_ns - self.clock_sync.to_local(capture_ns))
+                self.unpainted.append(receive_ns)
+                recorder = self.recorder
+                if recorder:
+                    recorder.record(self.data)
                 self.update_data_display()
-                self.record_data_to_csv()
         except Exception as e:
             QMessageBox.critical(self, "Data Error", f"Error receiving data: {e}")
         finally:
@@ -314,68 +335,76 @@ class TestClientApp(QWidget):
             speed_val = float(speed_val)
         except (ValueError, TypeError):
             speed_val = 0
-        self.rpm_data.append(rpm_val)
-        self.speed_data.append(speed_val)
-
-        # Keep only the last 20 seconds of data
-        if len(self.rpm_data) > self.max_time_window:
-            self.rpm_data = self.rpm_data[-self.max_time_window:]
-        if len(self.speed_data) > self.max_time_window:
-            self.speed_data = self.speed_data[-self.max_time_window:]
-
-        # Update the map window if open
-        if self.map_window:
-            latitude = gps_data.get("Latitude", 0)
-            longitude = gps_data.get("Longitude", 0)
-            self.map_window.update_marker(latitude, longitude)
+        receive_time = time.monotonic()
+        self.rpm_history.append(receive_time, rpm_val)
+        self.speed_history.append(receive_time, speed_val)
+
+        # Extend the GPS trail; the map window redraws it at display rate. A snapshot without a fix
+        # adds nothing: a (0, 0) point would stretch the trail across the globe.
+        latitude = gps_data.get("Latitude")
+        longitude = gps_data.get("Longitude")
+        if latitude is not None and longitude is not None:
+            if not isinstance(latitude, (int, float)) or not isinstance(longitude, (int, float)):
+                logging.error(f"Invalid latitude or longitude: {latitude}, {longitude}")
+            else:
+                self.positions.push(latitude, longitude)
 
     def update_graph(self):
-        # Generate "T-" time values for the x-axis
-        time_values = list(range(-len(self.rpm_data), 0))
+        # x values are "T-" seconds relative to now; each curve gets ~2 points per pixel column
+        now = time.monotonic()
+        rpm_x, rpm_y = self.rpm_decimator.update(
+            now, self.max_time_window, self.rpm_graph_widget.getViewBox().width())
+        speed_x, speed_y = self.speed_decimator.update(
+            now, self.max_time_window, self.speed_graph_widget.getViewBox().width())
 
         # Update the graphs
-        self.rpm_curve.setData(time_values, self.rpm_data)
-        self.speed_curve.setData(time_values, self.speed_data)
+        self.rpm_curve.setData(rpm_x, rpm_y)
+        self.speed_curve.setData(speed_x, speed_y)
+
+        # Everything received so far is now on screen
+        paint_ns = time.monotonic_ns()
+        while self.unpainted:
+            self.paint_latency.add(paint_ns - self.unpainted.popleft())
+        rtt = f"{self.clock_sync.rtt_ns / 1e6:.0f} ms" if self.clock_sync.synced else "--"
+        self.latency_label.setText(
+            f"Capture→receive p50/95/99: {self.capture_latency.summary()}   "
+            f"Receive→paint: {self.paint_latency.summary()}   RTT: {rtt}")
+        diagnostics = self.diagnostics
+        if diagnostics:
+            jitter = (diagnostics.get("source_jitter_seconds") or {}).get("publish") or {}
+            jitter_p95 = f"{jitter['p95'] * 1000:.1f} ms" if jitter.get("p95") is not None else "--"
+            overruns = sum((diagnostics.get("source_overruns_total") or {}).values())
+            fix_age = diagnostics.get("gps_fix_age_seconds")
+            fix_age = f"{fix_age:.0f} s" if isinstance(fix_age, (int, float)) and fix_age == fix_age else "--"
+            self.diagnostics_label.setText(
+                f"Car: publish jitter p95 {jitter_p95}, {overruns} overruns   "
+                f"ECU frames {diagnostics.get('rs232_frames_total', '--')}, "
+                f"{diagnostics.get('rs232_checksum_failures_total', '--')} checksum errors, "
+                f"{diagnostics.get('rs232_resyncs_total', '--')} resyncs   GPS fix age {fix_age}")
 
     def start_recording(self):
-        # Flatten the current data structure to get all keys for the header
-        flat_data = self.flatten_dict(self.data)
-        self.csv_header = list(flat_data.keys())
-        self.csv_file = open('recorded_data.csv', 'w', newline='')
-        self.csv_writer = csv.writer(self.csv_file)
-        self.csv_writer.writerow(self.csv_header)
+        # Samples are handed to the recorder's writer thread; new channels are added as they appear.
+        # Each recording gets its own session directory of time-bounded segments.
+        # Use `python recorder.py to-csv <session dir> recorded_data.csv` for a CSV copy.
+        session_dir = new_session_dir()
+        self.recorder = SegmentedRecorder(session_dir)
+        self.recorder.start()
+        print(f"Recording to {self.recorder.path}")
         self.recording = True
         self.start_recording_button.setEnabled(False)
         self.stop_recording_button.setEnabled(True)
 
     def stop_recording(self):
-        if self.csv_file:
-            self.csv_file.close()
         self.recording = False
+        if self.recorder:
+            self.recorder.stop()
+            self.recorder = None
         self.start_recording_button.setEnabled(True)
         self.stop_recording_button.setEnabled(False)
 
-    def record_data_to_csv(self):
-        if self.recording and self.csv_writer:
-            flat_data = self.flatten_dict(self.data)
-            # Ensure all columns are present in the same order as the header
-            row = [flat_data.get(col, "N/A") for col in self.csv_header]
-            self.csv_writer.writerow(row)
-
-    def flatten_dict(self, d, parent_key='', sep='.'):
-        """Recursively flattens a nested dictionary."""
-        items = {}
-        for k, v in d.items():
-            new_key = f"{parent_key}{sep}{k}" if parent_key else k
-            if isinstance(v, dict):
-                items.update(self.flatten_dict(v, new_key, sep=sep))
-            else:
-                items[new_key] = v
-        return items
-
     def show_map_window(self):
         if not self.map_window:
-            self.map_window = MapWindow()
+            self.map_window = MapWindow(self.positions)
         self.map_window.show()
 
     def shutdown_server(self):
@@ -0,0 +1,87 @@
+import collections
+import threading
+import time
+
+# NTP-style clock synchronisation over the telemetry connection.
+#
+# The client sends {"Ping": {"Origin": t0}} using its monotonic clock; the
+# server answers {"Pong": {"Origin": t0, "Receive": t1, "Transmit": t2}} with
+# its own monotonic clock, and the client notes the arrival time t3. Then
+#   offset = ((t1 - t0) + (t2 - t3)) / 2     (server clock minus client clock)
+#   rtt    = (t3 - t0) - (t2 - t1)           (time on the wire, both ways)
+# All times are integer nanoseconds from time.monotonic_ns().
+
+
+def make_ping():
+    return {"Ping": {"Origin": time.monotonic_ns()}}
+
+
+def ping_of(message):
+    """The {"Origin": t0} ping in a received message, or None if it is not a well-formed ping."""
+    ping = message.get("Ping") if isinstance(message, dict) else None
+    if isinstance(ping, dict) and isinstance(ping.get("Origin"), int):
+        return ping
+    return None
+
+
+def make_pong(ping, receive_ns):
+    """Server side: answer a ping received at `receive_ns`."""
+    return {"Pong": {"Origin": ping["Origin"], "Receive": receive_ns, "Transmit": time.monotonic_ns()}}
+
+
+class ClockSync:
+    """Continuous estimate of the remote (car) clock offset and round-trip time.
+
+    Queueing delay only ever makes an exchange look slower, so like NTP's
+    clock filter the offset is taken from the lowest-RTT exchange among the
+    most recent `window` samples.
+    """
+
+    def __init__(self, window=16):
+        self._samples = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.offset_ns = None
+        self.rtt_ns = None
+        self.last_rtt_ns = None
+
+    @property
+    def synced(self):
+        return self.offset_ns is not None
+
+    def add_pong(self, pong, arrival_ns=None):
+        t3 = time.monotonic_ns() if arrival_ns is None else arrival_ns
+        t0, t1, t2 = pong["Origin"], pong["Receive"], pong["Transmit"]
+        rtt = (t3 - t0) - (t2 - t1)
+        offset = ((t1 - t0) + (t2 - t3)) // 2
+        with self._lock:
+            self._samples.append((rtt, offset))
+            self.rtt_ns, self.offset_ns = min(self._samples)
+            self.last_rtt_ns = rtt
+
+    def to_local(self, remote_ns):
+        """Convert a remote monotonic timestamp to this machine's monotonic clock."""
+        return remote_ns - self.offset_ns
+
+
+class LatencyTracker:
+    """Rolling window of latency samples (ns) with percentile summaries."""
+
+    def __init__(self, window=1000):
+        self._samples = collections.deque(maxlen=window)
+
+    def add(self, latency_ns):
+        self._samples.append(latency_ns)
+
+    def percentiles(self, points=(50, 95, 99)):
+        """Return {percentile: latency in ms}, or None before any samples arrive."""
+        samples = sorted(self._samples)
+        if not samples:
+            return None
+        last = len(samples) - 1
+        return {p: samples[min(last, round(p / 100 * last))] / 1e6 for p in points}
+
+    def summary(self):
+        stats = self.percentiles()
+        if stats is None:
+            return "--"
+        return " / ".join(f"{stats[p]:.0f}" for p in (50, 95, 99)) + " ms"
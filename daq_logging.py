@@ -0,0 +1,142 @@
+import collections
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+
+# Logging for the DAQ, on top of the stdlib logging module.
+#
+#   log = daq_logging.get_logger("rs232")
+#   log.debug("Frame %d decoded", n)     # %-args: only formatted if a handler emits the record
+#
+# Calls below the configured level return after one cached level check, so debug logging in
+# the hot paths costs effectively nothing in normal running (DAQ_LOG_LEVEL=DEBUG turns it on).
+# Each call site (file and line) may emit at most `burst` records per `interval` seconds; the
+# rest are counted and the next record from that site says how many were dropped. Records go
+# to the console and to an in-memory ring that is written to LOG_DIR on SIGUSR1, on an
+# uncaught exception in any thread, or when dump() is called.
+
+LOG_DIR = "logs"
+FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+
+
+class RateLimitFilter(logging.Filter):
+    """Per-call-site rate limit: at most `burst` records per `interval` seconds from one line."""
+
+    def __init__(self, interval=10.0, burst=10):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self._sites = {}  # (pathname, lineno) -> [window start, emitted, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        site = (record.pathname, record.lineno)
+        now = record.created
+        with self._lock:
+            state = self._sites.get(site)
+            if state is None:
+                state = self._sites[site] = [now, 0, 0]
+            elif now - state[0] >= self.interval:
+                state[0] = now
+                state[1] = 0
+            if state[1] >= self.burst:
+                state[2] += 1
+                return False
+            state[1] += 1
+            suppressed, state[2] = state[2], 0
+        if suppressed:
+            record.msg = f"{record.msg} [{suppressed} similar suppressed]"
+        return True
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the newest `capacity` records in memory; they are only formatted when dumped."""
+
+    def __init__(self, capacity=5000):
+        super().__init__()
+        self.records = collections.deque(maxlen=capacity)
+
+    def emit(self, record):
+        self.records.append(record)
+
+    def dump(self, stream):
+        for record in list(self.records):
+            try:
+                stream.write(self.format(record) + "\n")
+            except Exception:
+                stream.write(f"<unformattable record from {record.pathname}:{record.lineno}>\n")
+
+
+rate_limiter = RateLimitFilter()
+ring = RingBufferHandler()
+_configured = False
+
+
+def get_logger(name):
+    """Logger for one part of the DAQ, rate limited per call site."""
+    logger = logging.getLogger(f"daq.{name}")
+    if rate_limiter not in logger.filters:
+        logger.addFilter(rate_limiter)
+    return logger
+
+
+def dump(reason="on demand"):
+    """Write the ring buffer to a timestamped file under LOG_DIR; returns its path."""
+    os.makedirs(LOG_DIR, exist_ok=True)
+    path = os.path.join(LOG_DIR, time.strftime("daq_log_%Y%m%d_%H%M%S.txt", time.localtime()))
+    with open(path, "a") as f:
+        f.write(f"--- log dump ({reason}) ---\n")
+        ring.dump(f)
+    return path
+
+
+def setup(level=None, console_level=None, capacity=5000, interval=10.0, burst=10):
+    """Configure the "daq" loggers; call once at startup. Safe to call again."""
+    global _configured
+    level = level or os.environ.get("DAQ_LOG_LEVEL", "INFO")
+    formatter = logging.Formatter(FORMAT)
+    root = logging.getLogger("daq")
+    root.setLevel(level)
+    root.propagate = False
+    rate_limiter.interval = interval
+    rate_limiter.burst = burst
+    ring.records = collections.deque(ring.records, maxlen=capacity)
+    ring.setFormatter(formatter)
+    if _configured:
+        return root
+    console = logging.StreamHandler()
+    console.setLevel(console_level or level)
+    console.setFormatter(formatter)
+    root.addHandler(console)
+    root.addHandler(ring)
+    _install_dump_hooks()
+    _configured = True
+    return root
+
+
+def _install_dump_hooks():
+    previous_excepthook = sys.excepthook
+    previous_thread_excepthook = threading.excepthook
+    log = get_logger("crash")
+
+    def excepthook(exc_type, exc, tb):
+        log.critical("Uncaught exception", exc_info=(exc_type, exc, tb))
+        print(f"Log written to {dump('crash')}", file=sys.stderr)
+        previous_excepthook(exc_type, exc, tb)
+
+    def thread_excepthook(args):
+        if args.exc_type is not SystemExit:
+            name = args.thread.name if args.thread else "unknown"
+            log.critical("Uncaught exception in thread %s", name,
+                         exc_info=(args.exc_type, args.exc_value, args.exc_traceback))
+            print(f"Log written to {dump('crash in thread ' + name)}", file=sys.stderr)
+        previous_thread_excepthook(args)
+
+    sys.excepthook = excepthook
+    threading.excepthook = thread_excepthook
+    if hasattr(signal, "SIGUSR1") and threading.current_thread() is threading.main_thread():
+        # `kill -USR1 <pid>` writes the recent log without stopping anything
+        signal.signal(signal.SIGUSR1, lambda signum, frame: print(f"Log written to {dump('SIGUSR1')}"))
@@ -0,0 +1,193 @@
+from PyQt5.QtWidgets import QWidget, QMainWindow
+from PyQt5.QtCore import Qt, QRect, QPointF, QTimer
+from PyQt5.QtGui import QPainter, QStaticText, QPen, QBrush, QColor, QFont, QPixmap, QTransform
+
+# Layout of the 480x320 steering-wheel screen; each element repaints only its own rect
+RPM_BAR_RECT = QRect(10, 10, 460, 40)
+RPM_TEXT_RECT = QRect(10, 55, 460, 35)
+THROTTLE_BAR_RECT = QRect(25, 100, 35, 100)
+THROTTLE_TEXT_RECT = QRect(5, 205, 90, 25)
+GEAR_RECT = QRect(120, 92, 240, 82)
+SPEED_RECT = QRect(120, 174, 240, 44)
+TEMP_RECT = QRect(120, 220, 240, 30)
+LOGO_RECT = QRect(10, 232, 80, 80)
+CONNECTION_RECT = QRect(100, 262, 370, 40)
+
+RPM_MAX = 15000
+RPM_ORANGE = 7500
+RPM_RED = 11250
+ENGINE_TEMP_WARNING = 60
+
+GREEN = QColor("#00FF00")
+WHITE = QColor("#FFFFFF")
+
+
+class DashboardWidget(QWidget):
+    """Custom-painted driver dashboard.
+
+    Pens, brushes and fonts for every threshold band are built once, text is
+    drawn from cached QStaticText layouts, and `set_values` only schedules a
+    repaint of the elements whose displayed value actually changed, so an
+    unchanged frame costs nothing and a changed one repaints a few small
+    rectangles instead of restyling widgets.
+    """
+
+    text_cache_size = 4096
+
+    def __init__(self, logo_path="logo.png", parent=None):
+        super().__init__(parent)
+        self.setAttribute(Qt.WA_OpaquePaintEvent)  # We fill our own background
+        self.setFixedSize(480, 320)
+
+        self.background = QBrush(QColor("black"))
+        self.bar_background = QBrush(QColor("#2F2F2F"))
+        self.bar_border = QPen(QColor("#555"), 2)
+        self.band_brushes = {
+            "green": QBrush(QColor("#006400")),
+            "orange": QBrush(QColor("orange")),
+            "red": QBrush(QColor("red")),
+        }
+        self.fonts = {
+            "rpm": QFont("Sans", 18),
+            "gear": QFont("Sans", 48),
+            "speed": QFont("Sans", 24),
+            "temp": QFont("Sans", 14),
+            "connection": QFont("Sans", 14),
+            "throttle": QFont("Sans", 12),
+        }
+        self.temp_pens = {False: QPen(WHITE), True: QPen(QColor("#FF0000"))}
+        self.green_pen = QPen(GREEN)
+        self.white_pen = QPen(WHITE)
+
+        logo = QPixmap(logo_path)
+        self.logo = logo.scaled(LOGO_RECT.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation) if not logo.isNull() else None
+
+        self._texts = {}
+        self.values = {
+            "rpm": 0, "speed": 0, "gear": "N", "engine_temp": None,
+            "throttle": 0, "connection": "Disconnected",
+        }
+
+    def set_values(self, **values):
+        """Update displayed values; only elements whose value changed are repainted."""
+        dirty = {
+            "rpm": (RPM_BAR_RECT, RPM_TEXT_RECT),
+            "speed": (SPEED_RECT,),
+            "gear": (GEAR_RECT,),
+            "engine_temp": (TEMP_RECT,),
+            "throttle": (THROTTLE_BAR_RECT,),
+            "connection": (CONNECTION_RECT,),
+        }
+        for key, value in values.items():
+            if self.values.get(key) != value:
+                self.values[key] = value
+                for rect in dirty[key]:
+                    self.update(rect)
+
+    def static_text(self, text, font_key):
+        """Cached, pre-laid-out QStaticText for a string in one of our fonts."""
+        key = (text, font_key)
+        static = self._texts.get(key)
+        if static is None:
+            if len(self._texts) >= self.text_cache_size:
+                self._texts.clear()
+            static = QStaticText(text)
+            static.setTextFormat(Qt.PlainText)
+            static.prepare(QTransform(), self.fonts[font_key])
+            self._texts[key] = static
+        return static
+
+    def draw_text(self, painter, rect, text, font_key, pen, align=Qt.AlignCenter):
+        static = self.static_text(text, font_key)
+        size = static.size()
+        if align == Qt.AlignLeft:
+            x = rect.left()
+        else:
+            x = rect.center().x() - size.width() / 2
+        y = rect.center().y() - size.height() / 2
+        painter.setFont(self.fonts[font_key])
+        painter.setPen(pen)
+        painter.drawStaticText(QPointF(x, y), static)
+
+    def draw_bar(self, painter, rect, fraction, brush, vertical=False):
+        painter.setPen(self.bar_border)
+        painter.setBrush(self.bar_background)
+        painter.drawRoundedRect(rect, 5, 5)
+        fraction = max(0.0, min(1.0, fraction))
+        inner = rect.adjusted(3, 3, -3, -3)
+        if vertical:
+            height = int(inner.height() * fraction)
+            fill = QRect(inner.left(), inner.bottom() - height + 1, inner.width(), height)
+        else:
+            fill = QRect(inner.left(), inner.top(), int(inner.width() * fraction), inner.height())
+        if fill.width() > 0 and fill.height() > 0:
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(brush)
+            painter.drawRoundedRect(fill, 3, 3)
+
+    def paintEvent(self, event):
+        area = event.rect()
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.fillRect(area, self.background)
+        v = self.values
+
+        if area.intersects(RPM_BAR_RECT):
+            rpm = v["rpm"]
+            band = "red" if rpm > RPM_RED else "orange" if rpm > RPM_ORANGE else "green"
+            self.draw_bar(painter, RPM_BAR_RECT, rpm / RPM_MAX, self.band_brushes[band])
+        if area.intersects(RPM_TEXT_RECT):
+            self.draw_text(painter, RPM_TEXT_RECT, f"{v['rpm']} RPM", "rpm", self.green_pen)
+        if area.intersects(THROTTLE_BAR_RECT):
+            self.draw_bar(painter, THROTTLE_BAR_RECT, v["throttle"] / 100, self.band_brushes["green"], vertical=True)
+        if area.intersects(THROTTLE_TEXT_RECT):
+            self.draw_text(painter, THROTTLE_TEXT_RECT, "Throttle", "throttle", self.white_pen, Qt.AlignLeft)
+        if area.intersects(GEAR_RECT):
+            self.draw_text(painter, GEAR_RECT, str(v["gear"]), "gear", self.green_pen)
+        if area.intersects(SPEED_RECT):
+            self.draw_text(painter, SPEED_RECT, f"{v['speed']} km/h", "speed", self.green_pen)
+        if area.intersects(TEMP_RECT):
+            temp = v["engine_temp"]
+            text = "Engine Temp: -- °C" if temp is None else f"Engine Temp: {temp:.1f} °C"
+            hot = temp is not None and temp > ENGINE_TEMP_WARNING
+            self.draw_text(painter, TEMP_RECT, text, "temp", self.temp_pens[hot])
+        if self.logo is not None and area.intersects(LOGO_RECT):
+            painter.drawPixmap(LOGO_RECT.center().x() - self.logo.width() // 2,
+                               LOGO_RECT.center().y() - self.logo.height() // 2, self.logo)
+        if area.intersects(CONNECTION_RECT):
+            self.draw_text(painter, CONNECTION_RECT, v["connection"], "connection", self.green_pen)
+        painter.end()
+
+
+class SensorWindow(QMainWindow):
+    """Full-screen window around the dashboard, polling for new values at `fps`.
+
+    `poll` returns the values for the newest snapshot (None if nothing new
+    arrived); `on_close` is called when the window is closed.
+    """
+
+    def __init__(self, poll, on_close, fps=30):
+        super().__init__()
+        self.setWindowTitle("Car Dashboard")
+        self.setFixedSize(480, 320)  # Fixed size to prevent stretching
+        self.setGeometry(0, 0, 480, 320)  # Adjusted for 480x320 resolution
+        self.poll = poll
+        self.on_close = on_close
+
+        self.dashboard = DashboardWidget("logo.png")
+        self.setCentralWidget(self.dashboard)
+
+        # Timer to update sensor data
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.update_sensor_data)
+        self.timer.start(int(1000 / fps))
+
+    def update_sensor_data(self):
+        values = self.poll()
+        if values:
+            self.dashboard.set_values(**values)
+
+    def closeEvent(self, event):
+        """Handle the window close event."""
+        self.on_close()  # Signal all threads to stop
+        event.accept()
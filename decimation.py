@@ -0,0 +1,154 @@
+import threading
+import numpy as np
+
+
+class ChannelHistory:
+    """Append-only (time, value) history for one live channel."""
+
+    def __init__(self, max_samples=1_000_000, initial_capacity=1024):
+        self.max_samples = max_samples
+        self._times = np.empty(initial_capacity, dtype=np.float64)
+        self._values = np.empty(initial_capacity, dtype=np.float64)
+        self._length = 0
+        # Number of samples ever dropped from the front, so consumers can keep
+        # absolute sample positions across trims.
+        self.dropped = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def total(self):
+        """Number of samples ever appended."""
+        return self.dropped + self._length
+
+    def append(self, t, value):
+        with self.lock:
+            if self._length == len(self._times):
+                self._grow()
+            self._times[self._length] = t
+            self._values[self._length] = value
+            self._length += 1
+
+    def _grow(self):
+        if self._length >= self.max_samples:
+            # Drop the oldest half in one move instead of shifting every append
+            keep = self._length // 2
+            self._times[:keep] = self._times[self._length - keep:self._length]
+            self._values[:keep] = self._values[self._length - keep:self._length]
+            self.dropped += self._length - keep
+            self._length = keep
+            return
+        capacity = min(len(self._times) * 2, self.max_samples)
+        self._times = np.resize(self._times, capacity)
+        self._values = np.resize(self._values, capacity)
+
+    def since(self, absolute_index):
+        """Return copies of samples appended at or after an absolute index."""
+        with self.lock:
+            start = max(absolute_index - self.dropped, 0)
+            return (self._times[start:self._length].copy(),
+                    self._values[start:self._length].copy(),
+                    self.dropped + start)
+
+    def window(self, t_start):
+        """Return copies of all samples with time >= t_start, plus the absolute end index."""
+        with self.lock:
+            times = self._times[:self._length]
+            start = int(np.searchsorted(times, t_start, side="left"))
+            return (times[start:].copy(), self._values[start:self._length].copy(),
+                    self.dropped + self._length)
+
+    def latest_time(self):
+        with self.lock:
+            return self._times[self._length - 1] if self._length else None
+
+
+class MinMaxDecimator:
+    """Reduces a channel history to roughly two points per pixel column.
+
+    Samples are binned into fixed-width time columns aligned to absolute time,
+    and each column keeps only its minimum and maximum, so short spikes survive
+    the reduction. Completed columns are cached; each update only bins the
+    samples that arrived since the previous one, so the cost of a redraw
+    depends on the plot width rather than on the history length.
+    """
+
+    def __init__(self, history):
+        self.history = history
+        self._bin_width = None
+        self._reset()
+
+    def _reset(self):
+        self._consumed = 0  # absolute index of the next unprocessed sample
+        self._ids = np.empty(0, dtype=np.int64)
+        self._mins = np.empty(0, dtype=np.float64)
+        self._maxs = np.empty(0, dtype=np.float64)
+
+    def update(self, now, window, columns):
+        """Return (x, y) arrays for the last `window` seconds, x relative to now."""
+        columns = max(int(columns), 1)
+        bin_width = window / columns
+        if bin_width != self._bin_width:
+            self._bin_width = bin_width
+            self._reset()
+
+        t_start = now - window
+        if self._consumed <= self.history.dropped:
+            # First update or the history trimmed past our cursor: rebuild from the window
+            times, values, end = self.history.window(t_start - bin_width)
+            self._reset()
+            self._consumed = end
+            self._add(times, values)
+        else:
+            times, values, _ = self.history.since(self._consumed)
+            self._consumed += len(times)
+            self._add(times, values)
+
+        # Forget columns that have scrolled out of view
+        first_visible = int(np.floor(t_start / bin_width))
+        keep = int(np.searchsorted(self._ids, first_visible, side="left"))
+        if keep:
+            self._ids = self._ids[keep:]
+            self._mins = self._mins[keep:]
+            self._maxs = self._maxs[keep:]
+
+        if len(self._ids) == 0:
+            return np.empty(0), np.empty(0)
+
+        # Emit min and max at the column centre, giving a vertical stroke per pixel column
+        centres = (self._ids + 0.5) * bin_width - now
+        x = np.repeat(centres, 2)
+        y = np.empty(len(x), dtype=np.float64)
+        y[0::2] = self._mins
+        y[1::2] = self._maxs
+        return x, y
+
+    def _add(self, times, values):
+        if len(times) == 0:
+            return
+        ids = np.floor(times / self._bin_width).astype(np.int64)
+        steps = np.flatnonzero(np.diff(ids) < 0)
+        if len(steps):
+            # Time went backwards within the batch; keep what follows the last step, in order
+            ids, values = ids[steps[-1] + 1:], values[steps[-1] + 1:]
+        if len(steps) or (len(self._ids) and ids[0] < self._ids[-1]):
+            # Time went backwards (e.g. reconnect with a fresh clock); start over
+            consumed = self._consumed
+            self._reset()
+            self._consumed = consumed
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(ids)) + 1))
+        new_ids = ids[starts]
+        new_mins = np.fmin.reduceat(values, starts)
+        new_maxs = np.fmax.reduceat(values, starts)
+
+        # The newest cached column may still be filling up; merge into it
+        if len(self._ids) and new_ids[0] == self._ids[-1]:
+            self._mins[-1] = np.fmin(self._mins[-1], new_mins[0])
+            self._maxs[-1] = np.fmax(self._maxs[-1], new_maxs[0])
+            new_ids, new_mins, new_maxs = new_ids[1:], new_mins[1:], new_maxs[1:]
+
+        self._ids = np.concatenate((self._ids, new_ids))
+        self._mins = np.concatenate((self._mins, new_mins))
+        self._maxs = np.concatenate((self._maxs, new_maxs))
@@ -0,0 +1,149 @@
+import asyncio
+import os
+import threading
+import time
+import daq_logging
+import sensor_reading
+from metrics import REGISTRY
+
+# Event-driven acquisition for the serial sources (server.py, ACQUISITION_MODE = "asyncio").
+#
+# The RS232, Arduino and SIM7600X ports are registered with one asyncio loop through
+# loop.add_reader on their file descriptors. Bytes are decoded the moment the kernel has them
+# (sensor_reading.RS232Decoder / SerialLineDecoder) and the thread sleeps in epoll otherwise,
+# instead of three polling threads waking on timers to check in_waiting. The GPS is still a
+# query, so a timer writes AT+CGPSINFO at the GPS rate and the reply is parsed as it arrives.
+# Ports are attached as the boot stages open them; the modem only once the GPS stage is done,
+# because the boot stages talk to it synchronously until then.
+
+READ_SIZE = 4096
+HOUSEKEEPING_INTERVAL = 0.5  # seconds between checks for newly opened ports and for stop
+GPS_QUERY = b'AT+CGPSINFO\r\n'
+
+log = daq_logging.get_logger("events")
+
+serial_wakeups = REGISTRY.counter("serial_wakeups_total", "Readiness callbacks per serial port", labels=("port",))
+gps_timeouts = REGISTRY.counter("gps_query_timeouts_total", "GPS queries not answered before the next one")
+
+
+class EventAcquisition:
+    """Reads the serial ports from one asyncio loop on its own thread; samples go to `store(source, sample)`."""
+
+    def __init__(self, store, stop_event, gps_ready, gps_rate=1):
+        self.store = store
+        self.stop_event = stop_event
+        self.gps_ready = gps_ready
+        self.gps_period = 1 / gps_rate
+        self.loop = None
+        self.readers = {}  # port name -> fd registered with the loop
+        self.rs232 = sensor_reading.RS232Decoder()
+        self.arduino = sensor_reading.SerialLineDecoder()
+        self.gps_reply = bytearray()
+        self.gps_pending = False  # A CGPSINFO query is waiting for its reply
+        self.next_gps = 0
+
+    def start(self):
+        thread = threading.Thread(target=self.run, name="source-serial-events", daemon=True)
+        thread.start()
+        return thread
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        self.next_gps = self.loop.time()
+        self.loop.call_soon(self.housekeeping)
+        self.loop.call_soon(self.query_gps)
+        try:
+            self.loop.run_forever()
+        finally:
+            for fd in self.readers.values():
+                self.loop.remove_reader(fd)
+            self.loop.close()
+
+    def housekeeping(self):
+        if self.stop_event.is_set():
+            self.loop.stop()
+            return
+        if "rs232" not in self.readers and sensor_reading.rs232 is not None:
+            self.attach("rs232", sensor_reading.rs232, self.on_rs232)
+        if "arduino" not in self.readers and sensor_reading.arduinoSerial is not None:
+            self.attach("arduino", sensor_reading.arduinoSerial, self.on_arduino)
+        if "modem" not in self.readers and sensor_reading.ser is not None and self.gps_ready.is_set():
+            if not sensor_reading.gps_session_active:
+                # The GPS stage failed to start a session; try once more (the reply is ignored)
+                os.write(sensor_reading.ser.fileno(), b'AT+CGPS=1,1\r\n')
+            self.attach("modem", sensor_reading.ser, self.on_modem)
+        self.loop.call_later(HOUSEKEEPING_INTERVAL, self.housekeeping)
+
+    def attach(self, name, port, on_data):
+        fd = port.fileno()
+        os.set_blocking(fd, False)  # pyserial opens ports non-blocking already; make sure
+        self.readers[name] = fd
+        self.loop.add_reader(fd, self.on_readable, name, fd, on_data)
+        log.info("Reading %s from the event loop (fd %d)", name, fd)
+
+    def detach(self, name):
+        fd = self.readers.pop(name, None)
+        if fd is not None:
+            self.loop.remove_reader(fd)
+
+    def on_readable(self, name, fd, on_data):
+        try:
+            chunk = os.read(fd, READ_SIZE)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            log.error("Reading %s failed, detaching it: %s", name, e)
+            self.detach(name)
+            return
+        if not chunk:
+            log.error("%s closed, detaching it", name)
+            self.detach(name)
+            return
+        serial_wakeups.labels(name).inc()
+        capture_time = time.monotonic_ns()
+        try:
+            on_data(chunk, capture_time)
+        except Exception as e:
+            log.warning("Failed to handle %s data: %s", name, e)
+
+    def on_rs232(self, chunk, capture_time):
+        for frame in self.rs232.feed(chunk, capture_time):
+            self.store("RS232 Data", frame)
+
+    def on_arduino(self, chunk, capture_time):
+        for sample in self.arduino.feed(chunk, capture_time):
+            self.store("Serial Data", sample)
+
+    def query_gps(self):
+        # Absolute deadlines, so the query rate does not drift
+        self.next_gps += self.gps_period
+        self.loop.call_at(self.next_gps, self.query_gps)
+        fd = self.readers.get("modem")
+        if fd is None:
+            return
+        if self.gps_pending:
+            gps_timeouts.inc()
+            self.finish_gps(None)
+        self.gps_reply.clear()
+        self.gps_pending = True
+        try:
+            os.write(fd, GPS_QUERY)
+        except OSError as e:
+            self.gps_pending = False
+            log.warning("GPS query failed: %s", e)
+
+    def on_modem(self, chunk, capture_time):
+        if not self.gps_pending:
+            return  # Unsolicited result codes and late replies
+        self.gps_reply += chunk
+        if self.gps_reply.endswith(b'OK\r\n') or b'ERROR' in self.gps_reply:
+            reply = self.gps_reply.decode(errors='replace')
+            self.finish_gps(sensor_reading.parse_gps_info(reply, capture_time) if '+CGPSINFO: ' in reply else None)
+
+    def finish_gps(self, fix):
+        self.gps_pending = False
+        if fix is None:
+            sensor_reading.gps_no_fix.inc()
+            log.debug("GPS is not ready. Sending dummy data.")
+            fix = dict(sensor_reading.DUMMY_GPS)
+        self.store("GPS Data", fix)
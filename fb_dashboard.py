@@ -0,0 +1,309 @@
+import argparse
+import math
+import mmap
+import os
+import time
+import numpy as np
+
+# Driver dashboard drawn straight into a Linux framebuffer (/dev/fbN) with NumPy, so the
+# steering-wheel screen works without X or Qt. The layout matches dashboard.DashboardWidget.
+# Run against a plain file instead of a device to test it anywhere:
+#   python fb_dashboard.py --fake /tmp/fb.raw --seconds 5 --snapshot /tmp/dash.ppm
+
+SCREEN_WIDTH = 480
+SCREEN_HEIGHT = 320
+
+# 5x7 bitmap font for ASCII 0x20-0x7E: five column bytes per glyph, bit 0 is the top row
+FONT_5X7 = bytes.fromhex(
+    "0000000000" "00005f0000" "0007000700" "147f147f14" "242a7f2a12" "2313086462" "3649552250" "0005030000"
+    "001c224100" "0041221c00" "082a1c2a08" "08083e0808" "0050300000" "0808080808" "0060600000" "2010080402"
+    "3e5149453e" "00427f4000" "4261514946" "2141454b31" "1814127f10" "2745454539" "3c4a494930" "0171090503"
+    "3649494936" "064949291e" "0036360000" "0056360000" "0008142241" "1414141414" "4122140800" "0201510906"
+    "324979413e" "7e1111117e" "7f49494936" "3e41414122" "7f4141221c" "7f49494941" "7f09090101" "3e41415132"
+    "7f0808087f" "00417f4100" "2040413f01" "7f08142241" "7f40404040" "7f0204027f" "7f0408107f" "3e4141413e"
+    "7f09090906" "3e4151215e" "7f09192946" "4649494931" "01017f0101" "3f4040403f" "1f2040201f" "7f2018207f"
+    "6314081463" "0304780403" "6151494543" "00007f4141" "0204081020" "41417f0000" "0402010204" "4040404040"
+    "0001020400" "2054545478" "7f48444438" "3844444420" "384444487f" "3854545418" "087e090102" "081454543c"
+    "7f08040478" "00447d4000" "2040443d00" "007f102844" "00417f4000" "7c04180478" "7c08040478" "3844444438"
+    "7c14141408" "081414187c" "7c08040408" "4854545420" "043f444020" "3c4040207c" "1c2040201c" "3c4030403c"
+    "4428102844" "0c5050503c" "4464544c44" "0008364100" "00007f0000" "0041360800" "08082a1c08"
+)
+DEGREE_GLYPH = bytes.fromhex("0006090906")
+GLYPH_CHARS = "".join(chr(c) for c in range(0x20, 0x7F)) + "°"
+
+# Element rectangles (x, y, width, height), as in dashboard.py
+RPM_BAR_RECT = (10, 10, 460, 40)
+RPM_TEXT_RECT = (10, 55, 460, 35)
+THROTTLE_BAR_RECT = (25, 100, 35, 100)
+THROTTLE_TEXT_RECT = (5, 205, 90, 25)
+GEAR_RECT = (120, 92, 240, 82)
+SPEED_RECT = (120, 174, 240, 44)
+TEMP_RECT = (120, 220, 240, 30)
+CONNECTION_RECT = (100, 262, 370, 40)
+
+RPM_MAX = 15000
+RPM_ORANGE = 7500
+RPM_RED = 11250
+ENGINE_TEMP_WARNING = 60
+
+
+class GlyphAtlas:
+    """The font pre-rendered at one integer scale as a stack of boolean glyph masks."""
+
+    def __init__(self, scale):
+        columns = np.frombuffer(FONT_5X7 + DEGREE_GLYPH, dtype=np.uint8).reshape(-1, 5)
+        bits = (columns[:, None, :] >> np.arange(7, dtype=np.uint8)[None, :, None]) & 1  # (glyph, row, column)
+        bits = np.pad(bits, ((0, 0), (0, 0), (0, 1)))  # One blank column between characters
+        self.glyphs = bits.astype(bool).repeat(scale, axis=1).repeat(scale, axis=2)
+        self.char_height, self.char_width = self.glyphs.shape[1:]
+        self.index = {c: i for i, c in enumerate(GLYPH_CHARS)}
+
+    def text_width(self, text):
+        return len(text) * self.char_width
+
+    def mask(self, text):
+        """Boolean mask of the rendered string; characters outside the font draw as spaces."""
+        indices = np.fromiter((self.index.get(c, 0) for c in text), dtype=np.intp, count=len(text))
+        glyphs = self.glyphs[indices]
+        return glyphs.transpose(1, 0, 2).reshape(self.char_height, -1)
+
+
+class Framebuffer:
+    """A memory-mapped framebuffer device (or a file standing in for one).
+
+    Geometry and pixel depth come from /sys/class/graphics/<name> unless given.
+    16 bpp is treated as RGB565 and 32 bpp as XRGB8888, the two formats the Pi exposes.
+    """
+
+    def __init__(self, path="/dev/fb0", width=None, height=None, bpp=None, stride=None):
+        self.path = path
+        if (width is None or height is None or bpp is None) and os.path.isfile(path):
+            # A fake framebuffer file: the screen size, depth inferred from the file size
+            width, height = width or SCREEN_WIDTH, height or SCREEN_HEIGHT
+            bpp = bpp or os.path.getsize(path) * 8 // (width * height)
+        elif width is None or height is None or bpp is None:
+            sys_dir = os.path.join("/sys/class/graphics", os.path.basename(path))
+            with open(os.path.join(sys_dir, "virtual_size")) as f:
+                width, height = (int(v) for v in f.read().strip().split(","))
+            with open(os.path.join(sys_dir, "bits_per_pixel")) as f:
+                bpp = int(f.read())
+            if stride is None and os.path.exists(os.path.join(sys_dir, "stride")):
+                with open(os.path.join(sys_dir, "stride")) as f:
+                    stride = int(f.read())
+        if bpp not in (16, 32):
+            raise ValueError(f"Unsupported framebuffer depth: {bpp} bpp")
+        self.width, self.height, self.bpp = width, height, bpp
+        self.dtype = np.uint16 if bpp == 16 else np.uint32
+        bytes_per_pixel = bpp // 8
+        stride = stride or width * bytes_per_pixel
+        self._fd = os.open(path, os.O_RDWR)
+        self._map = mmap.mmap(self._fd, stride * height, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        rows = np.frombuffer(self._map, dtype=self.dtype).reshape(height, stride // bytes_per_pixel)
+        self.pixels = rows[:, :width]
+
+    @classmethod
+    def fake(cls, path, width=SCREEN_WIDTH, height=SCREEN_HEIGHT, bpp=16):
+        """A file-backed framebuffer of the given geometry, for running without the display."""
+        with open(path, "wb") as f:
+            f.truncate(width * height * bpp // 8)
+        return cls(path, width, height, bpp)
+
+    def color(self, rgb):
+        """Pack an (r, g, b) tuple into this framebuffer's native pixel value."""
+        r, g, b = rgb
+        if self.bpp == 16:
+            return self.dtype(((r >> 3) << 11) | ((g >> 2) << 5) | (b >> 3))
+        return self.dtype(0xFF000000 | (r << 16) | (g << 8) | b)
+
+    def to_rgb(self):
+        """Current contents as an (height, width, 3) uint8 array."""
+        p = self.pixels.astype(np.uint32)
+        if self.bpp == 16:
+            r, g, b = (p >> 11) & 0x1F, (p >> 5) & 0x3F, p & 0x1F
+            return np.stack((r << 3 | r >> 2, g << 2 | g >> 4, b << 3 | b >> 2), axis=-1).astype(np.uint8)
+        return np.stack(((p >> 16) & 0xFF, (p >> 8) & 0xFF, p & 0xFF), axis=-1).astype(np.uint8)
+
+    def write_ppm(self, path):
+        rgb = self.to_rgb()
+        with open(path, "wb") as f:
+            f.write(f"P6 {self.width} {self.height} 255\n".encode())
+            f.write(rgb.tobytes())
+
+    def close(self):
+        self.pixels = None
+        self._map.close()
+        os.close(self._fd)
+
+
+class FramebufferDashboard:
+    """The driver dashboard rendered with NumPy into a back buffer.
+
+    `set_values` marks the elements whose value changed; `render` redraws
+    just those elements and copies only their rectangles to the framebuffer,
+    so an unchanged frame touches no pixels at all.
+    """
+
+    def __init__(self, framebuffer):
+        self.fb = framebuffer
+        self.width = min(SCREEN_WIDTH, framebuffer.width)
+        self.height = min(SCREEN_HEIGHT, framebuffer.height)
+        self.canvas = np.zeros((self.height, self.width), dtype=framebuffer.dtype)
+
+        c = framebuffer.color
+        self.colors = {
+            "background": c((0, 0, 0)),
+            "bar background": c((0x2F, 0x2F, 0x2F)),
+            "bar border": c((0x55, 0x55, 0x55)),
+            "green": c((0x00, 0x64, 0x00)),
+            "orange": c((0xFF, 0xA5, 0x00)),
+            "red": c((0xFF, 0x00, 0x00)),
+            "text": c((0x00, 0xFF, 0x00)),
+            "white": c((0xFF, 0xFF, 0xFF)),
+        }
+        self.atlases = {scale: GlyphAtlas(scale) for scale in (1, 2, 3, 4, 10)}
+
+        self.values = {
+            "rpm": 0, "speed": 0, "gear": "N", "engine_temp": None,
+            "throttle": 0, "connection": "Disconnected",
+        }
+        self.elements = {
+            "rpm": self.draw_rpm,
+            "speed": self.draw_speed,
+            "gear": self.draw_gear,
+            "engine_temp": self.draw_temp,
+            "throttle": self.draw_throttle,
+            "connection": self.draw_connection,
+        }
+        self.canvas[:] = self.colors["background"]
+        self.draw_text(THROTTLE_TEXT_RECT, "Throttle", 2, self.colors["white"], centre=False)
+        self.blit((0, 0, self.width, self.height))
+        self._dirty = set(self.elements)
+
+    def set_values(self, **values):
+        """Update displayed values; only elements whose value changed are redrawn."""
+        for key, value in values.items():
+            if self.values.get(key) != value:
+                self.values[key] = value
+                self._dirty.add(key)
+
+    def render(self):
+        """Redraw and flush the changed elements; returns how many were redrawn."""
+        dirty = self._dirty
+        self._dirty = set()
+        for key in dirty:
+            for rect in self.elements[key]():
+                self.blit(rect)
+        return len(dirty)
+
+    def blit(self, rect):
+        x, y, w, h = rect
+        self.fb.pixels[y:y + h, x:x + w] = self.canvas[y:y + h, x:x + w]
+
+    def fill(self, rect, color):
+        x, y, w, h = rect
+        self.canvas[y:y + h, x:x + w] = color
+
+    def draw_text(self, rect, text, scale, color, centre=True):
+        """Draw text in the largest scale up to `scale` that fits the rect, clipped to it."""
+        x, y, w, h = rect
+        self.fill(rect, self.colors["background"])
+        atlas = self.atlases[scale]
+        for smaller in sorted(self.atlases, reverse=True):
+            if smaller <= scale and (self.atlases[smaller].text_width(text) <= w or smaller == 1):
+                atlas = self.atlases[smaller]
+                break
+        mask = atlas.mask(text)[:h, :w]
+        mh, mw = mask.shape
+        left = x + (w - mw) // 2 if centre else x
+        top = y + (h - mh) // 2
+        region = self.canvas[top:top + mh, left:left + mw]
+        region[mask[:region.shape[0], :region.shape[1]]] = color  # A rect past the canvas edge is clipped to it
+
+    def draw_bar(self, rect, fraction, color, vertical=False):
+        x, y, w, h = rect
+        self.fill(rect, self.colors["bar border"])
+        inner = (x + 2, y + 2, w - 4, h - 4)
+        self.fill(inner, self.colors["bar background"])
+        fraction = max(0.0, min(1.0, fraction))
+        ix, iy, iw, ih = inner[0] + 1, inner[1] + 1, inner[2] - 2, inner[3] - 2
+        if vertical:
+            filled = int(ih * fraction)
+            self.fill((ix, iy + ih - filled, iw, filled), color)
+        else:
+            self.fill((ix, iy, int(iw * fraction), ih), color)
+
+    def draw_rpm(self):
+        rpm = self.values["rpm"]
+        band = "red" if rpm > RPM_RED else "orange" if rpm > RPM_ORANGE else "green"
+        self.draw_bar(RPM_BAR_RECT, rpm / RPM_MAX, self.colors[band])
+        self.draw_text(RPM_TEXT_RECT, f"{rpm} RPM", 3, self.colors["text"])
+        return RPM_BAR_RECT, RPM_TEXT_RECT
+
+    def draw_speed(self):
+        self.draw_text(SPEED_RECT, f"{self.values['speed']} km/h", 4, self.colors["text"])
+        return (SPEED_RECT,)
+
+    def draw_gear(self):
+        self.draw_text(GEAR_RECT, str(self.values["gear"]), 10, self.colors["text"])
+        return (GEAR_RECT,)
+
+    def draw_temp(self):
+        temp = self.values["engine_temp"]
+        text = "Engine Temp: -- °C" if temp is None else f"Engine Temp: {temp:.1f} °C"
+        hot = temp is not None and temp > ENGINE_TEMP_WARNING
+        self.draw_text(TEMP_RECT, text, 2, self.colors["red" if hot else "white"])
+        return (TEMP_RECT,)
+
+    def draw_throttle(self):
+        self.draw_bar(THROTTLE_BAR_RECT, self.values["throttle"] / 100, self.colors["green"], vertical=True)
+        return (THROTTLE_BAR_RECT,)
+
+    def draw_connection(self):
+        self.draw_text(CONNECTION_RECT, self.values["connection"], 2, self.colors["text"])
+        return (CONNECTION_RECT,)
+
+
+def demo_values(t):
+    """Synthetic values for exercising the renderer without the car."""
+    return {
+        "rpm": int((math.sin(t / 2) + 1) * 7500),
+        "speed": int((math.sin(t / 5) + 1) * 90),
+        "gear": str(int((math.sin(t / 6) + 1) * 3)),
+        "engine_temp": round(50 + (math.sin(t / 10) + 1) * 10, 1),
+        "throttle": int((math.sin(t / 3) + 1) * 50),
+        "connection": "Active",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the framebuffer dashboard with demo values")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--device", default="/dev/fb0", help="Framebuffer device")
+    target.add_argument("--fake", help="File to use as a fake 480x320 framebuffer instead of a device")
+    parser.add_argument("--bpp", type=int, default=16, choices=(16, 32), help="Pixel depth of the fake framebuffer")
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--snapshot", help="Write the final frame to this .ppm file")
+    args = parser.parse_args()
+
+    fb = Framebuffer.fake(args.fake, bpp=args.bpp) if args.fake else Framebuffer(args.device)
+    dashboard = FramebufferDashboard(fb)
+    period = 1 / args.fps
+    frames = 0
+    render_time = 0.0
+    start = time.monotonic()
+    while time.monotonic() - start < args.seconds:
+        dashboard.set_values(**demo_values(time.monotonic() - start))
+        t0 = time.perf_counter()
+        dashboard.render()
+        render_time += time.perf_counter() - t0
+        frames += 1
+        time.sleep(period)
+    print(f"{frames} frames, {render_time / max(frames, 1) * 1000:.2f} ms average render")
+    if args.snapshot:
+        fb.write_ppm(args.snapshot)
+    fb.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+class SchemaFlattener:
+    """Flattens nested messages into a reusable row using compiled access plans.
+
+    The first message of a given shape is walked once to build a plan that
+    mirrors its nesting, with each leaf holding the output column index.
+    Later messages are filled by walking the plan alongside the message:
+    keys are compared in order, values are stored straight into the
+    preallocated row and no column names are built. A plan is only compiled
+    when a message matches none of the recently seen shapes (sources that
+    flip between data and an "Error" dict keep both plans). Columns are
+    never renumbered, so channels that appear later are appended after the
+    existing ones.
+    """
+
+    max_plans = 8
+
+    def __init__(self, sep='.', leading_columns=()):
+        self.sep = sep
+        # Columns reserved for the caller (e.g. a receive timestamp) come first
+        self.columns = list(leading_columns)
+        self._leading_count = len(self.columns)
+        self._column_index = {name: i for i, name in enumerate(self.columns)}
+        # Most recently used first; each entry is (plan tree, set of column indices it fills)
+        self._plans = []
+        self.row = [None] * len(self.columns)
+        self.recompiles = 0
+
+    def flatten(self, message):
+        """Fill and return the shared row buffer for a message.
+
+        The returned list is reused for the next message; copy it if it has
+        to outlive the call. Columns the message does not carry are None.
+        """
+        plans = self._plans
+        if plans and _fill(message, plans[0][0], self.row):
+            return self.row
+        for i in range(1, len(plans)):
+            if _fill(message, plans[i][0], self.row):
+                plans.insert(0, plans.pop(i))
+                self._clear_absent(plans[0][1])
+                return self.row
+        self._compile(message)
+        return self.row
+
+    def _compile(self, message):
+        self.recompiles += 1
+        present = set()
+        plan = self._compile_level(message, (), present)
+        if len(self.row) < len(self.columns):
+            self.row.extend([None] * (len(self.columns) - len(self.row)))
+        self._plans.insert(0, (plan, present))
+        del self._plans[self.max_plans:]
+        _fill(message, plan, self.row)
+        self._clear_absent(present)
+
+    def _clear_absent(self, present):
+        # Columns outside the active shape stay None until the shape changes again;
+        # this also wipes anything a failed match wrote before bailing out
+        row = self.row
+        for index in range(self._leading_count, len(self.columns)):
+            if index not in present:
+                row[index] = None
+
+    def _compile_level(self, d, prefix, present):
+        plan = []
+        for key, value in d.items():
+            path = prefix + (str(key),)
+            # Exact type check to match _fill, which only descends into plain dicts
+            if value.__class__ is dict:
+                plan.append((key, self._compile_level(value, path, present)))
+            else:
+                name = self.sep.join(path)
+                index = self._column_index.get(name)
+                if index is None:
+                    index = self._column_index[name] = len(self.columns)
+                    self.columns.append(name)
+                present.add(index)
+                plan.append((key, index))
+        return tuple(plan)
+
+
+def _fill(d, plan, row):
+    """Store d's leaves into row following plan; False if d's shape differs from the plan."""
+    if len(d) != len(plan):
+        return False
+    for (key, value), (plan_key, target) in zip(d.items(), plan):
+        if key != plan_key:
+            return False
+        if target.__class__ is int:
+            if value.__class__ is dict:
+                return False
+            row[target] = value
+        elif value.__class__ is not dict or not _fill(value, target, row):
+            return False
+    return True
@@ -0,0 +1,118 @@
+import argparse
+import asyncio
+import json
+import signal
+import time
+from recorder import SegmentedRecorder, new_session_dir
+
+# Headless pitwall recorder: connects to the DAQ server, decodes the
+# newline-delimited JSON stream on an asyncio event loop and hands every
+# message to a SegmentedRecorder. It never imports Qt, so it can run on a
+# low-power laptop alongside (or instead of) client.py.
+
+READ_SIZE = 256 * 1024
+
+
+async def record_stream(host, port, recorder, stats):
+    """Read messages from one connection until the server closes it."""
+    reader, writer = await asyncio.open_connection(host, port)
+    print(f"Connected to {host}:{port}")
+    pending = b""
+    record = recorder.record
+    loads = json.loads
+    try:
+        while True:
+            chunk = await reader.read(READ_SIZE)
+            if not chunk:
+                print("Server closed the connection")
+                break
+            stats["bytes"] += len(chunk)
+            # Decode every complete line in the chunk; keep the partial tail for next time
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            receive_time = time.time()
+            for line in lines:
+                if not line:
+                    continue
+                try:
+                    message = loads(line)
+                except ValueError:
+                    stats["bad"] += 1
+                    continue
+                if not isinstance(message, dict):
+                    stats["bad"] += 1  # Valid JSON, but not a message object
+                    continue
+                if "Diagnostics" in message:
+                    stats["diagnostics"] += 1  # The car's metrics, not telemetry
+                    continue
+                record(message, receive_time)
+                stats["messages"] += 1
+    finally:
+        writer.close()
+
+
+async def report_stats(stats, interval, stop):
+    last_messages, last_bytes, last_time = 0, 0, time.monotonic()
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+        now = time.monotonic()
+        elapsed = now - last_time
+        print(f"{stats['messages']} messages ({(stats['messages'] - last_messages) / elapsed:.1f}/s, "
+              f"{(stats['bytes'] - last_bytes) / elapsed / 1024:.1f} KiB/s), {stats['bad']} undecodable")
+        last_messages, last_bytes, last_time = stats["messages"], stats["bytes"], now
+
+
+async def run(args):
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    if args.duration:
+        loop.call_later(args.duration, stop.set)
+
+    session_dir = args.output or new_session_dir()
+    recorder = SegmentedRecorder(session_dir, segment_seconds=args.segment_seconds)
+    recorder.start()
+    print(f"Recording to {recorder.path}")
+
+    stats = {"messages": 0, "bytes": 0, "bad": 0, "diagnostics": 0}
+    reporter = asyncio.ensure_future(report_stats(stats, args.stats_interval, stop))
+    stopping = asyncio.ensure_future(stop.wait())
+    retry_delay = 0.5
+    try:
+        while not stop.is_set():
+            stream = asyncio.ensure_future(record_stream(args.host, args.port, recorder, stats))
+            await asyncio.wait({stream, stopping}, return_when=asyncio.FIRST_COMPLETED)
+            if stop.is_set():
+                stream.cancel()
+                break
+            try:
+                stream.result()
+                retry_delay = 0.5
+            except OSError as e:
+                print(f"Connection failed: {e}")
+            # Reconnect with backoff; the recording carries on in the same session
+            try:
+                await asyncio.wait_for(stop.wait(), retry_delay)
+            except asyncio.TimeoutError:
+                pass
+            retry_delay = min(retry_delay * 2, 5.0)
+    finally:
+        stop.set()
+        await reporter
+        recorder.stop()
+        print(f"Recorded {recorder.rows_written} rows to {recorder.path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record DAQ telemetry without the GUI")
+    parser.add_argument("--host", default="127.0.0.1", help="DAQ server address")
+    parser.add_argument("--port", type=int, default=5000, help="DAQ server port")
+    parser.add_argument("--output", help="Session directory (default: a new one under recordings/)")
+    parser.add_argument("--segment-seconds", type=float, default=120.0, help="Length of each segment file")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds")
+    parser.add_argument("--stats-interval", type=float, default=10.0, help="Seconds between progress reports")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,212 @@
+import bisect
+import threading
+
+# Lightweight metrics for the DAQ hot paths.
+#
+# Updating a metric is a plain attribute update (no locks, no formatting); all the work
+# happens when the registry is rendered, either as Prometheus text for the local HTTP
+# endpoint or as a compact dict for the "Diagnostics" message sent to the pitwall.
+# Increments from several threads can in principle race under the GIL and lose a count,
+# which is acceptable for diagnostics and keeps the hot paths cheap.
+
+# Latency buckets in seconds, from 0.1 ms up to 1 s
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def snapshot(self):
+        return self.value
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self):
+        self.value = 0
+        self.function = None
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set_function(self, function):
+        """Compute the value when the registry is read, e.g. a queue depth."""
+        self.function = function
+
+    def get(self):
+        if self.function is None:
+            return self.value
+        try:
+            return self.function()
+        except Exception:
+            return float("nan")
+
+    def snapshot(self):
+        return self.get()
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is one bisect and two additions."""
+
+    kind = "histogram"
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (None before any observations)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self):
+        mean = self.sum / self.count if self.count else None
+        return {"count": self.count, "mean": mean, "p95": self.quantile(0.95)}
+
+
+class Family:
+    """A named metric, optionally split by label values into child metrics."""
+
+    def __init__(self, name, help, metric_type, labels, **kwargs):
+        self.name = name
+        self.help = help
+        self.metric_type = metric_type
+        self.label_names = labels
+        self.kwargs = kwargs
+        self.children = {}
+        self.lock = threading.Lock()
+        self.metric = None if labels else metric_type(**kwargs)
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(values, self.metric_type(**self.kwargs))
+        return child
+
+    def remove(self, *values):
+        with self.lock:
+            self.children.pop(values, None)
+
+    def items(self):
+        if self.metric is not None:
+            return [((), self.metric)]
+        with self.lock:
+            return list(self.children.items())
+
+
+class MetricsRegistry:
+    def __init__(self, prefix="daq_"):
+        self.prefix = prefix
+        self.families = {}
+        self.lock = threading.Lock()
+
+    def _register(self, name, help, metric_type, labels, **kwargs):
+        with self.lock:
+            family = self.families.get(name)
+            if family is None:
+                family = self.families[name] = Family(name, help, metric_type, labels, **kwargs)
+        return family if labels else family.metric
+
+    def counter(self, name, help="", labels=()):
+        return self._register(name, help, Counter, labels)
+
+    def gauge(self, name, help="", labels=()):
+        return self._register(name, help, Gauge, labels)
+
+    def histogram(self, name, help="", buckets=LATENCY_BUCKETS, labels=()):
+        return self._register(name, help, Histogram, labels, buckets=buckets)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            families = list(self.families.values())
+        for family in families:
+            name = self.prefix + family.name
+            lines.append(f"# HELP {name} {family.help}")
+            lines.append(f"# TYPE {name} {family.metric_type.kind}")
+            for values, metric in family.items():
+                pairs = [f'{key}="{value}"' for key, value in zip(family.label_names, values)]
+                label_text = "{" + ",".join(pairs) + "}" if pairs else ""
+                if family.metric_type is Histogram:
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets + (float("inf"),), metric.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        bucket_labels = ",".join(pairs + [f'le="{le}"'])
+                        lines.append(f"{name}_bucket{{{bucket_labels}}} {cumulative}")
+                    lines.append(f"{name}_sum{label_text} {metric.sum}")
+                    lines.append(f"{name}_count{label_text} {metric.count}")
+                else:
+                    lines.append(f"{name}{label_text} {metric.snapshot()}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """Compact {name: value} view for the pitwall; labelled metrics become {label: value}."""
+        with self.lock:
+            families = list(self.families.values())
+        data = {}
+        for family in families:
+            if family.metric is not None:
+                data[family.name] = family.metric.snapshot()
+            else:
+                data[family.name] = {",".join(map(str, values)): metric.snapshot()
+                                     for values, metric in family.items()}
+        return data
+
+
+# Registry shared by server.py and sensor_reading.py
+REGISTRY = MetricsRegistry()
+
+
+def serve(port, registry=REGISTRY, host="127.0.0.1"):
+    """Serve the registry at http://host:port/metrics on a daemon thread; returns the server."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Scrapes are not worth a line on the console
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
@@ -0,0 +1,477 @@
+import argparse
+import csv
+import json
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+import numpy as np
+from flattener import SchemaFlattener
+
+# Recording file layout:
+#   MAGIC, then any number of chunks, each one
+#   <u32 header length> <JSON header> <column blobs in header order>
+# The header lists every column present in the chunk with its type and blob
+# sizes, so later chunks can carry channels that did not exist earlier on.
+MAGIC = b"DAQREC1\n"
+CHUNK_HEADER = struct.Struct("<I")
+
+RECEIVE_TIME_COLUMN = "Receive Time"
+
+# Segmented sessions: a directory of time-bounded segment files plus an index
+INDEX_FILE = "index.json"
+SEGMENT_PATTERN = "segment_{:04d}.daq"
+
+# Column types stored on disk
+INT_TYPE = "i8"
+FLOAT_TYPE = "f8"
+STR_TYPE = "str"
+
+
+def infer_column_type(values):
+    """Pick the narrowest on-disk type that holds every non-null value."""
+    column_type = None
+    for v in values:
+        if v is None:
+            continue
+        if isinstance(v, (bool, int)):
+            if column_type is None:
+                column_type = INT_TYPE
+        elif isinstance(v, float):
+            if column_type in (None, INT_TYPE):
+                column_type = FLOAT_TYPE
+        else:
+            return STR_TYPE
+    return column_type or FLOAT_TYPE
+
+
+def encode_column(values, column_type, level=6):
+    """Encode one column of a chunk into (header entry, list of compressed blobs)."""
+    entry = {"type": column_type}
+    blobs = []
+    if column_type == STR_TYPE:
+        text = [None if v is None else v if isinstance(v, str) else str(v) for v in values]
+        blobs.append(zlib.compress(json.dumps(text).encode("utf-8"), level))
+    elif column_type == INT_TYPE:
+        mask = np.fromiter((v is not None for v in values), dtype=bool, count=len(values))
+        array = np.fromiter((0 if v is None else int(v) for v in values), dtype="<i8", count=len(values))
+        blobs.append(zlib.compress(array.tobytes(), level))
+        if not mask.all():
+            entry["nulls"] = True
+            blobs.append(zlib.compress(np.packbits(mask).tobytes(), level))
+    else:
+        array = np.fromiter((np.nan if v is None else float(v) for v in values), dtype="<f8", count=len(values))
+        blobs.append(zlib.compress(array.tobytes(), level))
+    entry["sizes"] = [len(b) for b in blobs]
+    return entry, blobs
+
+
+def decode_column(entry, blobs, rows):
+    """Inverse of encode_column; integer columns with nulls come back as object arrays."""
+    column_type = entry["type"]
+    if column_type == STR_TYPE:
+        return json.loads(zlib.decompress(blobs[0]).decode("utf-8"))
+    if column_type == INT_TYPE:
+        array = np.frombuffer(zlib.decompress(blobs[0]), dtype="<i8")
+        if entry.get("nulls"):
+            mask = np.unpackbits(np.frombuffer(zlib.decompress(blobs[1]), dtype=np.uint8), count=rows).astype(bool)
+            array = array.astype(object)
+            array[~mask] = None
+        return array
+    return np.frombuffer(zlib.decompress(blobs[0]), dtype="<f8")
+
+
+def write_chunk(f, columns, rows, level=6):
+    """Write one chunk of {name: values} with `rows` rows to an open file."""
+    entries = []
+    payload = []
+    for name, values in columns.items():
+        entry, blobs = encode_column(values, infer_column_type(values), level)
+        entry["name"] = name
+        entries.append(entry)
+        payload.extend(blobs)
+    header = json.dumps({"rows": rows, "columns": entries}).encode("utf-8")
+    f.write(CHUNK_HEADER.pack(len(header)))
+    f.write(header)
+    for blob in payload:
+        f.write(blob)
+
+
+def read_chunks(path):
+    """Yield (rows, {name: values}) for each complete chunk in a recording file.
+
+    A chunk cut short or garbled by a crash ends the iteration instead of
+    raising, so everything written before it is still readable.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a DAQ recording")
+        while True:
+            raw_length = f.read(CHUNK_HEADER.size)
+            if len(raw_length) < CHUNK_HEADER.size:
+                return
+            (length,) = CHUNK_HEADER.unpack(raw_length)
+            raw_header = f.read(length)
+            if len(raw_header) < length:
+                return
+            try:
+                header = json.loads(raw_header)
+                columns = {}
+                for entry in header["columns"]:
+                    blobs = []
+                    for size in entry["sizes"]:
+                        blob = f.read(size)
+                        if len(blob) < size:
+                            return
+                        blobs.append(blob)
+                    columns[entry["name"]] = decode_column(entry, blobs, header["rows"])
+            except (ValueError, KeyError, zlib.error) as e:
+                print(f"Stopped reading {path} at a damaged chunk: {e}")
+                return
+            yield header["rows"], columns
+
+
+def chunk_stats(columns, rows):
+    """Summarise a chunk for the session index: time range, row count and per-channel min/max."""
+    times = [t for t in columns.get(RECEIVE_TIME_COLUMN, ()) if t is not None]
+    channels = {}
+    for name, values in columns.items():
+        numbers = [v for v in values if isinstance(v, (int, float)) and not isinstance(v, bool) and v == v]
+        if numbers:
+            channels[name] = [min(numbers), max(numbers)]
+    return {
+        "first_time": min(times) if times else None,
+        "last_time": max(times) if times else None,
+        "rows": rows,
+        "channels": channels,
+    }
+
+
+def merge_stats(summary, stats):
+    """Fold one chunk's stats into a segment summary in place."""
+    if stats["first_time"] is not None:
+        if summary["first_time"] is None or stats["first_time"] < summary["first_time"]:
+            summary["first_time"] = stats["first_time"]
+        if summary["last_time"] is None or stats["last_time"] > summary["last_time"]:
+            summary["last_time"] = stats["last_time"]
+    summary["rows"] += stats["rows"]
+    for name, (low, high) in stats["channels"].items():
+        bounds = summary["channels"].get(name)
+        if bounds is None:
+            summary["channels"][name] = [low, high]
+        else:
+            bounds[0] = min(bounds[0], low)
+            bounds[1] = max(bounds[1], high)
+
+
+def write_index(session_dir, index):
+    """Atomically replace a session's index file."""
+    path = os.path.join(session_dir, INDEX_FILE)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(index, f, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def rebuild_index(session_dir):
+    """Rebuild a session index by scanning its segment files (e.g. after a crash)."""
+    segments = []
+    for name in sorted(os.listdir(session_dir)):
+        if not (name.startswith("segment_") and name.endswith(".daq")):
+            continue
+        summary = {"file": name, "first_time": None, "last_time": None, "rows": 0, "channels": {}}
+        try:
+            for rows, chunk in read_chunks(os.path.join(session_dir, name)):
+                merge_stats(summary, chunk_stats({k: [v.item() if isinstance(v, np.generic) else v for v in vals]
+                                                  for k, vals in chunk.items()}, rows))
+        except (OSError, ValueError) as e:
+            print(f"Skipping unreadable segment {name}: {e}")
+            continue
+        segments.append(summary)
+    index = {"session": os.path.basename(os.path.normpath(session_dir)), "segments": segments}
+    write_index(session_dir, index)
+    return index
+
+
+def load_index(session_dir):
+    """Load a session index, rebuilding it if it is missing or unreadable."""
+    try:
+        with open(os.path.join(session_dir, INDEX_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return rebuild_index(session_dir)
+
+
+def recording_files(path, start=None, end=None):
+    """List the files holding a recording, limited to segments overlapping [start, end].
+
+    `path` may be a single .daq file or a segmented session directory;
+    `start`/`end` are absolute receive times (seconds since the epoch).
+    """
+    if not os.path.isdir(path):
+        return [path]
+    files = []
+    for segment in load_index(path)["segments"]:
+        first, last = segment["first_time"], segment["last_time"]
+        if first is not None:
+            if end is not None and first > end:
+                continue
+            if start is not None and last < start:
+                continue
+        files.append(os.path.join(path, segment["file"]))
+    return files
+
+
+def iter_chunks(path, start=None, end=None):
+    """Yield (rows, columns) across every file of a recording; a damaged segment is skipped."""
+    for file_path in recording_files(path, start, end):
+        try:
+            yield from read_chunks(file_path)
+        except (OSError, ValueError) as e:
+            print(f"Skipping unreadable segment {file_path}: {e}")
+
+
+def load_columns(path, start=None, end=None):
+    """Read a recording into {name: list of values}, nulls as None.
+
+    Columns are unioned across chunks in first-seen order; rows from chunks
+    that predate a column are filled with None. `start`/`end` select which
+    segments of a session are read.
+    """
+    columns = {}
+    total_rows = 0
+    for rows, chunk in iter_chunks(path, start, end):
+        for name, values in chunk.items():
+            if name not in columns:
+                columns[name] = [None] * total_rows
+            columns[name].extend(v.item() if isinstance(v, np.generic) else v for v in values)
+        total_rows += rows
+        for values in columns.values():
+            if len(values) < total_rows:
+                values.extend([None] * (total_rows - len(values)))
+    return columns
+
+
+def load_dataframe(path, start=None, end=None):
+    """Read a recording into a pandas DataFrame (pandas is only needed here).
+
+    With `start`/`end` only the overlapping segments are read, and rows are
+    trimmed to that receive-time range.
+    """
+    import pandas as pd
+    frames = []
+    for rows, chunk in iter_chunks(path, start, end):
+        frames.append(pd.DataFrame({name: values for name, values in chunk.items()}, index=range(rows)))
+    if not frames:
+        return pd.DataFrame()
+    data = pd.concat(frames, ignore_index=True, sort=False)
+    if (start is not None or end is not None) and RECEIVE_TIME_COLUMN in data:
+        times = data[RECEIVE_TIME_COLUMN]
+        keep = times.notna()
+        if start is not None:
+            keep &= times >= start
+        if end is not None:
+            keep &= times <= end
+        data = data[keep].reset_index(drop=True)
+    return data
+
+
+def convert_to_csv(path, csv_path):
+    """Convert a recording to a CSV file with one column per channel; nulls become empty cells."""
+    columns = load_columns(path)
+    names = list(columns.keys())
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(names)
+        for row in zip(*(columns[name] for name in names)):
+            writer.writerow("" if v is None else v for v in row)
+
+
+class ColumnarRecorder:
+    """Records received messages on a background writer thread.
+
+    `record` only timestamps the message and puts it on a queue, so the
+    receive thread never touches the disk. The writer thread flattens
+    messages into rows with a SchemaFlattener and flushes them as
+    compressed, typed column chunks every `flush_interval` seconds or
+    `chunk_rows` rows.
+    """
+
+    def __init__(self, path, flush_interval=2.0, chunk_rows=5000, compression_level=6):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.chunk_rows = chunk_rows
+        self.compression_level = compression_level
+        self.rows_written = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._file = None
+        # Rows of the chunk being built; the receive time is always column 0
+        self._flattener = SchemaFlattener(leading_columns=(RECEIVE_TIME_COLUMN,))
+        self._rows = []
+
+    def start(self):
+        self._open()
+        self._thread = threading.Thread(target=self._writer_loop, name="recorder", daemon=True)
+        self._thread.start()
+
+    def _open(self):
+        self._file = open(self.path, "wb")
+        self._file.write(MAGIC)
+
+    def _close(self):
+        self._file.close()
+
+    def record(self, message, receive_time=None):
+        """Queue a message for writing; safe to call from any thread."""
+        self._queue.put((time.time() if receive_time is None else receive_time, message))
+
+    def pending(self):
+        """Messages queued but not yet taken by the writer thread."""
+        return self._queue.qsize()
+
+    def stop(self):
+        """Flush everything queued so far and close the file."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def _writer_loop(self):
+        next_flush = time.monotonic() + self.flush_interval
+        try:
+            while True:
+                timeout = max(next_flush - time.monotonic(), 0)
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = False
+                if item is None:
+                    break
+                if item:
+                    self._append(*item)
+                if len(self._rows) >= self.chunk_rows or time.monotonic() >= next_flush:
+                    self._flush()
+                    next_flush = time.monotonic() + self.flush_interval
+        finally:
+            self._flush()
+            self._close()
+
+    def _append(self, receive_time, message):
+        row = self._flattener.flatten(message)
+        row[0] = receive_time
+        self._rows.append(row.copy())
+
+    def _flush(self):
+        rows = self._rows
+        if not rows:
+            return
+        names = self._flattener.columns
+        # Rows recorded before a channel first appeared are shorter; pad them with nulls
+        width = len(names)
+        if len(rows[0]) < width:
+            rows = [row if len(row) == width else row + [None] * (width - len(row)) for row in rows]
+        # Channels that went quiet for the whole chunk are left out; readers fill them with nulls
+        columns = {}
+        for name, values in zip(names, zip(*rows)):
+            if name == RECEIVE_TIME_COLUMN or any(v is not None for v in values):
+                columns[name] = values
+        self._write(columns, len(rows))
+        self.rows_written += len(rows)
+        self._rows = []
+
+    def _write(self, columns, rows):
+        write_chunk(self._file, columns, rows, self.compression_level)
+        self._file.flush()
+
+
+class SegmentedRecorder(ColumnarRecorder):
+    """Columnar recorder that splits a session into time-bounded segment files.
+
+    Each session gets its own directory, so a new recording never overwrites
+    an old one. Chunks are fsynced as they are written and the index is
+    replaced atomically after each one, so a crash or power loss costs at
+    most the last unflushed chunk; a damaged segment only loses its own
+    minutes because every other segment is a separate file.
+    """
+
+    def __init__(self, session_dir, segment_seconds=120.0, **kwargs):
+        super().__init__(session_dir, **kwargs)
+        self.segment_seconds = segment_seconds
+        self._segment_number = 0
+        self._segment_started = None
+        self._index = None
+
+    def _open(self):
+        self.path = create_session_dir(self.path)
+        self._index = {"session": os.path.basename(os.path.normpath(self.path)), "segments": []}
+        self._open_segment()
+
+    def _open_segment(self):
+        self._segment_number += 1
+        name = SEGMENT_PATTERN.format(self._segment_number)
+        self._file = open(os.path.join(self.path, name), "wb")
+        self._file.write(MAGIC)
+        self._segment_started = time.monotonic()
+        self._index["segments"].append(
+            {"file": name, "first_time": None, "last_time": None, "rows": 0, "channels": {}})
+
+    def _write(self, columns, rows):
+        write_chunk(self._file, columns, rows, self.compression_level)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        merge_stats(self._index["segments"][-1], chunk_stats(columns, rows))
+        write_index(self.path, self._index)
+        if time.monotonic() - self._segment_started >= self.segment_seconds:
+            self._file.close()
+            self._open_segment()
+
+    def _close(self):
+        self._file.close()
+        # Drop a trailing segment that never received a chunk
+        if self._index["segments"] and self._index["segments"][-1]["rows"] == 0:
+            os.remove(os.path.join(self.path, self._index["segments"].pop()["file"]))
+        write_index(self.path, self._index)
+
+
+def new_session_dir(root="recordings"):
+    """Return a fresh, timestamped session directory path under `root`."""
+    return os.path.join(root, time.strftime("session_%Y%m%d_%H%M%S", time.localtime()))
+
+
+def create_session_dir(path):
+    """Create the session directory `path`, or `path-2`, `path-3`, ... if a session already has
+    it (e.g. two started in the same second); returns the directory created."""
+    path = os.path.normpath(path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    candidate, n = path, 1
+    while True:
+        try:
+            os.mkdir(candidate)
+            return candidate
+        except FileExistsError:
+            n += 1
+            candidate = f"{path}-{n}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DAQ recording tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    to_csv = subparsers.add_parser("to-csv", help="Convert a recording or session to CSV")
+    to_csv.add_argument("recording")
+    to_csv.add_argument("csv_path")
+    reindex = subparsers.add_parser("reindex", help="Rebuild a session index from its segments")
+    reindex.add_argument("session_dir")
+    args = parser.parse_args()
+
+    if args.command == "to-csv":
+        convert_to_csv(args.recording, args.csv_path)
+        print(f"Wrote {args.csv_path}")
+    elif args.command == "reindex":
+        index = rebuild_index(args.session_dir)
+        print(f"Indexed {len(index['segments'])} segments in {args.session_dir}")
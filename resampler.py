@@ -0,0 +1,126 @@
+import collections
+
+# Key every source uses for its monotonic capture stamp (see sensor_reading)
+CAPTURE_KEY = "Capture Time"
+
+HOLD = "hold"
+LINEAR = "linear"
+
+
+def _interpolates(key, v0, v1):
+    """Only continuous channels are interpolated: floats, and the capture stamp itself. Integers,
+    flags and strings (RPM, gear, neutral flag, errors) are always held."""
+    if key == CAPTURE_KEY:
+        return isinstance(v0, int) and isinstance(v1, int)
+    return type(v0) is float and type(v1) is float
+
+
+class GridResampler:
+    """Aligns asynchronous sources onto a common monotonic time grid.
+
+    Each source pushes its samples (dicts stamped with "Capture Time") as
+    they are read. `frames(now_ns)` then emits one frame per grid tick up
+    to `now_ns - delay_ns`, every channel resampled to the tick time by
+    sample-and-hold or linear interpolation (float channels only; integers,
+    flags and strings are always held). The delay gives late sources time
+    to deliver the sample after a tick so it can be interpolated rather
+    than held. Only a short window of samples is kept per channel, so the
+    work per tick is constant.
+
+    Each source's "Capture Time" is carried as a channel too: the time its
+    values stand for (the tick when all of them are interpolated, the
+    older sample's stamp when any is held), so it stays paired with stamps
+    such as the GPS fix's UTC time. Each frame also reports, per channel,
+    how old the newest sample used for it is at the tick time
+    ("Staleness", in ms).
+
+    A channel is dropped once a newer sample of its source no longer
+    carries it, or when it has had no sample for `max_age_ns`.
+    """
+
+    def __init__(self, rate_hz=10, mode=LINEAR, delay_ns=200_000_000, window=32, max_age_ns=None):
+        if mode not in (HOLD, LINEAR):
+            raise ValueError(f"Unknown resampling mode: {mode}")
+        self.period_ns = int(1e9 / rate_hz)
+        self.mode = mode
+        self.delay_ns = delay_ns
+        self.window = window
+        self.max_age_ns = max_age_ns
+        # {source: {channel: deque of (capture ns, value)}}
+        self._channels = {}
+        # {source: capture ns of its newest sample}
+        self._latest = {}
+        self._next_tick = None
+
+    def add(self, source, sample):
+        """Buffer one sample from a source; samples without a capture time are ignored."""
+        capture_ns = sample.get(CAPTURE_KEY)
+        if not isinstance(capture_ns, int):
+            return
+        channels = self._channels.setdefault(source, {})
+        self._latest[source] = max(self._latest.get(source, capture_ns), capture_ns)
+        for key, value in sample.items():
+            history = channels.get(key)
+            if history is None:
+                history = channels[key] = collections.deque(maxlen=self.window)
+            elif history and capture_ns <= history[-1][0]:
+                continue  # Cached re-reads of the same sample carry the same stamp
+            history.append((capture_ns, value))
+        if self._next_tick is None:
+            # Start the grid on the first tick after the first sample
+            self._next_tick = (capture_ns // self.period_ns + 1) * self.period_ns
+
+    def frames(self, now_ns):
+        """Return the aligned frames for every grid tick that is now due."""
+        frames = []
+        if self._next_tick is None:
+            return frames
+        last_due = now_ns - self.delay_ns
+        if last_due - self._next_tick > self.window * self.period_ns:
+            # Fell far behind (e.g. the loop stalled); skip ahead rather than replay stale ticks
+            self._next_tick = (last_due // self.period_ns - self.window) * self.period_ns
+        while self._next_tick <= last_due:
+            frames.append(self._frame(self._next_tick))
+            self._next_tick += self.period_ns
+        return frames
+
+    def _frame(self, tick):
+        frame = {"Grid Time": tick}
+        staleness = {}
+        linear = self.mode == LINEAR
+        for source, channels in list(self._channels.items()):
+            latest = self._latest[source]
+            values = {}
+            ages = {}
+            held = False  # Whether any channel kept its older sample's value at this tick
+            for key, history in list(channels.items()):
+                # Drop samples that can no longer be the latest one at or before a tick
+                while len(history) > 1 and history[1][0] <= tick:
+                    history.popleft()
+                newest = history[-1][0]
+                if newest < latest <= tick or (self.max_age_ns and tick - newest > self.max_age_ns):
+                    del channels[key]  # Gone from the source's samples (e.g. a cleared "Error"), or silent
+                    continue
+                t0, v0 = history[0]
+                if t0 > tick:
+                    continue  # Channel has not produced anything yet at this tick
+                value = v0
+                if linear and len(history) > 1 and _interpolates(key, v0, history[1][1]):
+                    t1, v1 = history[1]
+                    value = v0 + (v1 - v0) * (tick - t0) / (t1 - t0)
+                    if key == CAPTURE_KEY:
+                        value = round(value)
+                elif key != CAPTURE_KEY:
+                    held = True
+                values[key] = value
+                ages[key] = round((tick - t0) / 1e6, 1)
+            if held and CAPTURE_KEY in values:
+                # Some values are the older sample's, so the stamp must be too
+                values[CAPTURE_KEY] = channels[CAPTURE_KEY][0][1]
+            if not channels:
+                del self._channels[source], self._latest[source]
+            if values:
+                frame[source] = values
+                staleness[source] = ages
+        frame["Staleness"] = staleness
+        return frame
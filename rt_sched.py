@@ -0,0 +1,105 @@
+import contextlib
+import os
+import time
+import daq_logging
+from metrics import REGISTRY
+
+# CPU affinity and real-time scheduling for the acquisition threads (Linux only).
+#
+# Both settings apply to the calling thread, and threads it starts afterwards inherit them, so
+# server.py wraps the start of acquisition in `with applied(cpus, priority):` and everything
+# else keeps the process defaults. SCHED_FIFO needs root or CAP_SYS_NICE; without it the
+# request is logged and acquisition runs with normal scheduling. Keep the priority modest: a
+# FIFO thread that never sleeps would starve the rest of its core.
+
+log = daq_logging.get_logger("rt_sched")
+
+self_test_p99 = REGISTRY.gauge("sched_self_test_p99_us", "99th percentile wake-up lateness in the startup self-test",
+                               labels=("setting",))
+
+
+def pin(cpus):
+    """Restrict the calling thread (and threads it starts) to `cpus`; returns False if not possible."""
+    if not cpus:
+        return True
+    if not hasattr(os, "sched_setaffinity"):
+        log.warning("CPU pinning is not supported on this platform")
+        return False
+    try:
+        os.sched_setaffinity(0, cpus)
+        return True
+    except OSError as e:
+        log.warning("Could not pin to CPUs %s: %s", sorted(cpus), e)
+        return False
+
+
+def set_fifo(priority):
+    """Run the calling thread under SCHED_FIFO at `priority` (1-99); returns False if not permitted."""
+    if not priority:
+        return True
+    if not hasattr(os, "SCHED_FIFO"):
+        log.warning("SCHED_FIFO is not supported on this platform")
+        return False
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+        return True
+    except PermissionError:
+        log.warning("SCHED_FIFO priority %d needs root or CAP_SYS_NICE; using normal scheduling", priority)
+    except OSError as e:
+        log.warning("Could not set SCHED_FIFO priority %d: %s", priority, e)
+    return False
+
+
+@contextlib.contextmanager
+def applied(cpus=None, priority=None):
+    """Apply `cpus` and `priority` to the calling thread for the block, then restore the previous settings.
+
+    Threads started inside the block keep the settings after it ends.
+    """
+    if not cpus and not priority:
+        yield
+        return
+    previous_cpus = os.sched_getaffinity(0) if cpus and hasattr(os, "sched_getaffinity") else None
+    previous_policy = os.sched_getscheduler(0) if priority and hasattr(os, "sched_getscheduler") else None
+    previous_param = os.sched_getparam(0) if previous_policy is not None else None
+    pin(cpus)
+    set_fifo(priority)
+    try:
+        yield
+    finally:
+        if previous_cpus is not None:
+            os.sched_setaffinity(0, previous_cpus)
+        if previous_policy is not None:
+            os.sched_setscheduler(0, previous_policy, previous_param)
+
+
+def measure_jitter(duration=1.0, period=0.001):
+    """Sleep to absolute deadlines `period` apart for `duration` seconds; returns wake-up lateness in us."""
+    lateness = []
+    deadline = time.monotonic() + period
+    end = deadline + duration
+    while deadline < end:
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        lateness.append(time.monotonic() - deadline)
+        deadline += period
+    lateness.sort()
+    return {
+        "p50_us": lateness[len(lateness) // 2] * 1e6,
+        "p99_us": lateness[int(len(lateness) * 0.99)] * 1e6,
+        "max_us": lateness[-1] * 1e6,
+    }
+
+
+def self_test(cpus=None, priority=None, duration=1.0):
+    """Measure scheduling jitter on the calling thread with its current settings, then with `cpus` and
+    `priority` applied; returns (before, after). Run it on a thread of its own."""
+    before = measure_jitter(duration)
+    with applied(cpus, priority):
+        after = measure_jitter(duration)
+    for name, result in (("default", before), ("acquisition", after)):
+        self_test_p99.labels(name).set(result["p99_us"])
+        log.info("Scheduling jitter (%s): p50 %.0f us, p99 %.0f us, max %.0f us",
+                 name, result["p50_us"], result["p99_us"], result["max_us"])
+    return before, after
@@ -0,0 +1,71 @@
+import threading
+import time
+import daq_logging
+from metrics import REGISTRY
+
+log = daq_logging.get_logger("scheduler")
+
+# Jitter buckets in seconds, from 50 us up to 0.5 s
+JITTER_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5)
+
+run_seconds = REGISTRY.histogram("source_read_seconds", "Time to run one source", labels=("source",))
+jitter_seconds = REGISTRY.histogram("source_jitter_seconds", "How late each run started against its deadline",
+                                    buckets=JITTER_BUCKETS, labels=("source",))
+overruns = REGISTRY.counter("source_overruns_total", "Runs that finished after the next deadline", labels=("source",))
+missed_runs = REGISTRY.counter("source_missed_runs_total", "Deadlines skipped after an overrun", labels=("source",))
+failures = REGISTRY.counter("source_failures_total", "Runs that raised an exception", labels=("source",))
+
+
+class Scheduler:
+    """Runs each source at its own rate on its own thread, against absolute monotonic deadlines.
+
+    Deadlines advance by exactly one period per run, so the rate does not
+    drift with how long a read takes. A run that ends after its next
+    deadline is an overrun; the deadlines it missed are skipped (keeping the
+    original phase) rather than run back to back. A source that is slow or
+    raises only affects its own thread.
+    """
+
+    def __init__(self, stop_event):
+        self.stop_event = stop_event
+        self.sources = []
+        self.threads = []
+
+    def add(self, name, run, rate_hz, on_result=None):
+        """Call `run()` at `rate_hz`; its result is passed to `on_result` unless it is None."""
+        self.sources.append((name, run, 1 / rate_hz, on_result))
+
+    def start(self):
+        for source in self.sources:
+            thread = threading.Thread(target=self._loop, args=source, name=f"source-{source[0]}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self.threads
+
+    def _loop(self, name, run, period, on_result):
+        run_time = run_seconds.labels(name)
+        jitter = jitter_seconds.labels(name)
+        overrun = overruns.labels(name)
+        missed = missed_runs.labels(name)
+        failed = failures.labels(name)
+        deadline = time.monotonic()
+        while not self.stop_event.is_set():
+            started = time.monotonic()
+            jitter.observe(max(started - deadline, 0.0))
+            try:
+                result = run()
+                if result is not None and on_result is not None:
+                    on_result(result)
+            except Exception as e:
+                failed.inc()
+                log.warning("Source %s failed: %s", name, e)
+            finished = time.monotonic()
+            run_time.observe(finished - started)
+
+            deadline += period
+            if finished > deadline:
+                overrun.inc()
+                skipped = int((finished - deadline) / period) + 1
+                missed.inc(skipped)
+                deadline += skipped * period
+            self.stop_event.wait(deadline - time.monotonic())
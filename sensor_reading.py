@@ -1,50 +1,127 @@
+import os
 import sys
-import serial
-import RPi.GPIO as GPIO
 import time
 import math
-import board
-import adafruit_mpu6050
-
-# Initialize I2C for MPU6050 sensor
-try:
-    i2c = board.I2C()  # uses board.SCL and board.SDA
-    # Add a delay to ensure the sensor is ready
-    time.sleep(1)
-    sensor = adafruit_mpu6050.MPU6050(i2c)
-    print("MPU6050 initialized successfully.")
-except Exception as e:
-    print(f"Failed to initialize I2C connection: {e}")
-    sensor = None
+import calendar
+from metrics import REGISTRY
+import daq_logging
+
+log = daq_logging.get_logger("sensors")
+
+# Devices are opened by the init_* functions below (server.py runs them concurrently at boot),
+# so importing this module never blocks. Until a device is up, its reader returns an error dict.
+# The driver packages are imported by the init function that needs them for the same reason.
+sensor = None
+ser = None
+arduinoSerial = None
+rs232 = None
+gps_session_active = False  # Set once start_gps has left the GPS session running
+
+# Initialize I2C for MPU6050 sensor, retrying until it answers instead of sleeping a fixed time
+def init_imu(timeout=5):
+    global sensor
+    import board
+    import adafruit_mpu6050
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            i2c = board.I2C()  # uses board.SCL and board.SDA
+            imu = adafruit_mpu6050.MPU6050(i2c)
+            imu.temperature  # Readiness probe: the sensor answers a register read
+            sensor = imu
+            log.info("MPU6050 initialized successfully.")
+            return True
+        except Exception as e:
+            if time.monotonic() >= deadline:
+                log.error("Failed to initialize I2C connection: %s", e)
+                return False
+            time.sleep(0.1)
+
+# Serial port paths; the environment can point them elsewhere, e.g. at the pseudo-terminals
+# of test_applications/hil_simulator.py
+MODEM_PORT = os.environ.get("DAQ_MODEM_PORT", "/dev/ttyS0")
+ARDUINO_PORT = os.environ.get("DAQ_ARDUINO_PORT", "/dev/ttyAMA2")
+RS232_PORT = os.environ.get("DAQ_RS232_PORT", "/dev/ttyAMA5")
 
 # Initialize serial connections (ttyS0 for SIM7600X, ttyAMA2 for Arduino, ttyAMA5 for RS232)
-ser = serial.Serial('/dev/ttyS0', 115200)
-ser.flushInput()
+def init_serial_ports():
+    global ser, arduinoSerial, rs232
+    import serial
+    ser = serial.Serial(MODEM_PORT, 115200)
+    ser.flushInput()
 
-arduinoSerial = serial.Serial('/dev/ttyAMA2', 9600, timeout=1)
-arduinoSerial.flush()
+    arduinoSerial = serial.Serial(ARDUINO_PORT, 9600, timeout=1)
+    arduinoSerial.flush()
 
-rs232 = serial.Serial('/dev/ttyAMA5', 19200, timeout=1)
-rs232.flush() 
+    rs232 = serial.Serial(RS232_PORT, 19200, timeout=1)
+    rs232.flush()
+    return True
+
+# Send an AT command and return the reply as soon as `expect` (or ERROR) arrives, or None on timeout
+def at_command(command, expect='OK', timeout=1.0):
+    ser.reset_input_buffer()
+    ser.write((command + '\r\n').encode())
+    reply = b''
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if ser.in_waiting:
+            reply += ser.read(ser.in_waiting)
+            if expect.encode() in reply or b'ERROR' in reply:
+                return reply.decode(errors='replace')
+        time.sleep(0.01)
+    return None
+
+# Readiness probe for the SIM7600X: poll "AT" until it answers OK
+def wait_for_modem(timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        reply = at_command('AT', 'OK', 0.5)
+        if reply and 'OK' in reply:
+            return True
+    return False
+
+# Start the GPS session once and leave it running, so readings do not have to wait for it
+def start_gps():
+    global gps_session_active
+    reply = at_command('AT+CGPS=1,1', 'OK', 2)
+    # ERROR here usually means the session is already running
+    gps_session_active = reply is not None
+    return gps_session_active
 
 power_key = 6
 
+# Hot-path metrics (see metrics.py); served by server.py and sent to the pitwall as diagnostics
+rs232_bytes = REGISTRY.counter("rs232_bytes_total", "Bytes read from the ECU RS232 link")
+rs232_frames = REGISTRY.counter("rs232_frames_total", "ECU frames decoded")
+rs232_checksum_failures = REGISTRY.counter("rs232_checksum_failures_total", "ECU frames failing the checksum")
+rs232_marker_errors = REGISTRY.counter("rs232_marker_errors_total", "ECU frames without end markers")
+rs232_resyncs = REGISTRY.counter("rs232_resyncs_total", "Times the ECU stream was (re)synchronised")
+rs232_discards = REGISTRY.counter("rs232_unsynced_discards_total", "Buffer trims while searching for sync")
+rs232_cached_reads = REGISTRY.counter("rs232_cached_reads_total", "Reads answered with the last good frame")
+rs232_errors = REGISTRY.counter("rs232_errors_total", "Exceptions while reading the RS232 link")
+arduino_lines = REGISTRY.counter("arduino_lines_total", "Lines parsed from the Arduino")
+arduino_errors = REGISTRY.counter("arduino_errors_total", "Arduino reads that failed to parse")
+gps_fixes = REGISTRY.counter("gps_fixes_total", "GPS fixes parsed")
+gps_no_fix = REGISTRY.counter("gps_no_fix_total", "GPS reads without a usable fix")
+imu_errors = REGISTRY.counter("imu_errors_total", "Failed IMU reads")
+
 def get_imu_data():
     # Check if the sensor is initialized
     if sensor is None:
         return {"Error": "I2C connection failed, using dummy data"}
 
-    data = {}
+    # Monotonic capture time of this IMU burst
+    data = {"Capture Time": time.monotonic_ns()}
     try:
         # Read acceleration data
         accel = sensor.acceleration
         if accel is not None:
             magnitude = math.sqrt(accel[0]**2 + accel[1]**2 + accel[2]**2) / 9.81
             data["Linear Acceleration"] = f"{magnitude:.2f} Gs"
-            print(f"Linear Acceleration: {accel}, Magnitude: {magnitude:.2f} Gs")
+            log.debug("Linear Acceleration: %s, Magnitude: %.2f Gs", accel, magnitude)
         else:
             data["Linear Acceleration"] = "N/A"
-            print("Linear Acceleration: N/A")
+            log.debug("Linear Acceleration: N/A")
 
         # Read gyroscope data
         gyro = sensor.gyro
@@ -52,28 +129,65 @@ def get_imu_data():
             data["Gyro X"] = f"{gyro[0]:.2f}"
             data["Gyro Y"] = f"{gyro[1]:.2f}"
             data["Gyro Z"] = f"{gyro[2]:.2f}"
-            print(f"Gyroscope: {gyro}")
+            log.debug("Gyroscope: %s", gyro)
         else:
             data["Gyro X"] = "N/A"
             data["Gyro Y"] = "N/A"
             data["Gyro Z"] = "N/A"
-            print("Gyroscope: N/A")
+            log.debug("Gyroscope: N/A")
 
         # Read temperature data
         temperature = sensor.temperature
         if temperature is not None:
             data["Temperature"] = f"{temperature:.2f}°C"
-            print(f"Temperature: {temperature:.2f}°C")
+            log.debug("Temperature: %.2f°C", temperature)
         else:
             data["Temperature"] = "N/A"
-            print("Temperature: N/A")
+            log.debug("Temperature: N/A")
     except Exception as e:
-        print(f"Failed to read sensor data: {e}")
+        imu_errors.inc()
+        log.warning("Failed to read sensor data: %s", e)
         return {"Error": f"Failed to read sensor data: {e}"}
 
     return data
 
-# Decode GPS data from SIM7600X module (code lifted from template)
+# Decode a +CGPSINFO reply from the SIM7600X into a fix, or None without one (code lifted from template)
+def parse_gps_info(reply, capture_time):
+    GPSDATA = str(reply).replace('\n', '').replace('\r', '').replace('AT', '').replace('+CGPSINFO', '').replace(': ', '')
+    if ",,,,,," in GPSDATA or len(GPSDATA) < 28:  # Ensure GPSDATA has the required length
+        log.debug('GPS is not ready or data is incomplete')
+        return None
+
+    try:
+        Lat = GPSDATA[:2]
+        SmallLat = GPSDATA[2:11]
+        NorthOrSouth = GPSDATA[12]
+        Long = GPSDATA[14:17]
+        SmallLong = GPSDATA[17:26]
+        EastOrWest = GPSDATA[27]
+
+        FinalLat = float(Lat) + (float(SmallLat) / 60)
+        FinalLong = float(Long) + (float(SmallLong) / 60)
+
+        if NorthOrSouth == 'S':
+            FinalLat = -FinalLat
+        if EastOrWest == 'W':
+            FinalLong = -FinalLong
+
+        fix = {"Latitude": FinalLat, "Longitude": FinalLong, "Capture Time": capture_time}
+        # Fields 4 and 5 are the fix's UTC date (ddmmyy) and time (hhmmss.s), used as a time anchor
+        fields = GPSDATA.split(',')
+        if len(fields) > 5 and len(fields[4]) == 6 and len(fields[5]) >= 6:
+            date, utc = fields[4], fields[5]
+            fix["UTC Time"] = calendar.timegm((2000 + int(date[4:6]), int(date[2:4]), int(date[0:2]),
+                                               int(utc[0:2]), int(utc[2:4]), 0)) + float(utc[4:])
+        gps_fixes.inc()
+        return fix
+    except (IndexError, ValueError) as e:
+        log.warning("Error parsing GPS data: %s", e)
+        return None
+
+# Send an AT command and decode the GPS reply after `timeout` seconds
 def send_at(command, back, timeout):
     rec_buff = ''
     ser.write((command + '\r\n').encode())
@@ -81,212 +195,238 @@ def send_at(command, back, timeout):
     if ser.inWaiting():
         time.sleep(0.01)
         rec_buff = ser.read(ser.inWaiting())
+        capture_time = time.monotonic_ns()
     if rec_buff != '':
         if back not in rec_buff.decode():
-            print(command + ' ERROR')
-            print(command + ' back:\t' + rec_buff.decode())
+            log.warning('%s ERROR, back: %s', command, rec_buff.decode(errors='replace'))
             return None
-        else:
-            GPSDATA = str(rec_buff.decode()).replace('\n', '').replace('\r', '').replace('AT', '').replace('+CGPSINFO', '').replace(': ', '')
-            if ",,,,,," in GPSDATA or len(GPSDATA) < 28:  # Ensure GPSDATA has the required length
-                print('GPS is not ready or data is incomplete')
-                return None
-
-            try:
-                Lat = GPSDATA[:2]
-                SmallLat = GPSDATA[2:11]
-                NorthOrSouth = GPSDATA[12]
-                Long = GPSDATA[14:17]
-                SmallLong = GPSDATA[17:26]
-                EastOrWest = GPSDATA[27]
-
-                FinalLat = float(Lat) + (float(SmallLat) / 60)
-                FinalLong = float(Long) + (float(SmallLong) / 60)
-
-                if NorthOrSouth == 'S':
-                    FinalLat = -FinalLat
-                if EastOrWest == 'W':
-                    FinalLong = -FinalLong
-
-                return {"Latitude": FinalLat, "Longitude": FinalLong}
-            except (IndexError, ValueError) as e:
-                print(f"Error parsing GPS data: {e}")
-                return None
+        return parse_gps_info(rec_buff.decode(), capture_time)
     else:
-        print('GPS is not ready')
+        log.debug('GPS is not ready')
         return None
 
+# Position reported while the GPS has no fix
+DUMMY_GPS = {"Latitude": 53.8067, "Longitude": 1.5550}  # Replace with your desired dummy coordinates
+
 # Get GPS data from SIM7600X module
 def get_gps_data():
-    print('Start GPS session...')
-    send_at('AT+CGPS=1,1', 'OK', 1)
-    time.sleep(2)
-    gps_data = send_at('AT+CGPSINFO', '+CGPSINFO: ', 1)
-    send_at('AT+CGPS=0', 'OK', 1)
+    if ser is None:
+        return {"Error": "Modem port not open"}
+    if gps_session_active:
+        gps_data = send_at('AT+CGPSINFO', '+CGPSINFO: ', 1)
+    else:
+        log.debug('Start GPS session...')
+        send_at('AT+CGPS=1,1', 'OK', 1)
+        time.sleep(2)
+        gps_data = send_at('AT+CGPSINFO', '+CGPSINFO: ', 1)
+        send_at('AT+CGPS=0', 'OK', 1)
     if gps_data is None:
+        gps_no_fix.inc()
         # Return dummy GPS data if the GPS is not ready
-        print("GPS is not ready. Sending dummy data.")
-        return {"Latitude": 53.8067, "Longitude": 1.5550}  # Replace with your desired dummy coordinates
+        log.info("GPS is not ready. Sending dummy data.")
+        return dict(DUMMY_GPS)
     return gps_data
 
+# Parse one line from the Arduino; raises ValueError (or UnicodeDecodeError) on a malformed line
+def parse_serial_line(line, capture_time):
+    data = line.decode('utf-8').rstrip()
+    parsed_data = {"Capture Time": capture_time}
+    # Assuming the data is in the format: "Name:VAL,Name2:VAL2"
+    for item in data.split(','):
+        key, value = item.split(':')
+        parsed_data[key.strip()] = value.strip()
+        log.debug("Parsed Serial Data: %s = %s", key.strip(), value.strip())
+    arduino_lines.inc()
+    return parsed_data
+
 # Read serial data from Arduino (analog sensor reading)
 def get_serial_data():
-    print("Reading serial data from Arduino...")
+    log.debug("Reading serial data from Arduino...")
+    if arduinoSerial is None:
+        return {"Error": "Arduino port not open"}
     try:
         if arduinoSerial.in_waiting > 0:
-            data = arduinoSerial.readline().decode('utf-8').rstrip()
-            # Assuming the data is in the format: "Name:VAL,Name2:VAL2"
-            parsed_data = {}
-            for item in data.split(','):
-                key, value = item.split(':')
-                parsed_data[key.strip()] = value.strip()
-                print(f"Parsed Serial Data: {key.strip()} = {value.strip()}")
-            return parsed_data
+            # Monotonic capture time of this line
+            return parse_serial_line(arduinoSerial.readline(), time.monotonic_ns())
         return {"Error": "No data available"}
     except Exception as e:
-        print(f"Failed to read serial data: {e}.")
+        arduino_errors.inc()
+        log.warning("Failed to read serial data: %s", e)
         return {"Error": f"Failed to read serial data: {e}"}
 
-# Global buffer to accumulate RS232 data packets
-rs232_buffer = bytearray()
-rs232_synchronized = False
+# ECU frames are 144 bytes: channel values, end markers 0xFC 0xFB 0xFA at 140-142, then a
+# checksum (sum of the first 143 bytes, low byte) at 143
+RS232_FRAME_SIZE = 144
+RS232_MARKERS = b'\xfc\xfb\xfa'
+
+def rs232_frame_valid(data):
+    return data[140:143] == RS232_MARKERS and (sum(data[:143]) & 0xFF) == data[143]
+
+# Channel values from one validated 144-byte frame
+def decode_rs232_frame(data, capture_time):
+    rpm = int.from_bytes(data[0:2], byteorder='big')
+    throttle_pos = int.from_bytes(data[2:4], byteorder='big') * 0.1
+    engine_temp = int.from_bytes(data[8:10], byteorder='big') * 0.1
+    battery_voltage = int.from_bytes(data[44:46], byteorder='big') * 0.01
+    lambda1 = int.from_bytes(data[66:68], byteorder='big') * 0.001
+    drive_speed = int.from_bytes(data[56:58], byteorder='big') * 0.1
+    ground_speed = int.from_bytes(data[58:60], byteorder='big') * 0.1
+    gear = int.from_bytes(data[104:106], byteorder='big') // 10
+
+    log.debug("RS232 Data: RPM=%s, Throttle Position=%s, Engine Temp=%s, Drive Speed=%s, Ground Speed=%s, Gear=%s",
+              rpm, throttle_pos, engine_temp, drive_speed, ground_speed, gear)
+    return {
+        'RPM': rpm,
+        'Throttle Position': throttle_pos,
+        'Engine Temperature': engine_temp,
+        'Battery Voltage': battery_voltage,
+        'Lambda 1': lambda1,
+        'Drive Speed': drive_speed,
+        'Ground Speed': ground_speed,
+        'Gear': str(gear),  # Ensure gear is a string for display
+        'Capture Time': capture_time  # Frame arrival; cached copies keep it, so staleness shows
+    }
+
+class RS232Decoder:
+    """Incremental ECU frame decoder for event-driven reads: feed() takes whatever bytes have
+    arrived and returns every complete frame in them, keeping partial frames for the next call."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.synchronized = False
+
+    def feed(self, chunk, capture_time):
+        rs232_bytes.inc(len(chunk))
+        buffer = self.buffer
+        buffer += chunk
+        frames = []
+        while True:
+            if not self.synchronized:
+                start = self._find_frame()
+                if start is None:
+                    # Keep one frame's worth so a frame split across reads is not lost
+                    if len(buffer) > 2 * RS232_FRAME_SIZE:
+                        del buffer[:-RS232_FRAME_SIZE]
+                        rs232_discards.inc()
+                    return frames
+                del buffer[:start]
+                self.synchronized = True
+                rs232_resyncs.inc()
+                log.info("RS232 synchronized successfully!")
+            if len(buffer) < RS232_FRAME_SIZE:
+                return frames
+            data = bytes(buffer[:RS232_FRAME_SIZE])
+            if rs232_frame_valid(data):
+                del buffer[:RS232_FRAME_SIZE]
+                rs232_frames.inc()
+                frames.append(decode_rs232_frame(data, capture_time))
+                continue
+            if data[140:143] == RS232_MARKERS:
+                rs232_checksum_failures.inc()
+                log.warning("RS232 checksum validation failed, losing synchronization.")
+            else:
+                rs232_marker_errors.inc()
+                log.warning("RS232 marker bytes not found, losing synchronization.")
+            self.synchronized = False
+            del buffer[:1]  # Remove one byte and try to resync
+
+    def _find_frame(self):
+        """Start of the first valid frame in the buffer, or None."""
+        i = self.buffer.find(RS232_MARKERS, 140)
+        while i != -1:
+            start = i - 140
+            if start + RS232_FRAME_SIZE > len(self.buffer):
+                return None
+            if rs232_frame_valid(self.buffer[start:start + RS232_FRAME_SIZE]):
+                return start
+            i = self.buffer.find(RS232_MARKERS, i + 1)
+        return None
+
+class SerialLineDecoder:
+    """Incremental Arduino line decoder: feed() returns a parsed sample for each complete line."""
+
+    MAX_LINE = 1024  # A longer partial line is noise, not data
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, chunk, capture_time):
+        buffer = self.buffer
+        buffer += chunk
+        samples = []
+        end = buffer.find(b'\n')
+        while end != -1:
+            line = bytes(buffer[:end])
+            del buffer[:end + 1]
+            if line.strip():
+                try:
+                    samples.append(parse_serial_line(line, capture_time))
+                except ValueError as e:  # UnicodeDecodeError is a ValueError
+                    arduino_errors.inc()
+                    log.warning("Failed to read serial data: %s", e)
+            end = buffer.find(b'\n')
+        if len(buffer) > self.MAX_LINE:
+            buffer.clear()
+            arduino_errors.inc()
+            log.warning("Arduino line too long, discarding it")
+        return samples
+
+# Placeholder values until the first frame has been decoded
+RS232_NO_DATA = {'RPM': -1, 'Throttle Position': -1, 'Engine Temperature': -1, 'Battery Voltage': -1,
+                 'Lambda 1': -1, 'Drive Speed': -1, 'Ground Speed': -1, 'Gear': -1}
+
+# Decoder state carried between polls; partial frames stay buffered for the next call
+rs232_decoder = RS232Decoder()
 last_good_rs232_data = None  # Cache for the last successfully parsed data
 
-# Function to read and process RS232 data packets synchronously
+# Read whatever the RS232 link has buffered and return the newest complete frame
 def get_rs232_data():
-    global rs232_buffer, rs232_synchronized, last_good_rs232_data
-    
+    global last_good_rs232_data
+
+    if rs232 is None:
+        return dict(RS232_NO_DATA)
+
     try:
         # Read all available data in chunks
+        frames = []
         while rs232.in_waiting > 0:
             # Read available bytes (could be partial packets)
-            available_bytes = min(rs232.in_waiting, 64)  # Read up to 64 bytes at a time
-            data_chunk = rs232.read(available_bytes)
-            rs232_buffer.extend(data_chunk)
-        
-        # If we're not synchronized, try to find the start of a valid message
-        if not rs232_synchronized:
-            # Look for marker bytes pattern (0xFC, 0xFB, 0xFA) in the buffer
-            for i in range(len(rs232_buffer) - 2):
-                if (rs232_buffer[i] == 0xFC and 
-                    rs232_buffer[i+1] == 0xFB and 
-                    rs232_buffer[i+2] == 0xFA):
-                    
-                    # Check if this could be at position 140 of a 144-byte message
-                    if i >= 140:
-                        start_pos = i - 140
-                        if start_pos + 144 <= len(rs232_buffer):
-                            # We have enough data, check if this is a valid packet
-                            test_data = rs232_buffer[start_pos:start_pos + 144]
-                            checksum = sum(test_data[:143]) & 0xFF
-                            if checksum == test_data[143]:
-                                # Found valid message! Remove everything before it
-                                rs232_buffer = rs232_buffer[start_pos:]
-                                rs232_synchronized = True
-                                print("RS232 synchronized successfully!")
-                                break
-            
-            # If still not synchronized and buffer is getting large, clear old data
-            if not rs232_synchronized and len(rs232_buffer) > 288:
-                # Keep only the last 144 bytes to avoid losing a potential message
-                rs232_buffer = rs232_buffer[-144:]
-                print("RS232 clearing old unsynchronized data")
-        
-        # If synchronized, try to process complete messages
-        if rs232_synchronized and len(rs232_buffer) >= 144:
-            # Extract the first 144 bytes
-            data = rs232_buffer[:144]
-            
-            # Confirm marker bytes at positions 140, 141, 142
-            if data[140] == 0xFC and data[141] == 0xFB and data[142] == 0xFA:
-                # Compute checksum to validate
-                checksum = sum(data[:143]) & 0xFF
-                if checksum == data[143]:
-                    # Successfully processed a packet - clear the entire buffer for fresh data next time
-                    rs232_buffer.clear()
-                    print("Successfully processed RS232 packet - buffer cleared for next call")
-                    
-                    rpm = int.from_bytes(data[0:2], byteorder='big')
-                    throttle_pos = int.from_bytes(data[2:4], byteorder='big') * 0.1
-                    engine_temp = int.from_bytes(data[8:10], byteorder='big') * 0.1
-                    battery_voltage = int.from_bytes(data[44:46], byteorder='big') * 0.01
-                    lambda1 = int.from_bytes(data[66:68], byteorder='big') * 0.001
-                    drive_speed = int.from_bytes(data[56:58], byteorder='big') * 0.1
-                    ground_speed = int.from_bytes(data[58:60], byteorder='big') * 0.1
-                    gear = int.from_bytes(data[104:106], byteorder='big') // 10
-
-                    # Cache this good data for future use
-                    last_good_rs232_data = {
-                        'RPM': rpm,
-                        'Throttle Position': throttle_pos,
-                        'Engine Temperature': engine_temp,
-                        'Battery Voltage': battery_voltage,
-                        'Lambda 1': lambda1,
-                        'Drive Speed': drive_speed,
-                        'Ground Speed': ground_speed,
-                        'Gear': str(gear)  # Ensure gear is a string for display
-                    }
-
-                    print(f"RS232 Data: RPM={rpm}, Throttle Position={throttle_pos}, Engine Temp={engine_temp}, Drive Speed={drive_speed}, Ground Speed={ground_speed}, Gear={gear}")
-
-                    return last_good_rs232_data
-                else:
-                    print("RS232 checksum validation failed, losing synchronization.")
-                    rs232_synchronized = False
-                    rs232_buffer = rs232_buffer[1:]  # Remove one byte and try to resync
-            else:
-                print("RS232 marker bytes not found, losing synchronization.")
-                rs232_synchronized = False
-                rs232_buffer = rs232_buffer[1:]  # Remove one byte and try to resync
-        
-        # Clear buffer if it gets too large (prevent memory issues)
-        if len(rs232_buffer) > 432:  # 3x expected packet size
-            print("RS232 buffer overflow, clearing buffer and losing sync.")
-            rs232_buffer.clear()
-            rs232_synchronized = False
-        
+            data_chunk = rs232.read(min(rs232.in_waiting, 256))
+            frames += rs232_decoder.feed(data_chunk, time.monotonic_ns())
+        if frames:
+            # Cache the newest good frame for future use
+            last_good_rs232_data = frames[-1]
+            return last_good_rs232_data
+
         # If not enough data or not synchronized, return last good data if available
         if last_good_rs232_data is not None:
-            print("RS232 returning cached data while waiting for new packet")
+            rs232_cached_reads.inc()
+            log.debug("RS232 returning cached data while waiting for new packet")
             return last_good_rs232_data.copy()  # Return a copy to avoid modification
-        else:
-            print("RS232 no data available and no cached data")
-            return {
-                'RPM': -1,
-                'Throttle Position': -1,
-                'Engine Temperature': -1,
-                'Battery Voltage': -1,
-                'Lambda 1': -1,
-                'Drive Speed': -1,
-                'Ground Speed': -1,
-                'Gear': -1
-            }
+        log.debug("RS232 no data available and no cached data")
+        return dict(RS232_NO_DATA)
     except Exception as e:
-        print(f"Failed to read RS232 data: {e}")
-        # Clear buffer on error to prevent corruption
-        rs232_buffer.clear()
-        rs232_synchronized = False
-        
+        rs232_errors.inc()
+        log.warning("Failed to read RS232 data: %s", e)
+        # Reset the decoder on error to prevent corruption
+        rs232_decoder.buffer.clear()
+        rs232_decoder.synchronized = False
+
         # Even on error, return last good data if available
         if last_good_rs232_data is not None:
-            print("RS232 error occurred, returning cached data")
+            log.debug("RS232 error occurred, returning cached data")
             return last_good_rs232_data.copy()
-        else:
-            return {
-                'RPM': -1,
-                'Throttle Position': -1,
-                'Engine Temperature': -1,
-                'Battery Voltage': -1,
-                'Lambda 1': -1,
-                'Drive Speed': -1,
-                'Ground Speed': -1,
-                'Gear': -1
-            }
+        return dict(RS232_NO_DATA)
 
 # Power on and power down functions for SIM7600X module
-def power_on(power_key):
+def power_on(power_key, timeout=30):
     try:
-        print('SIM7600X is starting:')
+        # Pulsing the power key toggles the module, so leave it alone if it already answers
+        if wait_for_modem(timeout=1):
+            log.info('SIM7600X is already on')
+            return True
+        import RPi.GPIO as GPIO
+        log.info('SIM7600X is starting')
         GPIO.setmode(GPIO.BCM)
         GPIO.setwarnings(False)
         GPIO.setup(power_key, GPIO.OUT)
@@ -294,20 +434,26 @@ def power_on(power_key):
         GPIO.output(power_key, GPIO.HIGH)
         time.sleep(2)
         GPIO.output(power_key, GPIO.LOW)
-        time.sleep(20)
+        # Ready as soon as it answers AT, rather than after a fixed 20 s
+        if not wait_for_modem(timeout):
+            log.error('SIM7600X did not respond')
+            return False
         ser.flushInput()
-        print('SIM7600X is ready')
+        log.info('SIM7600X is ready')
+        return True
     except Exception as e:
-        print(f"Failed to power on SIM7600X: {e}")
+        log.error("Failed to power on SIM7600X: %s", e)
+        return False
 
 def power_down(power_key):
+    import RPi.GPIO as GPIO
     try:
-        print('SIM7600X is logging off:')
+        log.info('SIM7600X is logging off')
         GPIO.output(power_key, GPIO.HIGH)
         time.sleep(3)
         GPIO.output(power_key, GPIO.LOW)
         time.sleep(18)
-        print('Goodbye')
+        log.info('Goodbye')
     except Exception as e:
-        print(f"Failed to power down SIM7600X: {e}")
+        log.error("Failed to power down SIM7600X: %s", e)
 
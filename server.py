@@ -1,34 +1,49 @@
 import socket
-import subprocess
-import re
 import time
 import json
 import math
+import select
+import struct
+import functools
 import threading
-from queue import Queue
+from queue import Queue, Empty, Full
 import os
-from PyQt5.QtWidgets import QApplication, QLabel, QMainWindow, QGridLayout, QWidget, QProgressBar
-from PyQt5.QtCore import Qt, QTimer
-from PyQt5.QtGui import QPixmap
-
-try:
-    import sensor_reading # Will only work on a Pi, so it is optional for testing mode.
-except ImportError:
-    pass
-
+import clock_sync
+import daq_logging
+from metrics import REGISTRY
+from resampler import GridResampler
+from scheduler import Scheduler
+import rt_sched
+
+# Everything else is imported by the mode that needs it, so a headless cold start does not pay
+# for Qt, the hardware drivers, numpy or the tunnel tooling until (and unless) they are used:
+#   sensor_reading (pyserial, RPi.GPIO, Adafruit) - load_sensor_drivers, outside TEST_MODE
+#   PyQt5 / dashboard                              - ui_thread, with a display
+#   fb_dashboard (numpy)                           - framebuffer_ui_thread, without one
+#   recorder (numpy)                               - start_blackbox
+#   subprocess, urllib.request                     - the ngrok tunnel, outside TEST_MODE
+#   multiprocessing, shm_ring                      - MULTIPROCESS_MODE
+#   asyncio, event_acquisition                     - ACQUISITION_MODE = "asyncio"
+# test_applications/import_budget.py fails if importing this module gets slower or pulls them in.
+sensor_reading = None
+
+
+log = daq_logging.get_logger("server")
 
 # Shared stop event for thread termination.
 stop_event = threading.Event()
 
-# Enable testing mode
-TEST_MODE = False
+# Enable testing mode (DAQ_TEST_MODE=1 turns it on without editing this file, e.g. for the load test)
+TEST_MODE = os.environ.get("DAQ_TEST_MODE") == "1"
 
 # Temporary host and port for testing
 HOST = "0.0.0.0"
 PORT = 5000
 
-# Shared data structure for sensor data
-sensor_data = Queue()
+# Shared data structure for sensor data. Bounded: without a dashboard (headless, no framebuffer)
+# nothing consumes it, and the dashboard only ever wants the newest snapshots anyway.
+UI_QUEUE_SIZE = 16
+sensor_data = Queue(maxsize=UI_QUEUE_SIZE)
 data_lock = threading.Lock()
 
 # Shared variable for the latest sensor data
@@ -40,6 +55,236 @@ latest_gps_data = {"Latitude": 53.8067, "Longitude": 1.5550}  # Default dummy da
 # Flag to track client connection status
 client_connected = False
 
+# Every snapshot carries a monotonic/wall-clock anchor, refreshed periodically, so absolute
+# time can be rebuilt from the per-source monotonic "Capture Time" stamps. It rides along in
+# each snapshot because clients only see the snapshots the network thread happens to send.
+CLOCK_ANCHOR_INTERVAL = 10  # seconds
+
+# Resample every source onto a common grid at RESAMPLE_RATE before publishing; every grid frame
+# goes to the black box, while the dashboard and clients get the newest one at PUBLISH_RATE (set
+# RESAMPLE_MODE to None to publish raw snapshots). "linear" interpolates float channels, "hold"
+# keeps the last value of every channel.
+RESAMPLE_MODE = "linear"
+RESAMPLE_RATE = 50  # Hz; above the fastest source (IMU and ECU at 20 Hz) so the black box keeps every sample
+RESAMPLE_DELAY = 0.2  # seconds a tick waits for late samples before it is emitted
+RESAMPLE_MAX_AGE = 10  # seconds without a sample before a channel is left out of the frames
+resampler = None  # GridResampler, created by start_acquisition
+
+# Run acquisition, dashboard and networking as separate processes. Acquisition publishes
+# encoded snapshots into a shared-memory seqlock ring (shm_ring.py) that the other processes
+# read without locking, so Qt repaints and client I/O never compete with serial decoding
+# for the GIL.
+MULTIPROCESS_MODE = False
+RING_SLOTS = 64
+RING_SLOT_SIZE = 16384
+shared_ring = None  # SharedRing, attached in each process in MULTIPROCESS_MODE
+shared_status = None  # {"connected": Value, "ngrok_url": Array, "diagnostics": Array} shared between processes
+
+# Black-box log on the car: every published snapshot is recorded from the moment acquisition
+# starts, whether or not a client is connected (set to None to disable).
+BLACKBOX_ROOT = "blackbox"
+blackbox = None  # SegmentedRecorder, started by start_blackbox
+
+# ngrok tunnel, polled through its local API until the public address is known
+NGROK_API = "http://localhost:4040/api/tunnels"
+TUNNEL_TIMEOUT = 30  # seconds
+
+# DAQ_TUNNEL=0 serves clients on HOST:PORT directly instead, e.g. on a desk with the sensors
+# replaced by test_applications/hil_simulator.py. TEST_MODE never uses the tunnel.
+TUNNEL = os.environ.get("DAQ_TUNNEL", "1") != "0"
+
+def use_tunnel():
+    return TUNNEL and not TEST_MODE
+
+# Boot: serial ports, IMU, modem, GPS and the tunnel come up concurrently, each stage finishing
+# on a readiness probe (port opens, sensor answers, AT OK, tunnel API answers) instead of a fixed
+# sleep. Acquisition starts straight away and picks each source up as its stage completes.
+BOOT_STARTED = time.monotonic()
+boot_timeline = []  # (stage, start s, end s, outcome), relative to BOOT_STARTED
+boot_pending = set()  # Stages still expected before the timeline is printed
+boot_lock = threading.Lock()
+gps_ready = threading.Event()  # Set once the GPS stage has finished (successfully or not)
+
+def expect_boot_stages(*names):
+    with boot_lock:
+        boot_pending.update(names)
+
+def record_boot_stage(name, started, outcome):
+    with boot_lock:
+        boot_timeline.append((name, started - BOOT_STARTED, time.monotonic() - BOOT_STARTED, outcome))
+        boot_pending.discard(name)
+        finished = not boot_pending
+    log.info("Boot: %s %s at %.2f s", name, outcome, time.monotonic() - BOOT_STARTED)
+    if finished:
+        print_boot_timeline()
+
+def print_boot_timeline():
+    with boot_lock:
+        stages = sorted(boot_timeline, key=lambda stage: stage[1])
+    log.info("Boot timeline:\n%s", "\n".join(f"  {name:<16}{start:6.2f} -> {end:6.2f} s  {outcome}"
+                                             for name, start, end, outcome in stages))
+
+def run_boot_stage(name, stage):
+    """Run one boot stage, recording it in the timeline; returns the stage's result (None on error)."""
+    started = time.monotonic()
+    try:
+        result = stage()
+    except Exception as e:
+        record_boot_stage(name, started, f"failed ({e})")
+        return None
+    record_boot_stage(name, started, "ok" if result else "failed")
+    return result
+
+def load_sensor_drivers():
+    """Import the hardware drivers (the Pi, or the HIL simulator on a desk); TEST_MODE never calls it."""
+    global sensor_reading
+    import sensor_reading
+
+def start_acquisition():
+    """Boot the hardware in the background and start acquisition and black-box logging at once."""
+    global resampler
+    expect_boot_stages("first snapshot")
+    if RESAMPLE_MODE:
+        resampler = GridResampler(RESAMPLE_RATE, RESAMPLE_MODE, int(RESAMPLE_DELAY * 1e9),
+                                  max_age_ns=int(RESAMPLE_MAX_AGE * 1e9))
+    if not TEST_MODE:
+        load_sensor_drivers()
+        expect_boot_stages("serial ports", "modem", "gps", "imu")
+        boot_hardware()
+    start_blackbox()
+    if SCHED_SELF_TEST and (ACQUISITION_CPUS or ACQUISITION_FIFO_PRIORITY):
+        expect_boot_stages("sched self-test")
+        threading.Thread(target=run_boot_stage, name="sched-self-test", daemon=True,
+                         args=("sched self-test", lambda: rt_sched.self_test(
+                             ACQUISITION_CPUS, ACQUISITION_FIFO_PRIORITY, SCHED_SELF_TEST))).start()
+    readers = source_readers()
+    threads = []
+    # Acquisition threads inherit the CPU set and priority of the thread that starts them
+    with rt_sched.applied(ACQUISITION_CPUS, ACQUISITION_FIFO_PRIORITY):
+        if ACQUISITION_MODE == "asyncio" and not TEST_MODE:
+            from event_acquisition import EventAcquisition
+            events = EventAcquisition(store_sample, stop_event, gps_ready, SOURCE_RATES["GPS Data"])
+            threads.append(events.start())
+            readers = {source: read for source, read in readers.items() if source not in EVENT_SOURCES}
+        scheduler = Scheduler(stop_event)
+        for source, read in readers.items():
+            scheduler.add(source, read, SOURCE_RATES[source], functools.partial(store_sample, source))
+        scheduler.add("publish", publish_latest, PUBLISH_RATE)
+        return threads + scheduler.start()
+
+def boot_hardware():
+    """Start the hardware boot stages in the background; acquisition does not wait for them."""
+    def ports_modem_gps():
+        # The modem and GPS talk over the SIM7600X port, so they follow the serial ports
+        stages = [
+            ("serial ports", sensor_reading.init_serial_ports),
+            ("modem", lambda: sensor_reading.power_on(sensor_reading.power_key)),
+            ("gps", sensor_reading.start_gps),
+        ]
+        failed = False
+        for name, stage in stages:
+            if failed:
+                record_boot_stage(name, time.monotonic(), "skipped")
+            else:
+                failed = not run_boot_stage(name, stage)
+        gps_ready.set()  # Without a running session the GPS thread falls back to per-read sessions
+
+    threading.Thread(target=ports_modem_gps, name="boot-serial", daemon=True).start()
+    threading.Thread(target=run_boot_stage, args=("imu", sensor_reading.init_imu), name="boot-imu", daemon=True).start()
+
+def start_blackbox():
+    global blackbox
+    if BLACKBOX_ROOT:
+        from recorder import SegmentedRecorder, new_session_dir
+        blackbox = SegmentedRecorder(new_session_dir(BLACKBOX_ROOT))
+        blackbox.start()
+        blackbox_queue_depth.set_function(blackbox.pending)
+        log.info("Black-box logging to %s", blackbox.path)
+
+# Local Prometheus endpoint (http://127.0.0.1:METRICS_PORT/metrics; None to disable). Clients
+# also get the same numbers as a {"Diagnostics": {...}} message every DIAGNOSTICS_INTERVAL.
+# In MULTIPROCESS_MODE each process serves its own registry on METRICS_PORT + its role index,
+# and the acquisition process shares its snapshot with the network process, which merges it
+# into the clients' diagnostics so the decoder and scheduler counters still reach the pitwall.
+METRICS_PORT = 9108
+DIAGNOSTICS_INTERVAL = 5  # seconds
+DIAGNOSTICS_SIZE = 16384  # bytes of shared memory for the acquisition process's snapshot
+
+# Snapshots per second sent to each connected client (the newest one each time). DAQ_CLIENT_RATE
+# overrides it. A client that reads slowly skips snapshots while more than CLIENT_QUEUE_LIMIT
+# bytes it has not acknowledged are queued (0: until it has acknowledged the last one), so its
+# data is never staler than what its own receive buffer holds.
+CLIENT_SEND_RATE = float(os.environ.get("DAQ_CLIENT_RATE", 1))
+CLIENT_QUEUE_LIMIT = 0  # bytes
+CLIENT_OUTGOING_LIMIT = 65536  # bytes of pongs a client may leave unread before it is dropped
+
+snapshots_published = REGISTRY.counter("snapshots_published_total", "Snapshots published to dashboard and clients")
+gps_fix_age = REGISTRY.gauge("gps_fix_age_seconds", "Age of the newest GPS fix")
+ui_queue_depth = REGISTRY.gauge("ui_queue_depth", "Snapshots waiting for the dashboard")
+blackbox_queue_depth = REGISTRY.gauge("blackbox_queue_depth", "Snapshots waiting for the black-box writer")
+clients_connected = REGISTRY.gauge("clients_connected", "Connected telemetry clients")
+client_bytes_sent = REGISTRY.counter("client_bytes_sent_total", "Bytes sent to each client", labels=("client",))
+client_snapshots_skipped = REGISTRY.counter("client_snapshots_skipped_total", "Snapshots skipped for clients that were still reading")
+
+def gps_age():
+    capture_ns = latest_gps_data.get("Capture Time")
+    return (time.monotonic_ns() - capture_ns) / 1e9 if isinstance(capture_ns, int) else float("nan")
+
+gps_fix_age.set_function(gps_age)
+ui_queue_depth.set_function(lambda: sensor_data.qsize())
+
+def start_metrics(port):
+    if port is None:
+        return
+    import metrics
+    try:
+        metrics.serve(port)
+        log.info("Metrics at http://127.0.0.1:%d/metrics", port)
+    except OSError as e:
+        log.warning("Metrics endpoint unavailable: %s", e)
+
+def share_diagnostics():
+    """Acquisition process: keep its registry snapshot in shared memory for the network process."""
+    while not stop_event.wait(DIAGNOSTICS_INTERVAL / 2):
+        encoded = json.dumps(REGISTRY.snapshot()).encode('utf-8')
+        if len(encoded) >= DIAGNOSTICS_SIZE:
+            log.warning("Diagnostics snapshot of %d bytes does not fit in DIAGNOSTICS_SIZE", len(encoded))
+            continue
+        shared_status["diagnostics"].value = encoded
+
+def _unset(value):
+    """True for a metric that this process never touched: zero, NaN, None or an empty histogram."""
+    if isinstance(value, dict):
+        return value.get("count") == 0 if "count" in value else not value
+    return value is None or value == 0 or value != value
+
+def merge_diagnostics(own, other):
+    """Combine two processes' registry snapshots. Labelled metrics are unioned, and a value left
+    unset in one process is taken from the other; when both have one, `own` wins."""
+    merged = dict(other)
+    for name, value in own.items():
+        theirs = merged.get(name)
+        if isinstance(value, dict) and isinstance(theirs, dict) and "count" not in value:
+            merged[name] = {**theirs, **{label: v for label, v in value.items() if not _unset(v) or label not in theirs}}
+        elif theirs is None or not _unset(value) or _unset(theirs):
+            merged[name] = value
+    return merged
+
+def diagnostics_snapshot():
+    """Metrics for the clients' diagnostics message, including the acquisition process's in MULTIPROCESS_MODE."""
+    snapshot = REGISTRY.snapshot()
+    if shared_status and "diagnostics" in shared_status:
+        try:
+            acquisition = json.loads(shared_status["diagnostics"].value or b"{}")
+        except ValueError:
+            acquisition = {}
+        snapshot = merge_diagnostics(acquisition, snapshot)
+    return snapshot
+
+def make_clock_anchor():
+    """Pair the monotonic clock with wall-clock time, read back to back."""
+    return {"Monotonic": time.monotonic_ns(), "Wall Time": time.time_ns()}
+
 # Mock functions for testing mode with dynamic values
 def mock_get_imu_data():
     # Use time to create oscillating values for testing
@@ -56,7 +301,8 @@ def mock_get_imu_data():
         "Gyro X": f"{math.sin(current_time):.2f}",
         "Gyro Y": f"{math.cos(current_time):.2f}",
         "Gyro Z": f"{math.sin(current_time / 2):.2f}",
-        "Temperature": f"{(math.sin(current_time / 3) + 1) * 20:.2f} °C"
+        "Temperature": f"{(math.sin(current_time / 3) + 1) * 20:.2f} °C",
+        "Capture Time": time.monotonic_ns()
     }
 
 def mock_get_gps_data():
@@ -64,7 +310,7 @@ def mock_get_gps_data():
     current_time = time.time()
     latitude = 51.5074 + 0.001 * math.sin(current_time / 10)
     longitude = -0.1278 + 0.001 * math.cos(current_time / 10)
-    return {"Latitude": latitude, "Longitude": longitude}
+    return {"Latitude": latitude, "Longitude": longitude, "Capture Time": time.monotonic_ns(), "UTC Time": current_time}
 
 def mock_get_serial_data():
     # Simulate sensor values oscillating
@@ -75,6 +321,7 @@ def mock_get_serial_data():
     return {
         "Wheel Speed": wheel_speed,
         "Neutral Flag": neutral_flag,
+        "Capture Time": time.monotonic_ns()
     }
 
 def mock_get_rs232_data():
@@ -96,273 +343,368 @@ def mock_get_rs232_data():
         "Lambda 1": lambda1,
         "Drive Speed": drive_speed,
         "Ground Speed": ground_speed,
-        "Gear": gear
+        "Gear": gear,
+        "Capture Time": time.monotonic_ns()
     }
 
 # Detect headless mode (no display)
 HEADLESS = not os.environ.get("DISPLAY")
 
-if not HEADLESS:
-    from PyQt5.QtWidgets import QApplication, QLabel, QMainWindow, QGridLayout, QWidget, QProgressBar
-    from PyQt5.QtCore import Qt, QTimer
-    from PyQt5.QtGui import QPixmap
-
-    class SensorWindow(QMainWindow):
-        def __init__(self):
-            super().__init__()
-            self.setWindowTitle("Car Dashboard")
-            self.setFixedSize(480, 320)  # Fixed size to prevent stretching
-            self.setGeometry(0, 0, 480, 320)  # Adjusted for 480x320 resolution
-            self.setStyleSheet("background-color: black;")
-
-            self.layout = QGridLayout()
-            self.layout.setSpacing(5)  # Add consistent spacing
-            self.layout.setContentsMargins(10, 10, 10, 10)  # Add margins
-
-            # RPM Bar and Label
-            self.rpm_bar = QProgressBar()
-            self.rpm_bar.setRange(0, 15000)  # RPM range: 0 to 15000
-            self.rpm_bar.setTextVisible(False)
-            self.rpm_bar.setStyleSheet(
-                "QProgressBar { background-color: #2F2F2F; border: 2px solid #555; border-radius: 5px; } QProgressBar::chunk { background-color: #006400; border-radius: 3px; }"
-            )
-            self.rpm_label = QLabel("0 RPM")
-            self.rpm_label.setStyleSheet("font-size: 18pt; color: #00FF00; qproperty-alignment: AlignCenter;")
-
-            # Speed Label (no bar)
-            self.speed_label = QLabel("0 km/h")
-            self.speed_label.setStyleSheet("font-size: 24pt; color: #00FF00; qproperty-alignment: AlignCenter;")
-
-            # Gear Position
-            self.gear_label = QLabel("N")
-            self.gear_label.setStyleSheet("font-size: 48pt; color: #00FF00; qproperty-alignment: AlignCenter;")
-
-            # Throttle Position Bar and Label
-            self.throttle_bar = QProgressBar()
-            self.throttle_bar.setRange(0, 100)  # Throttle range: 0 to 100%
-            self.throttle_bar.setOrientation(Qt.Vertical)  # Make it vertical
-            self.throttle_bar.setTextVisible(False)
-            self.throttle_bar.setStyleSheet(
-                "QProgressBar { background-color: #2F2F2F; border: 2px solid #555; border-radius: 5px; } QProgressBar::chunk { background-color: #006400; border-radius: 3px; }"
-            )
-            self.throttle_bar.setFixedSize(35, 100)  # Slightly wider and shorter for better visibility
-            
-            self.throttle_label = QLabel("Throttle")
-            self.throttle_label.setStyleSheet("font-size: 12pt; color: #FFFFFF; qproperty-alignment: AlignLeft;")
-
-            # Logo
-            self.logo_label = QLabel()
-            self.logo_label.setPixmap(QPixmap("logo.png").scaled(80, 80, Qt.KeepAspectRatio, Qt.SmoothTransformation))
-            self.logo_label.setAlignment(Qt.AlignCenter)
-
-            # Connection Status
-            self.connection_label = QLabel("Disconnected")
-            self.connection_label.setStyleSheet("font-size: 14pt; color: #00FF00; qproperty-alignment: AlignCenter;")
-            self.ngrok_url_displayed = False  # Track if we've set the ngrok URL
-
-            # Engine Temperature Label
-            self.engine_temp_label = QLabel("Engine Temp: -- °C")
-            self.engine_temp_label.setStyleSheet("font-size: 14pt; color: #FFFFFF; qproperty-alignment: AlignCenter;")
-
-            # Add widgets to the layout (using 5 columns for better alignment)
-            self.layout.addWidget(self.rpm_bar, 0, 0, 1, 5)  # RPM bar spans 5 columns
-            self.layout.addWidget(self.rpm_label, 1, 0, 1, 5)  # RPM label spans 5 columns
-            self.layout.addWidget(self.throttle_bar, 2, 0, 2, 1)  # Throttle bar on the left, spans 2 rows
-            self.layout.addWidget(self.gear_label, 2, 1, 1, 3)  # Gear position in center, spans 3 columns
-            self.layout.addWidget(self.throttle_label, 4, 0)  # Throttle label below throttle bar
-            self.layout.addWidget(self.speed_label, 3, 1, 1, 3)  # Speed label below gear, spans 3 columns
-            self.layout.addWidget(self.engine_temp_label, 4, 1, 1, 3)  # Engine temp label below speed, spans 3 columns
-            self.layout.addWidget(self.logo_label, 5, 0)  # Logo in bottom-left
-            self.layout.addWidget(self.connection_label, 5, 1, 1, 3)  # Connection status spans 3 columns
-
-            # Set the layout
-            container = QWidget()
-            container.setLayout(self.layout)
-            self.setCentralWidget(container)
-
-            # Timer to update sensor data
-            self.timer = QTimer()
-            self.timer.timeout.connect(self.update_sensor_data)
-            self.timer.start(100)  # Update every 100ms for smooth bar updates
-
-        def update_sensor_data(self):
-            with data_lock:
-                if not sensor_data.empty():
-                    latest_data = sensor_data.get()
-                    # Get RS232 and Serial data safely
-                    rs232_data = latest_data.get("RS232 Data", {"RPM": 0, "Gear": "N", "Engine Temperature": 0, "Drive Speed": 0, "Ground Speed": 0, "Throttle Position": 0})
-                    serial_data = latest_data.get("Serial Data", {"Wheel Speed": 0})
-
-                    # RPM from RS232
-                    rpm = int(rs232_data.get("RPM", 0))
-                    self.rpm_bar.setValue(rpm)
-                    self.rpm_label.setText(f"{rpm} RPM")
-                    if rpm > 11250:
-                        self.rpm_bar.setStyleSheet(
-                            "QProgressBar { background-color: #2F2F2F; border: 2px solid #555; border-radius: 5px; } QProgressBar::chunk { background-color: red; border-radius: 3px; }"
-                        )
-                    elif rpm > 7500:
-                        self.rpm_bar.setStyleSheet(
-                            "QProgressBar { background-color: #2F2F2F; border: 2px solid #555; border-radius: 5px; } QProgressBar::chunk { background-color: orange; border-radius: 3px; }"
-                        )
-                    else:
-                        self.rpm_bar.setStyleSheet(
-                            "QProgressBar { background-color: #2F2F2F; border: 2px solid #555; border-radius: 5px; } QProgressBar::chunk { background-color: #006400; border-radius: 3px; }"
-                        )
+# Without X, draw the dashboard straight into the framebuffer if the Pi has one
+FRAMEBUFFER_DEVICE = os.environ.get("DAQ_FRAMEBUFFER", "/dev/fb0")
+FRAMEBUFFER_DASHBOARD = HEADLESS and os.path.exists(FRAMEBUFFER_DEVICE)
+
+# Dashboard refresh rate; both renderers only redraw the values that changed
+DASHBOARD_FPS = 30
+
+def dashboard_values(latest_data):
+    """Values shown on the driver dashboard, from one snapshot."""
+    # Get RS232 data safely
+    rs232_data = latest_data.get("RS232 Data", {"RPM": 0, "Gear": "N", "Engine Temperature": 0, "Drive Speed": 0, "Ground Speed": 0, "Throttle Position": 0})
+
+    try:
+        temp_val = float(rs232_data.get("Engine Temperature", 0))
+    except (ValueError, TypeError):
+        temp_val = 0.0
+    try:
+        throttle_val = max(0, min(100, int(rs232_data.get("Throttle Position", 0))))
+    except (ValueError, TypeError):
+        throttle_val = 0
+
+    values = {
+        "rpm": int(rs232_data.get("RPM", 0)),
+        "speed": int(rs232_data.get("Ground Speed", 0)),
+        "gear": str(rs232_data.get("Gear", "N")),
+        "engine_temp": temp_val,
+        "throttle": throttle_val,
+    }
 
-                    # Speed from Serial (Wheel Speed)
-                    speed = int(rs232_data.get("Ground Speed", 0))
-                    self.speed_label.setText(f"{speed} km/h")
+    # Connection status; the ngrok URL stays up once it has been shown
+    if not use_tunnel():
+        values["connection"] = "Active" if client_connected else "Disconnected"
+    else:
+        ngrok_url = latest_data.get("Ngrok URL")
+        if ngrok_url and ngrok_url != "Disconnected":
+            values["connection"] = ngrok_url
+    return values
+
+def poll_dashboard_values():
+    """Dashboard values for the newest snapshot, or None if nothing new has arrived."""
+    with data_lock:
+        latest_data = take_ui_snapshot()
+    return dashboard_values(latest_data) if latest_data else None
+
+# Acquisition: every source is read on its own thread at its own rate against absolute monotonic
+# deadlines (scheduler.py), so a slow or failing source (the multi-second GPS query) never delays
+# the others. Samples are buffered as they arrive; snapshots are published at PUBLISH_RATE.
+SOURCE_RATES = {"IMU Data": 20, "Serial Data": 10, "RS232 Data": 20, "GPS Data": 1}  # Hz
+PUBLISH_RATE = 10  # snapshots per second to the dashboard and clients (and the black box without resampling)
+
+# "threads" polls every source from the scheduler as above. "asyncio" instead reads the RS232,
+# Arduino and SIM7600X ports from one event loop as bytes arrive (event_acquisition.py), so
+# frames are decoded on arrival and nothing wakes up just to find an empty port; the IMU has no
+# file descriptor to wait on and stays on the scheduler. TEST_MODE always uses "threads".
+ACQUISITION_MODE = "threads"
+EVENT_SOURCES = ("Serial Data", "RS232 Data", "GPS Data")
+
+# CPU pinning and real-time priority (rt_sched.py). The dashboard, ngrok and the modem stack share
+# the Pi's four cores with acquisition, so serial bytes can wait behind a repaint; giving the
+# acquisition threads their own core(s) and SCHED_FIFO avoids that. None keeps the default.
+ACQUISITION_CPUS = None  # e.g. {3}
+OTHER_CPUS = None  # e.g. {0, 1, 2}: the dashboard, networking, black box and anything they start
+ACQUISITION_FIFO_PRIORITY = None  # 1-99, e.g. 20; needs root or CAP_SYS_NICE
+SCHED_SELF_TEST = 1.0  # seconds of jitter measurement with and without the settings at startup (0 to skip)
+
+# Newest sample from each source, for publishing when the resampler is disabled
+latest_source_data = {}
+
+def source_readers():
+    """The read function for each source, real or mocked."""
+    if TEST_MODE:
+        return {"IMU Data": mock_get_imu_data, "Serial Data": mock_get_serial_data,
+                "RS232 Data": mock_get_rs232_data, "GPS Data": mock_get_gps_data}
 
-                    # Engine Temperature from RS232
-                    engine_temp = rs232_data.get("Engine Temperature", 0)
-                    try:
-                        temp_val = float(engine_temp)
-                    except (ValueError, TypeError):
-                        temp_val = 0
-                    self.engine_temp_label.setText(f"Engine Temp: {temp_val:.1f} °C")
-                    if temp_val > 60:
-                        self.engine_temp_label.setStyleSheet("font-size: 14pt; color: #FF0000; qproperty-alignment: AlignCenter;")
-                    else:
-                        self.engine_temp_label.setStyleSheet("font-size: 14pt; color: #FFFFFF; qproperty-alignment: AlignCenter;")
+    def read_gps():
+        # The snapshot carries the default position until the modem and GPS stages have finished
+        return sensor_reading.get_gps_data() if gps_ready.is_set() else None
 
-                    # Gear from RS232
-                    gear = rs232_data.get("Gear", "N")
-                    self.gear_label.setText(str(gear))
+    return {"IMU Data": sensor_reading.get_imu_data, "Serial Data": sensor_reading.get_serial_data,
+            "RS232 Data": sensor_reading.get_rs232_data, "GPS Data": read_gps}
 
-                    # Throttle Position from RS232
-                    throttle_pos = rs232_data.get("Throttle Position", 0)
-                    try:
-                        throttle_val = int(throttle_pos)
-                    except (ValueError, TypeError):
-                        throttle_val = 0
-                    # Clamp the value to ensure it's within range
-                    throttle_val = max(0, min(100, throttle_val))
-                    self.throttle_bar.setValue(throttle_val)
-                    # Debug print to see if throttle is updating (remove this later if needed)
-                    print(f"Throttle: {throttle_val}%")
-
-                    # Update Connection Status
-                    if TEST_MODE:
-                        if client_connected:
-                            self.connection_label.setText("Active")
-                        else:
-                            self.connection_label.setText("Disconnected")
-                    else:
-                        if not self.ngrok_url_displayed:
-                            ngrok_url = latest_data.get("Ngrok URL")
-                            if ngrok_url and ngrok_url != "Disconnected":
-                                self.connection_label.setText(ngrok_url)
-                                self.ngrok_url_displayed = True
-
-        def closeEvent(self, event):
-            """Handle the window close event."""
-            stop_event.set()  # Signal all threads to stop
-            event.accept()
-
-# Function for GPS data acquisition (separate thread)
-def gps_acquisition_thread():
+def store_sample(source, sample):
     global latest_gps_data
-    while not stop_event.is_set():
+    with data_lock:
+        latest_source_data[source] = sample
+        if source == "GPS Data":
+            latest_gps_data = sample
+            log.debug("GPS updated: %s", sample)
+        if resampler:
+            resampler.add(source, sample)
+
+def publish_snapshot(snapshot):
+    """Hand a snapshot to the dashboard: the shared ring across processes, else the UI queue."""
+    if shared_ring:
+        shared_ring.publish(json.dumps(snapshot).encode('utf-8') + b'\n')
+    else:
+        # Add the data to the queue for UI updates
+        put_ui_snapshot(snapshot)
+
+def put_ui_snapshot(snapshot):
+    """Queue a snapshot for the dashboard, dropping the oldest one if the queue is full."""
+    while True:
         try:
-            if TEST_MODE:
-                gps_data = mock_get_gps_data()
-            else:
-                gps_data = sensor_reading.get_gps_data()
-            
-            with data_lock:
-                latest_gps_data = gps_data
-                print(f"GPS updated: {gps_data}")
-        except Exception as e:
-            print(f"GPS thread error: {e}")
-        
-        # GPS updates every 5 seconds (slower than main sensors)
-        time.sleep(1)
-
-# Function for data acquisition
-def data_acquisition_thread():
-    global latest_sensor_data, latest_gps_data
-    while not stop_event.is_set():
-        if TEST_MODE:
-            imu_data = mock_get_imu_data()
-            serial_data = mock_get_serial_data()
-            rs232_data = mock_get_rs232_data()
+            sensor_data.put_nowait(snapshot)
+            return
+        except Full:
+            try:
+                sensor_data.get_nowait()
+            except Empty:
+                pass
+
+def latest_payload():
+    """Encoded line for the newest snapshot, or None if there is none yet."""
+    if shared_ring:
+        return shared_ring.newest()  # Already encoded by the acquisition process
+    with data_lock:
+        return json.dumps(latest_sensor_data).encode('utf-8') + b'\n' if latest_sensor_data else None
+
+def take_ui_snapshot():
+    """Next snapshot for the dashboard, or None if nothing new has arrived."""
+    global client_connected
+    if shared_ring:
+        payload = shared_ring.latest()
+        if payload is None:
+            return None
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            log.warning("Skipping an unreadable snapshot from the shared ring")
+            return None  # The next one is read on the dashboard's next refresh
+        client_connected = bool(shared_status["connected"].value)
+        ngrok_url = shared_status["ngrok_url"].value.decode()
+        if ngrok_url:
+            data["Ngrok URL"] = ngrok_url
+        return data
+    if sensor_data.empty():
+        return None
+    return sensor_data.get()
+
+def set_client_connected(connected):
+    global client_connected
+    client_connected = connected
+    if shared_status:
+        shared_status["connected"].value = connected
+
+# Publisher state: the clock anchor currently attached to snapshots, and when to refresh it
+clock_anchor = None
+next_anchor = 0
+first_snapshot_published = False
+
+# Publish the newest snapshot (run by the scheduler at PUBLISH_RATE)
+def publish_latest():
+    global latest_sensor_data, clock_anchor, next_anchor, first_snapshot_published
+    with data_lock:
+        if resampler:
+            # Every grid frame now due (one per call unless the loop ran late); "Capture Time" is its tick
+            snapshots = resampler.frames(time.monotonic_ns())
+            for snapshot in snapshots:
+                snapshot["Capture Time"] = snapshot.pop("Grid Time")
         else:
-            imu_data = sensor_reading.get_imu_data()
-            serial_data = sensor_reading.get_serial_data()
-            rs232_data = sensor_reading.get_rs232_data()
-
-        with data_lock:
-            # Add a timestamp to the sensor data
-            timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-            # Update the latest sensor data (using the latest GPS data from GPS thread)
-            latest_sensor_data = {
-                "Timestamp": timestamp,  # Add the timestamp here
-                "IMU Data": imu_data,
-                "GPS Data": latest_gps_data.copy(),  # Use GPS data from separate thread
-                "Serial Data": serial_data,
-                "RS232 Data": rs232_data
-            }
-            # Add the data to the queue for UI updates
-            sensor_data.put(latest_sensor_data)
-        time.sleep(0.15)
+            # Snapshot time; each source also stamps its own capture
+            snapshot = {"Capture Time": time.monotonic_ns()}
+            for source in ("IMU Data", "Serial Data", "RS232 Data"):
+                if source in latest_source_data:
+                    snapshot[source] = latest_source_data[source]
+            snapshot["GPS Data"] = latest_gps_data.copy()
+            snapshots = [snapshot]
+        if not snapshots:
+            return
+        if time.monotonic() >= next_anchor:
+            clock_anchor = make_clock_anchor()
+            next_anchor = time.monotonic() + CLOCK_ANCHOR_INTERVAL
+        # Add a timestamp to the sensor data
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+        for snapshot in snapshots:
+            latest_sensor_data = {"Timestamp": timestamp}
+            latest_sensor_data.update(snapshot)
+            latest_sensor_data["Clock Anchor"] = clock_anchor
+            # The black box keeps the whole grid; the dashboard and clients only need the newest frame
+            if blackbox:
+                blackbox.record(latest_sensor_data)
+        publish_snapshot(latest_sensor_data)
+    snapshots_published.inc()
+    if not first_snapshot_published:
+        first_snapshot_published = True
+        record_boot_stage("first snapshot", BOOT_STARTED, "ok")
 
 # Function for UI
 def ui_thread():
+    from PyQt5.QtWidgets import QApplication
+    from dashboard import SensorWindow
     app = QApplication([])
-    window = SensorWindow()
+    window = SensorWindow(poll_dashboard_values, stop_event.set, DASHBOARD_FPS)
     app.aboutToQuit.connect(stop_event.set)
     window.showFullScreen()
     app.exec_()
 
+# Function for the framebuffer dashboard (no X session)
+def framebuffer_ui_thread():
+    from fb_dashboard import Framebuffer, FramebufferDashboard
+    framebuffer = Framebuffer(FRAMEBUFFER_DEVICE)
+    dashboard = FramebufferDashboard(framebuffer)
+    period = 1 / DASHBOARD_FPS
+    try:
+        while not stop_event.is_set():
+            values = poll_dashboard_values()
+            if values:
+                dashboard.set_values(**values)
+            dashboard.render()
+            time.sleep(period)
+    finally:
+        framebuffer.close()
+
+def unacknowledged_bytes(conn):
+    """Bytes written to a socket that the client has not acknowledged yet (Linux; 0 elsewhere)."""
+    try:
+        import fcntl
+        import termios
+        return struct.unpack("i", fcntl.ioctl(conn.fileno(), termios.TIOCOUTQ, b"\0\0\0\0"))[0]
+    except (ImportError, OSError):
+        return 0
+
+def send_pending(conn, outgoing, bytes_sent):
+    """Write as much of `outgoing` as the socket takes without blocking."""
+    try:
+        sent = conn.send(outgoing)
+    except (BlockingIOError, InterruptedError):
+        return
+    del outgoing[:sent]
+    bytes_sent.inc(sent)
+
+# Serve one connected client: stream the latest data and answer clock-sync pings. The socket is
+# non-blocking, and a snapshot is skipped while the previous one is still being written or more
+# than CLIENT_QUEUE_LIMIT bytes wait for the client's acknowledgement, so a client that reads
+# slowly gets the newest snapshot next time instead of falling further behind. Diagnostics are
+# skipped the same way; pongs never are, and a client that leaves CLIENT_OUTGOING_LIMIT bytes of
+# them unread is dropped.
+def serve_client(conn, addr):
+    pending = b""
+    outgoing = bytearray()  # Whole messages the socket has not taken yet
+    next_send = time.monotonic()
+    next_diagnostics = next_send + DIAGNOSTICS_INTERVAL
+    client = f"{addr[0]}:{addr[1]}"
+    bytes_sent = client_bytes_sent.labels(client)
+    clients_connected.inc()
+    conn.setblocking(False)
+    try:
+        while not stop_event.is_set():
+            # Wait for a ping (or room to write) until the next send is due, so pongs go out straight away
+            readable, _, _ = select.select([conn], [conn] if outgoing else [], [], max(next_send - time.monotonic(), 0))
+            if readable:
+                receive_ns = time.monotonic_ns()
+                try:
+                    chunk = conn.recv(4096)
+                except BlockingIOError:
+                    chunk = None
+                if chunk == b"":
+                    break
+                lines = (pending + (chunk or b"")).split(b"\n")
+                pending = lines.pop()
+                for line in lines:
+                    try:
+                        message = json.loads(line)
+                    except ValueError:
+                        continue  # e.g. the client's plain-text "shutdown"
+                    ping = clock_sync.ping_of(message)
+                    if ping:
+                        outgoing += json.dumps(clock_sync.make_pong(ping, receive_ns)).encode('utf-8') + b'\n'
+            if time.monotonic() >= next_send:
+                # Send the latest sensor data to the client, unless it has not taken the last one yet
+                payload = latest_payload()
+                if payload:
+                    if outgoing or unacknowledged_bytes(conn) > CLIENT_QUEUE_LIMIT:
+                        client_snapshots_skipped.inc()
+                    else:
+                        outgoing += payload
+                next_send = max(next_send + 1 / CLIENT_SEND_RATE, time.monotonic())
+            if time.monotonic() >= next_diagnostics:
+                # Low-rate diagnostic channel: the DAQ's own metrics (skipped like snapshots)
+                if not outgoing:
+                    outgoing += json.dumps({"Diagnostics": diagnostics_snapshot()}).encode('utf-8') + b'\n'
+                next_diagnostics += DIAGNOSTICS_INTERVAL
+            if outgoing:
+                send_pending(conn, outgoing, bytes_sent)
+            if len(outgoing) > CLIENT_OUTGOING_LIMIT:
+                log.warning("Dropping %s: it has stopped reading", addr)
+                break
+    except OSError as e:
+        log.info("Connection with %s closed (%s).", addr, e)
+    finally:
+        clients_connected.dec()
+        set_client_connected(clients_connected.get() > 0)  # Inactive once the last client has gone
+        client_bytes_sent.remove(client)
+        conn.close()
+
+def kill_orphaned_ngrok_processes():
+    """Kill any orphaned ngrok processes."""
+    import subprocess
+    try:
+        result = subprocess.run(["pgrep", "ngrok"], capture_output=True, text=True)
+        if result.stdout:
+            pids = result.stdout.strip().split("\n")
+            for pid in pids:
+                log.info("Killing orphaned ngrok process with PID: %s", pid)
+                subprocess.run(["kill", "-9", pid])
+    except Exception as e:
+        log.warning("Error killing orphaned ngrok processes: %s", e)
+
+def start_tunnel():
+    """Start ngrok and return (process, public address) once its API reports the tunnel."""
+    import subprocess
+    import urllib.request
+    kill_orphaned_ngrok_processes()  # Kill any orphaned ngrok processes
+
+    log.info("Starting ngrok...")
+    ngrok_process = subprocess.Popen(["ngrok", "tcp", str(PORT)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    # Poll the ngrok API in-process until the tunnel is available
+    deadline = time.monotonic() + TUNNEL_TIMEOUT
+    while time.monotonic() < deadline and ngrok_process.poll() is None:
+        try:
+            with urllib.request.urlopen(NGROK_API, timeout=1) as response:
+                tunnels = json.load(response).get("tunnels", [])
+            for tunnel in tunnels:
+                public_url = tunnel.get("public_url", "")
+                if public_url.startswith("tcp://"):
+                    return ngrok_process, public_url[len("tcp://"):]
+        except (OSError, ValueError):
+            pass  # API not listening yet
+        time.sleep(0.2)
+
+    ngrok_process.terminate()
+    return None
+
 # Function for networking
 def networking_thread():
-    global latest_sensor_data, client_connected
+    global latest_sensor_data
 
-    def kill_orphaned_ngrok_processes():
-        """Kill any orphaned ngrok processes."""
-        try:
-            result = subprocess.run(["pgrep", "ngrok"], capture_output=True, text=True)
-            if result.stdout:
-                pids = result.stdout.strip().split("\n")
-                for pid in pids:
-                    print(f"Killing orphaned ngrok process with PID: {pid}")
-                    subprocess.run(["kill", "-9", pid])
-        except Exception as e:
-            print(f"Error killing orphaned ngrok processes: {e}")
-
-    if TEST_MODE:
-        # Existing functionality for TEST_MODE
+    if not use_tunnel():
+        # Local clients only (TEST_MODE, or DAQ_TUNNEL=0)
         server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         server_socket.bind((HOST, PORT))
         server_socket.listen(5)
-        print(f"Server listening on {HOST}:{PORT}")
+        log.info("Server listening on %s:%d", HOST, PORT)
 
         while not stop_event.is_set():
             try:
                 server_socket.settimeout(1)  # Allow periodic checks for stop_event
                 client_socket, client_address = server_socket.accept()
-                print(f"Connection established with {client_address}")
-                client_connected = True  # Set the connection status to active
-
-                def handle_client(client_socket):
-                    global client_connected
-                    try:
-                        while not stop_event.is_set():
-                            # Send the latest sensor data to the client
-                            with data_lock:
-                                if latest_sensor_data:
-                                    client_socket.sendall(json.dumps(latest_sensor_data).encode('utf-8') + b'\n')
-                            time.sleep(1)  # Send data every second
-                    except (ConnectionResetError, BrokenPipeError):
-                        print(f"Connection with {client_address} closed.")
-                    finally:
-                        client_connected = False  # Set the connection status to inactive
-                        client_socket.close()
+                log.info("Connection established with %s", client_address)
+                set_client_connected(True)  # Set the connection status to active
 
                 # Start a new thread to handle the client
-                client_handler = threading.Thread(target=handle_client, args=(client_socket,), daemon=True)
+                client_handler = threading.Thread(target=serve_client, args=(client_socket, client_address), daemon=True)
                 client_handler.start()
             except socket.timeout:
                 continue  # Check stop_event again
@@ -370,97 +712,131 @@ def networking_thread():
         server_socket.close()
 
     else:
-        # Ngrok networking for production mode
-        kill_orphaned_ngrok_processes()  # Kill any orphaned ngrok processes
-
-        print("Starting ngrok...")
-        ngrok_process = subprocess.Popen(["ngrok", "tcp", str(PORT)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-
-        # Poll the ngrok API until the tunnel is available
-        ngrok_url = None
-        start_time = time.time()
-        timeout = 30  # Timeout after 30 seconds
-        while time.time() - start_time < timeout:
-            try:
-                ngrok_tunnel_process = subprocess.run(["curl", "-s", "http://localhost:4040/api/tunnels"], capture_output=True, text=True)
-                match = re.search(r'"public_url":"tcp://(.*?)"', ngrok_tunnel_process.stdout)
-                if match:
-                    ngrok_url = match.group(1)
-                    print(f"Connect to the server using: {ngrok_url}")
-                    break
-            except Exception as e:
-                print(f"Error fetching ngrok URL: {e}")
-            time.sleep(1)  # Retry every second
-
-        if not ngrok_url:
-            print("Failed to retrieve ngrok URL within the timeout period. Shutting down.")
-            ngrok_process.terminate()
-            return
-
-        with data_lock:
-            # Always put a full data structure in the queue for the UI
-            if latest_sensor_data and isinstance(latest_sensor_data, dict):
-                data = latest_sensor_data.copy()
-            else:
-                data = {
-                    "Timestamp": "",
-                    "IMU Data": {},
-                    "GPS Data": {},
-                    "Serial Data": {"RPM": 0, "Speed": 0, "Gear": "N"},
-                    "RS232 Data": {"RPM": 0, "Throttle Position": 0, "Engine Temperature": 0, "Drive Speed": 0, "Ground Speed": 0, "Gear": "N"}
-                }
-            data["Ngrok URL"] = ngrok_url
-            latest_sensor_data = data
-            sensor_data.put(latest_sensor_data)
-            print(f"Debug: Added Ngrok URL to sensor_data queue: {ngrok_url}")
-
+        # Ngrok networking for production mode; listen first so the tunnel can forward as soon as it is up
         server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         server_socket.bind((HOST, PORT))
         server_socket.listen(1)
 
-        print(f"Server listening on {HOST}:{PORT}")
+        tunnel = run_boot_stage("tunnel", start_tunnel)
+        if not tunnel:
+            log.error("Failed to retrieve ngrok URL within the timeout period. Shutting down.")
+            server_socket.close()
+            return
+        ngrok_process, ngrok_url = tunnel
+        log.info("Connect to the server using: %s", ngrok_url)
+
+        if shared_status:
+            # The dashboard process picks the URL up alongside the next snapshot
+            shared_status["ngrok_url"].value = ngrok_url.encode()[:255]
+        else:
+            with data_lock:
+                # Always put a full data structure in the queue for the UI
+                if latest_sensor_data and isinstance(latest_sensor_data, dict):
+                    data = latest_sensor_data.copy()
+                else:
+                    data = {
+                        "Timestamp": "",
+                        "IMU Data": {},
+                        "GPS Data": {},
+                        "Serial Data": {"RPM": 0, "Speed": 0, "Gear": "N"},
+                        "RS232 Data": {"RPM": 0, "Throttle Position": 0, "Engine Temperature": 0, "Drive Speed": 0, "Ground Speed": 0, "Gear": "N"}
+                    }
+                data["Ngrok URL"] = ngrok_url
+                latest_sensor_data = data
+                put_ui_snapshot(latest_sensor_data)
+                log.debug("Added Ngrok URL to sensor_data queue: %s", ngrok_url)
+
+        log.info("Server listening on %s:%d", HOST, PORT)
 
         try:
             while not stop_event.is_set():
                 conn, addr = server_socket.accept()
-                print(f"Connected by {addr}")
-                client_connected = True
-
-                try:
-                    while not stop_event.is_set():
-                        # Send the latest sensor data to the client
-                        with data_lock:
-                            if latest_sensor_data:
-                                conn.sendall(json.dumps(latest_sensor_data).encode('utf-8') + b'\n')
-                        time.sleep(1)  # Send data every second
-                except (ConnectionResetError, BrokenPipeError):
-                    print(f"Connection with {addr} closed.")
-                finally:
-                    client_connected = False
-                    conn.close()
+                log.info("Connected by %s", addr)
+                set_client_connected(True)
+                serve_client(conn, addr)
         except KeyboardInterrupt:
-            print("Server shutting down...")
+            log.info("Server shutting down...")
         finally:
             server_socket.close()
             ngrok_process.terminate()
-            print("ngrok connection terminated.")
+            log.info("ngrok connection terminated.")
+
+# Entry point for each process in MULTIPROCESS_MODE
+def run_process(role, ring_name, status, shared_stop):
+    global shared_ring, shared_status, stop_event
+    from shm_ring import SharedRing
+    shared_ring = SharedRing.attach(ring_name)
+    shared_status = status
+    stop_event = shared_stop  # multiprocessing.Event, so stopping one process stops them all
+    daq_logging.setup()
+    rt_sched.pin(OTHER_CPUS)
+    if METRICS_PORT is not None:
+        start_metrics(METRICS_PORT + ["acquisition", "network", "dashboard"].index(role))
+    try:
+        if role == "acquisition":
+            threading.Thread(target=share_diagnostics, name="share-diagnostics", daemon=True).start()
+            for thread in start_acquisition():
+                thread.join()
+        elif role == "network":
+            if use_tunnel():
+                expect_boot_stages("tunnel")
+            networking_thread()
+        elif role == "dashboard":
+            framebuffer_ui_thread() if HEADLESS else ui_thread()
+    finally:
+        shared_stop.set()
+        if blackbox:
+            blackbox.stop()
+        shared_ring.close()
+
+def run_multiprocess():
+    import multiprocessing
+    from shm_ring import SharedRing
+    ring = SharedRing.create(slots=RING_SLOTS, slot_size=RING_SLOT_SIZE)
+    status = {"connected": multiprocessing.Value('b', 0), "ngrok_url": multiprocessing.Array('c', 256),
+              "diagnostics": multiprocessing.Array('c', DIAGNOSTICS_SIZE)}
+    shared_stop = multiprocessing.Event()
+    roles = ["acquisition", "network"] + (["dashboard"] if not HEADLESS or FRAMEBUFFER_DASHBOARD else [])
+    processes = [multiprocessing.Process(target=run_process, args=(role, ring.name, status, shared_stop),
+                                         name=f"daq-{role}", daemon=True) for role in roles]
+    for process in processes:
+        process.start()
+    try:
+        shared_stop.wait()
+    except KeyboardInterrupt:
+        shared_stop.set()
+    finally:
+        for process in processes:
+            process.join(timeout=5)
+        ring.close()
 
 # Start threads
-if __name__ == "__main__":
-    gps_thread = threading.Thread(target=gps_acquisition_thread, daemon=True)
-    acquisition_thread = threading.Thread(target=data_acquisition_thread, daemon=True)
+if __name__ == "__main__" and MULTIPROCESS_MODE:
+    run_multiprocess()
+elif __name__ == "__main__":
+    daq_logging.setup()
+    rt_sched.pin(OTHER_CPUS)
+    if use_tunnel():
+        expect_boot_stages("tunnel")
+    start_metrics(METRICS_PORT)
+    acquisition_threads = start_acquisition()
     networking_thread_instance = threading.Thread(target=networking_thread, daemon=True)
-
-    gps_thread.start()
-    acquisition_thread.start()
     networking_thread_instance.start()
 
+    ui_thread_instance = None
     if not HEADLESS:
         ui_thread_instance = threading.Thread(target=ui_thread, daemon=True)
+    elif FRAMEBUFFER_DASHBOARD:
+        ui_thread_instance = threading.Thread(target=framebuffer_ui_thread, daemon=True)
+    if ui_thread_instance:
         ui_thread_instance.start()
 
-    gps_thread.join()
-    acquisition_thread.join()
-    networking_thread_instance.join()
-    if not HEADLESS:
-        ui_thread_instance.join()
\ No newline at end of file
+    try:
+        for thread in acquisition_threads:
+            thread.join()
+        networking_thread_instance.join()
+        if ui_thread_instance:
+            ui_thread_instance.join()
+    finally:
+        if blackbox:
+            blackbox.stop()
\ No newline at end of file
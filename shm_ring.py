@@ -0,0 +1,122 @@
+import struct
+import time
+import zlib
+from multiprocessing import shared_memory
+
+# Single-writer, multi-reader ring of variable-length messages in shared memory.
+#
+# Layout:
+#   header: magic (u32), slot count (u32), slot size (u32), pad (u32), published count (u64)
+#   slots:  sequence (u64), payload length (u32), payload CRC-32 (u32), payload (slot size bytes)
+#
+# Each slot is a seqlock. The writer sets the slot's sequence to an odd value
+# before touching the payload and to the next even value afterwards. A reader
+# copies the payload and then re-reads the sequence; if it changed or was odd,
+# the writer lapped it mid-read and the read is retried. Readers never block
+# the writer, so acquisition timing does not depend on how busy they are.
+#
+# Python has no memory barriers, so on a weakly ordered CPU (the Pi's ARM cores)
+# a reader can see the new sequence before all of the payload bytes. The length
+# and CRC-32 stored with each message catch such a torn copy, which is retried
+# like a lapped one.
+
+MAGIC = 0x44415152  # "DAQR"
+HEADER = struct.Struct("<IIIIQ")
+SLOT_HEADER = struct.Struct("<QII")
+SEQUENCE = struct.Struct("<Q")
+PUBLISHED_OFFSET = 16
+
+
+class SharedRing:
+    def __init__(self, shm, owner=False):
+        self.shm = shm
+        self.owner = owner
+        self.buf = shm.buf
+        magic, self.slots, self.slot_size, _, _ = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Shared memory {shm.name} is not a DAQ ring")
+        self.stride = SLOT_HEADER.size + self.slot_size
+        self.last_read = 0  # published count at this reader's last successful read
+
+    @classmethod
+    def create(cls, name=None, slots=64, slot_size=8192):
+        shm = shared_memory.SharedMemory(name=name, create=True,
+                                         size=HEADER.size + slots * (SLOT_HEADER.size + slot_size))
+        HEADER.pack_into(shm.buf, 0, MAGIC, slots, slot_size, 0, 0)
+        for i in range(slots):
+            SLOT_HEADER.pack_into(shm.buf, HEADER.size + i * (SLOT_HEADER.size + slot_size), 0, 0, 0)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        try:
+            # Python 3.13+: keep the resource tracker from unlinking a ring another process owns
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            shm = shared_memory.SharedMemory(name=name)
+        return cls(shm)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def published(self):
+        return SEQUENCE.unpack_from(self.buf, PUBLISHED_OFFSET)[0]
+
+    def publish(self, payload):
+        """Writer side: store one message in the next slot."""
+        length = len(payload)
+        if length > self.slot_size:
+            raise ValueError(f"Message of {length} bytes does not fit a {self.slot_size}-byte slot")
+        n = self.published()
+        offset = HEADER.size + (n % self.slots) * self.stride
+        SEQUENCE.pack_into(self.buf, offset, 2 * n + 1)  # odd: write in progress
+        start = offset + SLOT_HEADER.size
+        self.buf[start:start + length] = payload
+        SLOT_HEADER.pack_into(self.buf, offset, 2 * n + 2, length, zlib.crc32(payload))
+        SEQUENCE.pack_into(self.buf, PUBLISHED_OFFSET, n + 1)
+
+    def read(self, n, retries=8):
+        """Copy out message number n (0-based), or None if it has been overwritten."""
+        offset = HEADER.size + (n % self.slots) * self.stride
+        start = offset + SLOT_HEADER.size
+        for _ in range(retries):
+            sequence, length, checksum = SLOT_HEADER.unpack_from(self.buf, offset)
+            if sequence != 2 * n + 2:
+                if sequence > 2 * n + 2:
+                    return None  # Lapped: slot already holds a newer message
+                time.sleep(0)  # Write in progress; let the writer finish
+                continue
+            if length > self.slot_size:
+                continue  # Torn header
+            payload = bytes(self.buf[start:start + length])
+            if SEQUENCE.unpack_from(self.buf, offset)[0] == sequence and zlib.crc32(payload) == checksum:
+                return payload
+        return None
+
+    def newest(self):
+        """Newest message, or None if nothing has been published yet."""
+        while True:
+            n = self.published()
+            if n == 0:
+                return None
+            payload = self.read(n - 1)
+            if payload is not None:
+                return payload
+
+    def latest(self):
+        """Newest message not yet seen by this reader, or None if nothing new arrived."""
+        while True:
+            n = self.published()
+            if n == self.last_read:
+                return None
+            payload = self.read(n - 1)
+            if payload is not None:
+                self.last_read = n
+                return payload
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
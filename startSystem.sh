@@ -2,8 +2,5 @@ sudo dhclient -v usb0
 sudo udhcpc -i usb0
 sudo route add -net 0.0.0.0 usb0
 
-ngrok tcp 22 &
-sleep 10
-kill -9 "$(pgrep ngrok)"
-sleep 1
+# server.py starts ngrok itself and waits on its API, so no fixed sleeps are needed here
 python3 /home/daq/Documents/server.py &
@@ -0,0 +1,429 @@
+import argparse
+import collections
+import datetime
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# Benchmarks for the DAQ hot paths, with JSON results that can be kept as a baseline and
+# compared against later runs:
+#
+#   python test_applications/benchmarks.py run --output baseline.json
+#   python test_applications/benchmarks.py run --compare baseline.json --threshold 0.10
+#   python test_applications/benchmarks.py compare baseline.json results.json
+#
+# Every benchmark reports a throughput (higher is better) and is repeated; the median is what
+# gets compared. Baselines are only meaningful on the machine that produced them, so record
+# one per machine (the Pi and a laptop will differ by several times). --quick shrinks the
+# workloads for a smoke test.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import daq_logging  # noqa: E402
+import sensor_reading  # noqa: E402
+from hil_simulator import Faults, arduino_line, car_state, ecu_frame  # noqa: E402
+
+# name -> (function, unit); each function takes a workload scale and returns
+# (operations, seconds) for the timed part only, or None if it cannot run here
+BENCHMARKS = {}
+
+
+def benchmark(name, unit):
+    def register(function):
+        BENCHMARKS[name] = (function, unit)
+        return function
+    return register
+
+
+def snapshot(i, t):
+    """A published snapshot shaped like server.py's, for the simulated car at `t`."""
+    state = car_state(t)
+    capture = int(t * 1e9)
+    return {
+        "Timestamp": "2025-06-01 12:00:00",
+        "Capture Time": capture,
+        "IMU Data": {"Capture Time": capture, "Linear Acceleration": f"{1 + state['throttle'] / 200:.2f} Gs",
+                     "Gyro X": "0.01", "Gyro Y": "-0.02", "Gyro Z": f"{state['lap angle'] % 1:.2f}",
+                     "Temperature": "31.20°C"},
+        "GPS Data": {"Latitude": 53.8067 + 0.002 * (i % 100) / 100, "Longitude": -1.555, "Capture Time": capture},
+        "Serial Data": {"Capture Time": capture, "Wheel Speed": str(int(state["speed"] * 10)),
+                        "Neutral Flag": "0", "Killswitch": "0"},
+        "RS232 Data": sensor_reading.decode_rs232_frame(ecu_frame(t), capture),
+        "Clock Anchor": {"Monotonic": 0, "Wall Time": 1_748_779_200_000_000_000},
+    }
+
+
+def snapshots(count):
+    return [snapshot(i, i / 10) for i in range(count)]
+
+
+def ecu_stream(frames, faults=None):
+    """`frames` back-to-back ECU frames (75 ms apart, as at 19200 baud), optionally through `faults`."""
+    messages = (ecu_frame(i * 0.075) for i in range(frames))
+    if faults:
+        stats = collections.Counter()
+        messages = (faults.apply(message, stats) for message in messages)
+    return b"".join(messages)
+
+
+class BufferPort:
+    """In-memory stand-in for the pyserial port that get_rs232_data polls."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    @property
+    def in_waiting(self):
+        return len(self.buffer)
+
+    def read(self, size):
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+
+@benchmark("rs232_decode_clean", "frames/s")
+def bench_rs232_decode_clean(scale):
+    frames = int(5000 * scale)
+    stream = ecu_stream(frames)
+    decoder = sensor_reading.RS232Decoder()
+    decoded = 0
+    start = time.perf_counter()
+    for i in range(0, len(stream), 64):  # Reads the size a UART interrupt typically delivers
+        decoded += len(decoder.feed(stream[i:i + 64], 0))
+    elapsed = time.perf_counter() - start
+    assert decoded == frames, f"decoded {decoded} of {frames} clean frames"
+    return frames, elapsed
+
+
+@benchmark("rs232_decode_noisy", "frames/s")
+def bench_rs232_decode_noisy(scale):
+    # Input frames per second through resync: noise bursts, dropped bytes and corrupted frames
+    frames = int(5000 * scale)
+    stream = ecu_stream(frames, Faults(noise=0.1, drop=0.001, corrupt=0.05, rng=random.Random(1)))
+    decoder = sensor_reading.RS232Decoder()
+    start = time.perf_counter()
+    for i in range(0, len(stream), 64):
+        decoder.feed(stream[i:i + 64], 0)
+    return frames, time.perf_counter() - start
+
+
+@benchmark("rs232_poll", "polls/s")
+def bench_rs232_poll(scale):
+    # get_rs232_data as the scheduler calls it, with one new frame waiting per poll
+    polls = int(5000 * scale)
+    frames = [ecu_frame(i * 0.075) for i in range(polls)]
+    port = BufferPort()
+    sensor_reading.rs232 = port
+    try:
+        start = time.perf_counter()
+        for frame in frames:
+            port.buffer += frame
+            sensor_reading.get_rs232_data()
+        return polls, time.perf_counter() - start
+    finally:
+        sensor_reading.rs232 = None
+
+
+@benchmark("arduino_decode", "lines/s")
+def bench_arduino_decode(scale):
+    lines = int(20000 * scale)
+    stream = b"".join(arduino_line(i * 0.5) for i in range(lines))
+    decoder = sensor_reading.SerialLineDecoder()
+    start = time.perf_counter()
+    for i in range(0, len(stream), 64):
+        decoder.feed(stream[i:i + 64], 0)
+    return lines, time.perf_counter() - start
+
+
+@benchmark("snapshot_encode_json", "snapshots/s")
+def bench_snapshot_encode_json(scale):
+    # What publish_snapshot / serve_client do for every snapshot
+    messages = snapshots(int(5000 * scale))
+    dumps = json.dumps
+    start = time.perf_counter()
+    for message in messages:
+        dumps(message).encode('utf-8') + b'\n'
+    return len(messages), time.perf_counter() - start
+
+
+@benchmark("snapshot_encode_json_compact", "snapshots/s")
+def bench_snapshot_encode_json_compact(scale):
+    messages = snapshots(int(5000 * scale))
+    dumps = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False).encode
+    start = time.perf_counter()
+    for message in messages:
+        dumps(message).encode('utf-8') + b'\n'
+    return len(messages), time.perf_counter() - start
+
+
+@benchmark("snapshot_encode_orjson", "snapshots/s")
+def bench_snapshot_encode_orjson(scale):
+    try:
+        import orjson
+    except ImportError:
+        return None
+    messages = snapshots(int(5000 * scale))
+    dumps = orjson.dumps
+    start = time.perf_counter()
+    for message in messages:
+        dumps(message) + b'\n'
+    return len(messages), time.perf_counter() - start
+
+
+@benchmark("flatten", "messages/s")
+def bench_flatten(scale):
+    from flattener import SchemaFlattener
+    messages = snapshots(int(20000 * scale))
+    flattener = SchemaFlattener(leading_columns=("Receive Time",))
+    start = time.perf_counter()
+    for message in messages:
+        flattener.flatten(message)
+    return len(messages), time.perf_counter() - start
+
+
+@benchmark("record_daq", "rows/s")
+def bench_record_daq(scale, workdir=None):
+    from recorder import ColumnarRecorder
+    messages = snapshots(int(20000 * scale))
+    path = os.path.join(workdir, "bench.daq")
+    recorder = ColumnarRecorder(path)
+    start = time.perf_counter()
+    recorder.start()
+    for message in messages:
+        recorder.record(message, 0.0)
+    recorder.stop()  # Returns once everything is flattened, compressed and written
+    return len(messages), time.perf_counter() - start
+
+
+@benchmark("record_csv", "rows/s")
+def bench_record_csv(scale, workdir=None):
+    from recorder import ColumnarRecorder, convert_to_csv
+    messages = snapshots(int(20000 * scale))
+    path = os.path.join(workdir, "bench.daq")
+    recorder = ColumnarRecorder(path)
+    recorder.start()
+    for message in messages:
+        recorder.record(message, 0.0)
+    recorder.stop()
+    start = time.perf_counter()
+    convert_to_csv(path, os.path.join(workdir, "bench.csv"))
+    return len(messages), time.perf_counter() - start
+
+
+@benchmark("client_receive", "messages/s")
+def bench_client_receive(scale):
+    # client.py's receive_data without the Qt labels: read a line, decode it, skip control
+    # messages, track latency and append the plotted channels
+    from clock_sync import LatencyTracker
+    from decimation import ChannelHistory
+    messages = snapshots(int(10000 * scale))
+    payload = b"".join(json.dumps(m).encode('utf-8') + b'\n' for m in messages)
+    server, client = socket.socketpair()
+    sender = threading.Thread(target=lambda: (server.sendall(payload), server.close()), daemon=True)
+    latency = LatencyTracker()
+    rpm_history, speed_history = ChannelHistory(), ChannelHistory()
+    received = 0
+    start = time.perf_counter()
+    sender.start()
+    stream = client.makefile('rb')
+    while True:
+        line = stream.readline()
+        if not line:
+            break
+        receive_ns = time.monotonic_ns()
+        message = json.loads(line)
+        if "Pong" in message or "Diagnostics" in message:
+            continue
+        latency.add(receive_ns - message["Capture Time"])
+        rs232 = message.get("RS232 Data", {})
+        rpm_history.append(time.monotonic(), float(rs232.get("RPM", 0)))
+        speed_history.append(time.monotonic(), float(message.get("Serial Data", {}).get("Wheel Speed", 0)))
+        received += 1
+    elapsed = time.perf_counter() - start
+    client.close()
+    return received, elapsed
+
+
+def write_session(path, rows):
+    from recorder import SegmentedRecorder
+    recorder = SegmentedRecorder(path)
+    recorder.start()
+    for i, message in enumerate(snapshots(rows)):
+        recorder.record(message, 1_748_779_200 + i / 10)
+    recorder.stop()
+
+
+@benchmark("analyzer_load", "rows/s")
+def bench_analyzer_load(scale, workdir=None):
+    from analysis import load_session, reconstruct_time
+    rows = int(200000 * scale)
+    session = os.path.join(workdir, "session")
+    if not os.path.isdir(session):
+        write_session(session, rows)
+    start = time.perf_counter()
+    data = load_session(session)
+    reconstruct_time(data)
+    elapsed = time.perf_counter() - start
+    assert len(data) == rows
+    return rows, elapsed
+
+
+@benchmark("analyzer_map", "rows/s")
+def bench_analyzer_map(scale, workdir=None):
+    try:
+        import folium  # noqa: F401
+    except ImportError:
+        return None
+    from analysis import build_route_map, find_column, load_session
+    rows = int(5000 * scale)
+    session = os.path.join(workdir, "map_session")
+    if not os.path.isdir(session):
+        write_session(session, rows)
+    data = load_session(session)
+    columns = [find_column(data, [name]) for name in ("Latitude", "Longitude", "Speed", "RPM", "Gear",
+                                                      "Engine Temperature")]
+    start = time.perf_counter()
+    build_route_map(data, *columns, path=os.path.join(workdir, "map.html"))
+    return rows, time.perf_counter() - start
+
+
+def run_benchmark(name, scale, repeat):
+    function, unit = BENCHMARKS[name]
+    workdir = tempfile.mkdtemp(prefix=f"daq_bench_{name}_")
+    try:
+        kwargs = {"workdir": workdir} if "workdir" in function.__code__.co_varnames else {}
+        rates = []
+        for _ in range(repeat):
+            # As timeit does: collections triggered by earlier runs' garbage would add noise
+            gc.collect()
+            gc.disable()
+            try:
+                result = function(scale, **kwargs)
+            finally:
+                gc.enable()
+            if result is None:
+                return None
+            operations, seconds = result
+            rates.append(operations / seconds)
+        return {"unit": unit, "median": statistics.median(rates), "min": min(rates), "max": max(rates),
+                "runs": rates}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(names, scale, repeat):
+    results = {}
+    for name in names:
+        result = run_benchmark(name, scale, repeat)
+        if result is None:
+            print(f"{name:<30} skipped (dependency not installed)")
+            continue
+        results[name] = result
+        spread = (result["max"] - result["min"]) / result["median"] * 100
+        print(f"{name:<30} {result['median']:>14,.0f} {result['unit']:<12} ±{spread:.0f}%")
+    return {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "node": platform.node(),
+            "scale": scale,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold):
+    """Print the change of every benchmark in both result sets; returns the names that regressed."""
+    if baseline["meta"].get("scale") != current["meta"].get("scale"):
+        print("Warning: the runs used different workload scales")
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<30} new")
+            continue
+        change = result["median"] / base["median"] - 1
+        flag = ""
+        if change < -threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif change > threshold:
+            flag = "  faster"
+        print(f"{name:<30} {base['median']:>14,.0f} -> {result['median']:>14,.0f} {result['unit']:<12} {change:+7.1%}{flag}")
+    for name in baseline["results"]:
+        if name not in current["results"]:
+            print(f"{name:<30} missing from this run")
+    return regressions
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the DAQ hot paths")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Benchmarks to run")
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument("--quick", action="store_true", help="Small workloads, for a smoke test")
+    run_parser.add_argument("--output", help="Write the results to this JSON file (e.g. a new baseline)")
+    run_parser.add_argument("--compare", help="Baseline JSON to compare the results against")
+    run_parser.add_argument("--threshold", type=float, default=0.10, help="Slowdown that counts as a regression")
+    compare_parser = commands.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10)
+    commands.add_parser("list", help="List the benchmarks")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for name, (_, unit) in BENCHMARKS.items():
+            print(f"{name:<30} {unit}")
+        return
+    if args.command == "compare":
+        regressions = compare(load_results(args.baseline), load_results(args.current), args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    # Warnings from the noisy RS232 stream still go through logging (and its cost), just not to the console
+    daq_logging.setup(level="WARNING", console_level="CRITICAL")
+    results = run(args.only or list(BENCHMARKS), 0.1 if args.quick else 1.0, args.repeat)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.compare:
+        print()
+        regressions = compare(load_results(args.compare), results, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
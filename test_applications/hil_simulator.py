@@ -0,0 +1,311 @@
+import argparse
+import collections
+import math
+import os
+import pty
+import random
+import select
+import subprocess
+import sys
+import threading
+import time
+import tty
+
+# Hardware-in-the-loop simulator: stands in for the ECU, the Arduino and the SIM7600X on
+# pseudo-terminals, so server.py runs its real serial code (framing, checksums, resync, AT
+# parsing) on any Linux box. Each device gets a pty pair; sensor_reading opens the slave side
+# through DAQ_RS232_PORT / DAQ_ARDUINO_PORT / DAQ_MODEM_PORT, and bytes are written to the
+# master side no faster than the real baud rate allows. Noise bursts, dropped bytes and
+# corrupted frames can be injected to exercise the error paths.
+#
+#   python test_applications/hil_simulator.py --noise 0.02 --corrupt 0.05 --run python server.py
+#
+# Without --run the port variables are printed for another shell; with it the command is
+# started with them set (and DAQ_TUNNEL=0, so clients connect to port 5000 directly).
+
+BITS_PER_BYTE = 10  # 8N1: start bit, 8 data bits, stop bit
+CHUNK = 8  # Bytes delivered per write, like a UART FIFO interrupt threshold
+
+ECU_BAUD = 19200
+ARDUINO_BAUD = 9600
+MODEM_BAUD = 115200
+
+# Simulated car: a 60 s lap around a 300 m radius circle near the default GPS position
+LAP_TIME = 60.0
+TRACK_CENTRE = (53.8067, -1.5550)
+TRACK_RADIUS_M = 300.0
+
+
+class Faults:
+    """Line faults applied to each message: a noise burst before it, a corrupted byte, dropped bytes."""
+
+    def __init__(self, noise=0.0, drop=0.0, corrupt=0.0, rng=None):
+        self.noise = noise
+        self.drop = drop
+        self.corrupt = corrupt
+        self.rng = rng or random.Random()
+
+    def apply(self, message, stats):
+        rng = self.rng
+        data = bytearray(message)
+        if self.corrupt and rng.random() < self.corrupt:
+            data[rng.randrange(len(data))] ^= 1 << rng.randrange(8)
+            stats["corrupted"] += 1
+        if self.drop:
+            kept = bytearray(byte for byte in data if rng.random() >= self.drop)
+            stats["dropped bytes"] += len(data) - len(kept)
+            data = kept
+        if self.noise and rng.random() < self.noise:
+            burst = bytes(rng.randrange(256) for _ in range(rng.randint(1, 32)))
+            data[0:0] = burst
+            stats["noise bytes"] += len(burst)
+        return bytes(data)
+
+
+class SimPort:
+    """One pty pair; the DAQ opens `path`, and send() paces writes to the master at `baud`."""
+
+    def __init__(self, name, baud, faults):
+        self.name = name
+        self.faults = faults
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)
+        os.set_blocking(self.master, False)
+        self.path = os.ttyname(self.slave)  # Kept open here so the pair survives the DAQ reopening it
+        self.byte_time = BITS_PER_BYTE / baud
+        self.wire_free = time.monotonic()  # When the last queued byte has finished arriving
+        self.stats = collections.Counter()
+
+    def send(self, message, faults=True):
+        data = self.faults.apply(message, self.stats) if faults else message
+        self.stats["messages"] += 1
+        for i in range(0, len(data), CHUNK):
+            chunk = data[i:i + CHUNK]
+            # A chunk can be read once its last byte has been clocked in
+            self.wire_free = max(self.wire_free, time.monotonic()) + len(chunk) * self.byte_time
+            delay = self.wire_free - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                os.write(self.master, chunk)
+                self.stats["bytes"] += len(chunk)
+            except BlockingIOError:
+                self.stats["overrun bytes"] += len(chunk)  # Nobody reading; a UART would drop them too
+
+    def close(self):
+        os.close(self.master)
+        os.close(self.slave)
+
+
+def car_state(t):
+    """Speed, gear, RPM and the rest of the simulated car at `t` seconds into the run."""
+    lap = 2 * math.pi * t / LAP_TIME
+    speed = 60 + 40 * math.sin(2 * lap)  # km/h, two straights and two corners a lap
+    gear = max(1, min(6, int(speed / 20) + 1))
+    rpm = 3000 + (speed % 20) / 20 * 8000 + 500 * gear
+    return {
+        "speed": speed,
+        "gear": gear,
+        "rpm": rpm,
+        "throttle": max(0.0, min(100.0, 50 + 50 * math.cos(2 * lap))),
+        "engine temp": 60 + 30 * (1 - math.exp(-t / 300)),  # Warms up over the first few minutes
+        "battery": 13.8 + 0.2 * math.sin(t / 7),
+        "lambda": 1.0 + 0.05 * math.sin(t * 3),
+        "lap angle": lap,
+    }
+
+
+def ecu_frame(t):
+    """One 144-byte ECU frame: channel values where sensor_reading decodes them, end markers and checksum."""
+    state = car_state(t)
+    frame = bytearray(144)
+
+    def put(offset, value):
+        frame[offset:offset + 2] = max(0, min(0xFFFF, int(round(value)))).to_bytes(2, byteorder='big')
+
+    put(0, state["rpm"])
+    put(2, state["throttle"] * 10)
+    put(8, state["engine temp"] * 10)
+    put(44, state["battery"] * 100)
+    put(56, state["speed"] * 10)  # Drive speed
+    put(58, state["speed"] * 0.98 * 10)  # Ground speed, with a little wheel slip
+    put(66, state["lambda"] * 1000)
+    put(104, state["gear"] * 10)
+    frame[140:143] = b'\xfc\xfb\xfa'
+    frame[143] = sum(frame[:143]) & 0xFF
+    return bytes(frame)
+
+
+def arduino_line(t):
+    """One line in the Arduino's "Name:VAL,Name2:VAL2" format."""
+    state = car_state(t)
+    neutral = 1 if state["speed"] < 25 and state["gear"] == 1 else 0
+    return f"Wheel Speed:{int(state['speed'] * 10)},Neutral Flag:{neutral},Killswitch:0\n".encode()
+
+
+def cgpsinfo(t):
+    """The fields of a +CGPSINFO reply for the simulated position at `t`."""
+    angle = car_state(t)["lap angle"]
+    lat = TRACK_CENTRE[0] + TRACK_RADIUS_M * math.sin(angle) / 111320
+    lon = TRACK_CENTRE[1] + TRACK_RADIUS_M * math.cos(angle) / (111320 * math.cos(math.radians(TRACK_CENTRE[0])))
+
+    def dm(value, degree_digits):
+        degrees = int(abs(value))
+        return f"{degrees:0{degree_digits}d}{(abs(value) - degrees) * 60:09.6f}"
+
+    now = time.time()
+    utc = time.gmtime(now)
+    return ",".join([
+        dm(lat, 2), "N" if lat >= 0 else "S", dm(lon, 3), "E" if lon >= 0 else "W",
+        time.strftime("%d%m%y", utc), time.strftime("%H%M%S", utc) + f".{int(now * 10) % 10}",
+        "120.0", f"{car_state(t)['speed'] / 1.852:.1f}", f"{math.degrees(angle) % 360:.1f}",
+    ])
+
+
+class ModemSimulator:
+    """Answers the AT commands sensor_reading sends to the SIM7600X, with command echo on."""
+
+    def __init__(self, port, started, fix_after=0.0, reply_delay=0.02):
+        self.port = port
+        self.started = started
+        self.fix_after = fix_after
+        self.reply_delay = reply_delay
+        self.gps_on = False
+        self.buffer = b''
+
+    def run(self, stop_event):
+        while not stop_event.is_set():
+            readable, _, _ = select.select([self.port.master], [], [], 0.1)
+            if not readable:
+                continue
+            try:
+                self.buffer += os.read(self.port.master, 1024)
+            except BlockingIOError:
+                continue
+            while b'\r' in self.buffer:
+                command, self.buffer = self.buffer.split(b'\r', 1)
+                command = command.strip().decode(errors='replace')
+                if command:
+                    self.port.stats["commands"] += 1
+                    time.sleep(self.reply_delay)
+                    self.port.send(f"{command}\r\r\n{self.reply(command)}\r\n".encode())
+
+    def reply(self, command):
+        if command == "AT":
+            return "OK"
+        if command == "AT+CGPS=1,1":
+            if self.gps_on:
+                return "ERROR"  # As the module answers when the session is already running
+            self.gps_on = True
+            return "OK"
+        if command == "AT+CGPS=0":
+            self.gps_on = False
+            return "OK"
+        if command == "AT+CGPSINFO":
+            t = time.monotonic() - self.started
+            if self.gps_on and t >= self.fix_after:
+                self.port.stats["fixes"] += 1
+                return f"+CGPSINFO: {cgpsinfo(t)}\r\n\r\nOK"
+            return "+CGPSINFO: ,,,,,,,,\r\n\r\nOK"
+        return "ERROR"
+
+
+class Simulator:
+    """The three simulated devices; start() runs them on daemon threads until stop()."""
+
+    def __init__(self, noise=0.0, drop=0.0, corrupt=0.0, ecu_hz=None, arduino_hz=2.0,
+                 gps_fix_after=0.0, modem_delay=0.02, seed=None):
+        rng = random.Random(seed)
+        faults = Faults(noise, drop, corrupt, rng)
+        self.ecu = SimPort("ecu", ECU_BAUD, faults)
+        self.arduino = SimPort("arduino", ARDUINO_BAUD, faults)
+        self.modem = SimPort("modem", MODEM_BAUD, Faults(rng=rng))  # AT replies are not corrupted
+        self.ecu_hz = ecu_hz
+        self.arduino_hz = arduino_hz
+        self.started = time.monotonic()
+        self.modem_sim = ModemSimulator(self.modem, self.started, gps_fix_after, modem_delay)
+        self.stop_event = threading.Event()
+        self.threads = []
+
+    def env(self):
+        """Environment variables that point sensor_reading at the simulated ports."""
+        return {"DAQ_RS232_PORT": self.ecu.path, "DAQ_ARDUINO_PORT": self.arduino.path,
+                "DAQ_MODEM_PORT": self.modem.path}
+
+    def start(self):
+        for name, target in (("ecu", self.run_ecu), ("arduino", self.run_arduino),
+                             ("modem", lambda: self.modem_sim.run(self.stop_event))):
+            thread = threading.Thread(target=target, name=f"sim-{name}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join(timeout=2)
+        for port in (self.ecu, self.arduino, self.modem):
+            port.close()
+
+    def run_periodic(self, port, message, rate_hz):
+        # Absolute deadlines; with no rate, messages go back to back at the line rate
+        deadline = time.monotonic()
+        while not self.stop_event.is_set():
+            port.send(message(time.monotonic() - self.started))
+            if rate_hz:
+                deadline += 1 / rate_hz
+                self.stop_event.wait(max(0.0, deadline - time.monotonic()))
+
+    def run_ecu(self):
+        self.run_periodic(self.ecu, ecu_frame, self.ecu_hz)
+
+    def run_arduino(self):
+        self.run_periodic(self.arduino, arduino_line, self.arduino_hz)
+
+    def stats(self):
+        return {port.name: dict(port.stats) for port in (self.ecu, self.arduino, self.modem)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate the DAQ's serial devices on pseudo-terminals")
+    parser.add_argument("--noise", type=float, default=0.0, help="Chance of a garbage burst before each message")
+    parser.add_argument("--drop", type=float, default=0.0, help="Chance of losing each byte")
+    parser.add_argument("--corrupt", type=float, default=0.0, help="Chance of a flipped bit in each message")
+    parser.add_argument("--ecu-hz", type=float, default=None, help="ECU frame rate (default: back to back)")
+    parser.add_argument("--arduino-hz", type=float, default=2.0)
+    parser.add_argument("--gps-fix-after", type=float, default=5.0, help="Seconds before the GPS reports a fix")
+    parser.add_argument("--modem-delay", type=float, default=0.02, help="Seconds before each AT reply")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--seconds", type=float, default=None, help="Stop after this long")
+    parser.add_argument("--report", type=float, default=10.0, help="Seconds between statistics lines")
+    parser.add_argument("--run", nargs=argparse.REMAINDER, help="Command to run against the simulated ports")
+    args = parser.parse_args()
+
+    sim = Simulator(args.noise, args.drop, args.corrupt, args.ecu_hz, args.arduino_hz,
+                    args.gps_fix_after, args.modem_delay, args.seed).start()
+    for name, path in sim.env().items():
+        print(f"export {name}={path}")
+    sys.stdout.flush()
+
+    process = None
+    if args.run:
+        process = subprocess.Popen(args.run, env={**os.environ, **sim.env(), "DAQ_TUNNEL": "0"})
+    end = time.monotonic() + args.seconds if args.seconds else None
+    try:
+        while end is None or time.monotonic() < end:
+            time.sleep(max(0.0, min(args.report, end - time.monotonic())) if end else args.report)
+            print(sim.stats(), flush=True)
+            if process and process.poll() is not None:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if process and process.poll() is None:
+            process.terminate()
+            process.wait(timeout=10)
+        sim.stop()
+        print(sim.stats())
+
+
+if __name__ == "__main__":
+    main()
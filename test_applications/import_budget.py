@@ -0,0 +1,68 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# Cold-start check for server.py in headless mode: imports the module in fresh interpreters
+# with `python -X importtime` and fails if the import takes longer than the budget or pulls
+# in anything that only some modes need (see the import notes at the top of server.py).
+#   python test_applications/import_budget.py --budget-ms 150
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Top-level packages that must not be imported just by importing server.py headless
+DEFERRED_MODULES = {
+    "PyQt5", "pyqtgraph", "dashboard", "fb_dashboard", "numpy", "pandas",
+    "sensor_reading", "serial", "RPi", "board", "adafruit_mpu6050",
+    "recorder", "subprocess", "urllib", "multiprocessing", "shm_ring",
+    "asyncio", "event_acquisition",
+}
+
+
+def measure(module):
+    """Import `module` once in a fresh headless interpreter; returns ({module: cumulative us}, total us)."""
+    env = dict(os.environ)
+    env.pop("DISPLAY", None)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        sys.exit(f"Importing {module} failed:\n{result.stderr}")
+    imported = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imported[name.strip()] = int(cumulative)
+    return imported, imported.get(module, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if importing server.py headless gets slow")
+    parser.add_argument("--module", default="server")
+    parser.add_argument("--budget-ms", type=float, default=150, help="Median import time allowed")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    measure(args.module)  # Warm-up: compiles .pyc files so later runs measure a normal boot
+    times = []
+    deferred = set()
+    for _ in range(args.runs):
+        imported, total = measure(args.module)
+        times.append(total / 1000)
+        deferred |= {name for name in imported if name.split(".")[0] in DEFERRED_MODULES}
+
+    median = statistics.median(times)
+    print(f"import {args.module}: median {median:.1f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    failed = False
+    if deferred:
+        print("Imported at startup but should be deferred: " + ", ".join(sorted(deferred)))
+        failed = True
+    if median > args.budget_ms:
+        print("Import time budget exceeded")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+import argparse
+import asyncio
+import json
+import os
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+# Multi-client load test for server.py: opens N simulated pitwall clients, some of them
+# deliberately slow readers, and reports what they received and what the load did to the car.
+#
+#   python test_applications/load_test.py --launch test --clients 50 --slow 5 --rate 10
+#   python test_applications/load_test.py --launch hil --clients 20 --seconds 60
+#   python test_applications/load_test.py --host 192.168.1.20 --metrics-url http://192.168.1.20:9108/metrics
+#
+# --launch starts server.py itself, in TEST_MODE or against the HIL simulator's ports, in a
+# scratch directory; otherwise it connects to a running server (in TEST_MODE or with
+# DAQ_TUNNEL=0, which serve clients concurrently). The report covers the delivered message rate,
+# capture-to-receive latency percentiles (clocks aligned with the Ping/Pong exchange), server
+# CPU from /proc (local servers only) and the acquisition jitter and overruns from its /metrics
+# endpoint, measured once with no clients as a baseline and again under load. The run fails if
+# the slow clients' p99 latency exceeds --max-slow-latency, by default the time their own receive
+# buffer takes to drain: the server must skip snapshots rather than queue them up.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from clock_sync import ClockSync, make_ping  # noqa: E402
+
+PING_INTERVAL = 2.0  # seconds
+SLOW_RECEIVE_BUFFER = 4096  # bytes; small, so a slow reader pushes back on the server quickly
+SLOW_LATENCY_SLACK = 1.0  # seconds allowed on top of draining a slow client's own receive buffer
+METRIC_LINE = re.compile(r'^(\w+)(?:\{(.*)\})? (\S+)$')
+
+
+class ClientStats:
+    def __init__(self, slow):
+        self.slow = slow
+        self.messages = 0
+        self.bytes = 0
+        self.latencies_ms = []
+        self.receive_buffer = 0
+        self.error = None
+
+
+async def run_client(host, port, stats, read_rate, end_time):
+    """One simulated client; `read_rate` bytes/s caps how fast it reads (None reads as fast as it can)."""
+    loop = asyncio.get_running_loop()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if read_rate:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SLOW_RECEIVE_BUFFER)
+    stats.receive_buffer = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)  # What the kernel granted
+    sock.setblocking(False)
+    clock = ClockSync()
+    try:
+        await loop.sock_connect(sock, (host, port))
+    except OSError as e:
+        stats.error = str(e)
+        sock.close()
+        return
+
+    async def ping():
+        while True:
+            await loop.sock_sendall(sock, json.dumps(make_ping()).encode('utf-8') + b'\n')
+            await asyncio.sleep(PING_INTERVAL)
+
+    # Read the socket directly rather than through a StreamReader, whose own buffer would let a
+    # slow client hold far more than SLOW_RECEIVE_BUFFER and hide how the server treats it
+    pinger = asyncio.create_task(ping())
+    pending = b""
+    try:
+        while loop.time() < end_time:
+            try:
+                chunk = await asyncio.wait_for(loop.sock_recv(sock, 1024 if read_rate else 65536), end_time - loop.time())
+            except asyncio.TimeoutError:
+                break
+            if not chunk:
+                stats.error = "server closed the connection"
+                break
+            receive_ns = time.monotonic_ns()
+            stats.bytes += len(chunk)
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            for line in lines:
+                message = json.loads(line)
+                if "Pong" in message:
+                    clock.add_pong(message["Pong"], receive_ns)
+                    continue
+                if "Diagnostics" in message:
+                    continue
+                stats.messages += 1
+                capture_ns = message.get("Capture Time")
+                if isinstance(capture_ns, int) and clock.synced:
+                    stats.latencies_ms.append((receive_ns - clock.to_local(capture_ns)) / 1e6)
+            if read_rate:
+                await asyncio.sleep(len(chunk) / read_rate)
+    except (OSError, ValueError) as e:
+        stats.error = str(e)
+    finally:
+        pinger.cancel()
+        sock.close()
+
+
+async def run_clients(args):
+    loop = asyncio.get_running_loop()
+    end_time = loop.time() + args.seconds
+    clients = [ClientStats(slow=i < args.slow) for i in range(args.clients)]
+    tasks = []
+    for stats in clients:
+        tasks.append(asyncio.create_task(
+            run_client(args.host, args.port, stats, args.slow_rate if stats.slow else None, end_time)))
+        await asyncio.sleep(args.ramp / max(args.clients, 1))  # Spread the connects over --ramp seconds
+    await asyncio.gather(*tasks)
+    return clients
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, round(p / 100 * (len(values) - 1)))]
+
+
+def scrape(url):
+    """Parsed /metrics text: {(name, labels): value}."""
+    samples = {}
+    with urllib.request.urlopen(url, timeout=5) as response:
+        for line in response.read().decode().splitlines():
+            match = METRIC_LINE.match(line)
+            if match:
+                name, labels, value = match.groups()
+                samples[(name, labels or "")] = float(value)
+    return samples
+
+
+def jitter_report(before, after):
+    """Per source: (runs, p50, p95, p99 in ms, overruns) over the interval between two scrapes."""
+    buckets = {}
+    for (name, labels), value in after.items():
+        if name != "daq_source_jitter_seconds_bucket":
+            continue
+        source = re.search(r'source="([^"]*)"', labels).group(1)
+        le = float(re.search(r'le="([^"]*)"', labels).group(1).replace("+Inf", "inf"))
+        buckets.setdefault(source, []).append((le, value - before.get((name, labels), 0)))
+    report = {}
+    for source, counts in buckets.items():
+        counts.sort()
+        total = counts[-1][1]
+        quantiles = []
+        for q in (0.5, 0.95, 0.99):
+            bound = next((le for le, cumulative in counts if cumulative >= q * total), float("inf")) if total else None
+            quantiles.append(None if bound is None else bound * 1000)
+        key = ("daq_source_overruns_total", f'source="{source}"')
+        overruns = after.get(key, 0) - before.get(key, 0)
+        report[source] = (int(total), *quantiles, int(overruns))
+    return report
+
+
+def format_ms(value):
+    if value is None:
+        return "--"
+    return "over max" if value == float("inf") else f"{value:.2f}"
+
+
+def print_jitter(title, report):
+    print(f"{title}:")
+    print(f"  {'source':<14}{'runs':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'overruns':>10}")
+    for source, (runs, p50, p95, p99, overruns) in sorted(report.items()):
+        cells = "".join(f"{format_ms(v):>9}" for v in (p50, p95, p99))
+        print(f"  {source:<14}{runs:>7}{cells}{overruns:>10}")
+
+
+def cpu_seconds(pid):
+    """User + system CPU seconds used so far by `pid` (Linux /proc)."""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def wait_for_port(host, port, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def launch_server(mode, rate, workdir):
+    """Start server.py in `workdir`; returns (process, simulator or None)."""
+    env = dict(os.environ)
+    env.pop("DISPLAY", None)
+    env["DAQ_FRAMEBUFFER"] = os.path.join(workdir, "no-framebuffer")
+    env["DAQ_CLIENT_RATE"] = str(rate)
+    simulator = None
+    if mode == "test":
+        env["DAQ_TEST_MODE"] = "1"
+    else:
+        from hil_simulator import Simulator
+        simulator = Simulator(gps_fix_after=1.0).start()
+        env.update(simulator.env())
+        env["DAQ_TUNNEL"] = "0"
+    log = open(os.path.join(workdir, "server.log"), "w")
+    process = subprocess.Popen([sys.executable, os.path.join(REPO_ROOT, "server.py")], cwd=workdir, env=env,
+                               stdout=log, stderr=subprocess.STDOUT)
+    return process, simulator
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test server.py with many simulated clients")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--slow", type=int, default=0, help="How many of the clients read slowly")
+    parser.add_argument("--slow-rate", type=float, default=2000, help="Bytes per second a slow client reads")
+    parser.add_argument("--seconds", type=float, default=30, help="Duration of the loaded phase")
+    parser.add_argument("--baseline", type=float, default=10, help="Seconds measured with no clients first (0 to skip)")
+    parser.add_argument("--ramp", type=float, default=1.0, help="Seconds over which the clients connect")
+    parser.add_argument("--launch", choices=("test", "hil"), help="Start server.py in TEST_MODE or against the HIL simulator")
+    parser.add_argument("--rate", type=float, default=10, help="Snapshots per second per client when launching")
+    parser.add_argument("--metrics-url", default="http://127.0.0.1:9108/metrics")
+    parser.add_argument("--server-pid", type=int, help="PID of a local server, for its CPU usage")
+    parser.add_argument("--max-slow-latency", type=float,
+                        help="Fail if the slow clients' p99 latency exceeds this many seconds "
+                             "(default: the time to drain their receive buffer plus 1 s; 0: don't check)")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    process = simulator = workdir = None
+    pid = args.server_pid
+    failure = None
+    try:
+        if args.launch:
+            workdir = tempfile.mkdtemp(prefix="daq_load_")
+            process, simulator = launch_server(args.launch, args.rate, workdir)
+            pid = process.pid
+            if not wait_for_port(args.host, args.port, 20):
+                sys.exit(f"server.py did not start listening; see {workdir}/server.log")
+            print(f"Started server.py (pid {pid}, {args.launch}) in {workdir}")
+
+        metrics = None
+        try:
+            metrics = scrape(args.metrics_url)
+        except OSError as e:
+            print(f"No metrics endpoint at {args.metrics_url} ({e}); jitter will not be reported")
+
+        baseline = None
+        if args.baseline and metrics is not None:
+            cpu_start = cpu_seconds(pid) if pid else None
+            time.sleep(args.baseline)
+            after = scrape(args.metrics_url)
+            baseline = (jitter_report(metrics, after),
+                        (cpu_seconds(pid) - cpu_start) / args.baseline * 100 if pid else None)
+            metrics = after
+
+        cpu_start = cpu_seconds(pid) if pid else None
+        started = time.monotonic()
+        clients = asyncio.run(run_clients(args))
+        elapsed = time.monotonic() - started
+        cpu_percent = (cpu_seconds(pid) - cpu_start) / elapsed * 100 if pid else None
+        loaded = jitter_report(metrics, scrape(args.metrics_url)) if metrics is not None else None
+
+        report = {"clients": args.clients, "slow clients": args.slow, "seconds": elapsed, "groups": {}}
+        print(f"\n{args.clients} clients ({args.slow} slow) for {elapsed:.1f} s")
+        for name, group in (("fast", [c for c in clients if not c.slow]), ("slow", [c for c in clients if c.slow])):
+            if not group:
+                continue
+            messages = sum(c.messages for c in group)
+            latencies = [ms for c in group for ms in c.latencies_ms]
+            errors = [c.error for c in group if c.error]
+            summary = {
+                "messages per second": messages / elapsed,
+                "per client": messages / elapsed / len(group),
+                "bytes per second": sum(c.bytes for c in group) / elapsed,
+                "latency ms": {f"p{p}": percentile(latencies, p) for p in (50, 95, 99, 100)},
+                "errors": errors,
+            }
+            report["groups"][name] = summary
+            lat = summary["latency ms"]
+            lat_text = " / ".join("--" if v is None else f"{v:.1f}" for v in lat.values())
+            print(f"  {name:<5} {summary['messages per second']:8.1f} msg/s ({summary['per client']:.2f} per client), "
+                  f"{summary['bytes per second'] / 1024:.1f} KiB/s, latency p50/95/99/max {lat_text} ms, "
+                  f"{len(errors)} errors")
+            for error in sorted(set(errors)):
+                print(f"        {errors.count(error)} x {error}")
+            # The server skips snapshots a slow client cannot take, so the client's data is only as
+            # stale as what its own receive buffer holds, however long the run
+            limit = args.max_slow_latency
+            if limit is None:
+                limit = max(c.receive_buffer for c in group) / args.slow_rate + SLOW_LATENCY_SLACK
+            if name == "slow" and limit and (lat["p99"] is None or lat["p99"] > limit * 1000):
+                failure = f"slow clients' p99 latency {format_ms(lat['p99'])} ms exceeds {limit * 1000:.0f} ms"
+        if cpu_percent is not None:
+            report["server cpu percent"] = cpu_percent
+            idle_cpu = f" (no clients: {baseline[1]:.1f}%)" if baseline and baseline[1] is not None else ""
+            print(f"  server CPU {cpu_percent:.1f}%{idle_cpu}")
+        if baseline:
+            print_jitter("\nAcquisition jitter, no clients", baseline[0])
+            report["jitter baseline"] = baseline[0]
+        if loaded:
+            print_jitter("Acquisition jitter, under load", loaded)
+            report["jitter under load"] = loaded
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(report, f, indent=2)
+    finally:
+        if process:
+            process.terminate()
+            process.wait(timeout=10)
+        if simulator:
+            simulator.stop()
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    if failure:
+        sys.exit(f"\nFAILED: {failure}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+import argparse
+import bisect
+import json
+import os
+import select
+import socket
+import sys
+import threading
+import time
+
+# Replays a recorded session over server.py's wire protocol, so the client, recorder and
+# analyzer can be developed and load-tested against real race data on a laptop:
+#
+#   python test_applications/replay_server.py recordings/20250614-101500
+#   python test_applications/replay_server.py blackbox/20250614-101500 --speed 20 --start 600
+#   python test_applications/replay_server.py recorded_data.csv --loop
+#   python test_applications/replay_server.py ecu_capture.bin --speed 5
+#
+# Accepted inputs: client or black-box session directories, .daq files, CSV exports (client
+# recordings or `recorder.py to-csv`) and raw ECU captures (the bytes read from the RS232 port,
+# e.g. `cat /dev/ttyAMA5 > ecu_capture.bin`, or session_generator.py's ECU output).
+#
+# Every recorded message is sent at its original time relative to the others, divided by
+# --speed. All clients share one playback clock, like clients of the car do. Clients can send
+# {"Seek": seconds} to jump to that point of the session, and get {"Ping"} answered with a
+# {"Pong"} like server.py does. "Capture Time" stamps (and the clock anchor) are shifted onto
+# this machine's monotonic clock as they are sent, so clock sync, latency figures and
+# reconstruct_time keep working; at --speed above 1 the ages between stamps stay as recorded.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import analysis
+import clock_sync
+from recorder import RECEIVE_TIME_COLUMN
+
+HOST = "0.0.0.0"
+PORT = 5000
+MAX_SPEED = 100
+ECU_FRAME_RATE = 19200 / 10 / 144  # Frames per second when the ECU streams back to back at 19200 baud
+# Columns holding monotonic nanoseconds; shifted to this machine's clock on the way out
+MONOTONIC_COLUMNS = ("Capture Time", "Clock Anchor.Monotonic")
+
+
+def is_monotonic(name):
+    """Whether a column holds monotonic nanoseconds (not a staleness age in ms)."""
+    return name in MONOTONIC_COLUMNS or (name.endswith(".Capture Time") and not name.startswith("Staleness."))
+
+
+class Session:
+    """A recording as parallel column arrays with per-row session times (seconds from the first row)."""
+
+    def __init__(self, names, arrays, times):
+        self.times = times
+        self.rows = len(times)
+        # Each column's path into the nested message, e.g. "GPS Data.Latitude" -> ("GPS Data", "Latitude")
+        self._columns = [(tuple(name.split(".")), array, is_monotonic(name)) for name, array in zip(names, arrays)]
+        self._capture = arrays[names.index("Capture Time")] if "Capture Time" in names else None
+
+    @property
+    def duration(self):
+        return self.times[-1] if self.rows else 0.0
+
+    def index_at(self, position):
+        """Index of the first row at or after `position` seconds."""
+        return bisect.bisect_left(self.times, position)
+
+    def message(self, i, now_ns):
+        """Row `i` as the nested message server.py would have sent, monotonic stamps moved to `now_ns`."""
+        shift = None
+        if self._capture is not None:
+            capture = self._capture[i]
+            if capture == capture:  # Not NaN
+                shift = now_ns - int(capture)
+        message = {}
+        for path, array, monotonic in self._columns:
+            value = array[i]
+            if value is None or value != value:
+                continue  # Channel absent from this message
+            if hasattr(value, "item"):
+                value = value.item()
+            if monotonic and shift is not None:
+                value = int(value) + shift
+            target = message
+            for key in path[:-1]:
+                target = target.setdefault(key, {})
+            target[path[-1]] = value
+        return message
+
+
+def session_times(data):
+    """Seconds from the first row: capture time where it was recorded, otherwise receive time."""
+    times = analysis.reconstruct_time(data)
+    if times is None:
+        return None
+    times = times.astype(float)
+    if times.isna().all():
+        return None
+    times = times.ffill().bfill()
+    return (times - times.iloc[0]).tolist()
+
+
+def load_recording(path):
+    """Load a session directory, .daq or CSV recording into a Session."""
+    data = analysis.load_session(path)
+    if data.empty:
+        raise ValueError(f"{path} holds no rows")
+    times = session_times(data)
+    if times is None:
+        raise ValueError(f"{path} has no Capture Time or {RECEIVE_TIME_COLUMN} column to time the replay with")
+    # Time can step backwards across a reboot or between segments; keep it monotonic for seeking
+    for i in range(1, len(times)):
+        if times[i] < times[i - 1]:
+            times[i] = times[i - 1]
+    names = [name for name in data.columns if name != RECEIVE_TIME_COLUMN]
+    arrays = [data[name].to_numpy() for name in names]
+    return Session(names, arrays, times)
+
+
+def load_ecu_capture(path, frame_rate=ECU_FRAME_RATE):
+    """Decode a raw ECU byte capture into a Session of {"RS232 Data": ...} messages, each timed
+    from where it starts in the capture at `frame_rate` frames (of bytes) per second, so gaps
+    and noise between frames keep their length."""
+    import numpy as np
+    from sensor_reading import RS232_FRAME_SIZE, RS232Decoder
+    with open(path, "rb") as f:
+        data = f.read()
+    decoder = RS232Decoder()
+    frames, times = [], []
+    for end in range(RS232_FRAME_SIZE, len(data) + RS232_FRAME_SIZE, RS232_FRAME_SIZE):
+        decoded = decoder.feed(data[end - RS232_FRAME_SIZE:end], 0)
+        # The decoded frames are contiguous and end where the decoder's leftover bytes begin
+        frame_end = min(end, len(data)) - len(decoder.buffer)
+        for k, frame in enumerate(decoded):
+            start = frame_end - (len(decoded) - k) * RS232_FRAME_SIZE
+            frames.append(frame)
+            times.append(start / RS232_FRAME_SIZE / frame_rate)
+    if not frames:
+        raise ValueError(f"No valid ECU frames in {path}")
+    stamps = [int(t * 1e9) for t in times]
+    names = ["Capture Time"] + [f"RS232 Data.{key}" for key in frames[0]]
+    arrays = [np.array(stamps, dtype=object)]
+    for key in frames[0]:
+        arrays.append(np.array(stamps if key == "Capture Time" else [frame[key] for frame in frames], dtype=object))
+    return Session(names, arrays, times)
+
+
+def load(path, frame_rate=ECU_FRAME_RATE):
+    if os.path.isfile(path) and not path.endswith((".csv", ".daq")):
+        return load_ecu_capture(path, frame_rate)
+    return load_recording(path)
+
+
+class PlaybackClock:
+    """Session position shared by every client: advances at `speed` once started, jumps on seek."""
+
+    def __init__(self, duration, speed=1.0, start=0.0, loop=False):
+        self.duration = duration
+        self.speed = speed
+        self.loop = loop
+        self._lock = threading.Lock()
+        self.generation = 0  # Bumped on every seek or loop so clients re-find their place
+        self._running = False
+        self._set(start)
+
+    def start(self):
+        """Start playback; called when the first client connects, later calls do nothing."""
+        with self._lock:
+            if not self._running:
+                self._running = True
+                self._started = time.monotonic()
+
+    def _set(self, position):
+        self._origin = min(max(position, 0.0), self.duration)
+        self._started = time.monotonic()
+
+    def seek(self, position):
+        with self._lock:
+            self._set(position)
+            self.generation += 1
+        print(f"Seek to {self._origin:.1f} s")
+
+    def position(self):
+        """(seconds into the session, generation)."""
+        with self._lock:
+            position = self._origin
+            if self._running:
+                position += (time.monotonic() - self._started) * self.speed
+            if position > self.duration and self.loop:
+                self._set(0.0)
+                self.generation += 1
+                position = 0.0
+            return min(position, self.duration), self.generation
+
+    def wall_delay(self, session_time):
+        """Seconds until the clock reaches `session_time`."""
+        position, _ = self.position()
+        return max(session_time - position, 0.0) / self.speed
+
+
+def send(conn, message):
+    conn.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+
+def serve_client(conn, addr, session, clock, stop_event):
+    """Stream the session to one client from the shared clock, answering pings and seeks."""
+    pending = b""
+    position, generation = clock.position()
+    next_row = session.index_at(position)
+    try:
+        while not stop_event.is_set():
+            # Sleep until the next row is due (or a command arrives); an idle finished replay polls slowly
+            delay = clock.wall_delay(session.times[next_row]) if next_row < session.rows else 0.5
+            readable, _, _ = select.select([conn], [], [], min(delay, 0.5))
+            if readable:
+                receive_ns = time.monotonic_ns()
+                chunk = conn.recv(4096)
+                if not chunk:
+                    break
+                lines = (pending + chunk).split(b"\n")
+                pending = lines.pop()
+                for line in lines:
+                    try:
+                        message = json.loads(line)
+                    except ValueError:
+                        continue  # e.g. the client's plain-text "shutdown"
+                    ping = clock_sync.ping_of(message)
+                    if ping:
+                        send(conn, clock_sync.make_pong(ping, receive_ns))
+                    elif isinstance(message, dict) and isinstance(message.get("Seek"), (int, float)):
+                        clock.seek(message["Seek"])
+            position, current = clock.position()
+            if current != generation:
+                generation = current
+                next_row = session.index_at(position)
+            while next_row < session.rows and session.times[next_row] <= position:
+                send(conn, session.message(next_row, time.monotonic_ns()))
+                next_row += 1
+    except (ConnectionResetError, BrokenPipeError):
+        pass
+    finally:
+        print(f"Connection with {addr} closed.")
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded session over the DAQ server's wire protocol")
+    parser.add_argument("recording", help="Session directory, .daq, CSV or raw ECU capture")
+    parser.add_argument("--speed", type=float, default=1.0, help=f"Playback speed, 1 to {MAX_SPEED}")
+    parser.add_argument("--start", type=float, default=0.0, help="Seconds into the session to start from")
+    parser.add_argument("--loop", action="store_true", help="Start over at the end of the session")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--ecu-rate", type=float, default=ECU_FRAME_RATE, help="Frames per second of a raw ECU capture")
+    args = parser.parse_args()
+    if not 1 <= args.speed <= MAX_SPEED:
+        parser.error(f"--speed must be between 1 and {MAX_SPEED}")
+
+    started = time.monotonic()
+    try:
+        session = load(args.recording, args.ecu_rate)
+    except (OSError, ValueError) as e:
+        sys.exit(f"Cannot replay {args.recording}: {e}")
+    print(f"Loaded {session.rows} messages covering {session.duration:.1f} s in {time.monotonic() - started:.1f} s")
+
+    clock = PlaybackClock(session.duration, args.speed, args.start, args.loop)
+    stop_event = threading.Event()
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server_socket.bind((args.host, args.port))
+    server_socket.listen(5)
+    print(f"Replaying at {args.speed:g}x on {args.host}:{args.port}")
+    try:
+        while True:
+            conn, addr = server_socket.accept()
+            print(f"Connection established with {addr}")
+            clock.start()
+            threading.Thread(target=serve_client, args=(conn, addr, session, clock, stop_event), daemon=True).start()
+    except KeyboardInterrupt:
+        print("Replay server shutting down...")
+    finally:
+        stop_event.set()
+        server_socket.close()
+
+
+if __name__ == "__main__":
+    main()
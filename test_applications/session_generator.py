@@ -0,0 +1,325 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+# Synthetic race sessions for large-scale benchmarks, generated with NumPy in one pass:
+#
+#   python test_applications/session_generator.py --hours 4 --session recordings/synthetic
+#   python test_applications/session_generator.py --hours 0.5 --csv lap_data.csv --ecu ecu_capture.bin
+#
+# The car drives a closed racing line around the HIL simulator's track centre. Its speed
+# profile follows from the line's curvature (cornering, acceleration and braking limits),
+# and the other channels are derived from it: gear and RPM from the gearbox, throttle from
+# longitudinal acceleration, IMU G-forces and yaw rate from speed and curvature, engine and
+# IMU temperatures warming up and following load. Lap times vary a little from lap to lap.
+#
+# Rows have the shape server.py publishes by default: resampled onto the publish grid, each
+# source held at its latest sample (IMU 20 Hz, Arduino 2 Hz, ECU at its frame rate, GPS 1 Hz)
+# with that sample's "Capture Time" and its age under "Staleness". Dropouts freeze a source for a while (the ECU losing sync,
+# the GPS losing its fix), so its values hold and its staleness grows, as they do on the car.
+#
+# Outputs: a client-style CSV, a single .daq file, a segmented session directory (as the client
+# and black box write them) and a raw ECU capture that replay_server.py can replay. In the ECU
+# capture, dropouts are line noise in place of frames.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import recorder
+from hil_simulator import TRACK_CENTRE
+from replay_server import ECU_FRAME_RATE
+
+PUBLISH_RATE = 10  # Rows per second, as server.py publishes
+SOURCE_RATES = {"IMU Data": 20, "Serial Data": 2, "RS232 Data": ECU_FRAME_RATE, "GPS Data": 1}  # Hz
+CLOCK_ANCHOR_INTERVAL = 10  # seconds
+SEGMENT_SECONDS = 120.0  # SegmentedRecorder's default
+FLUSH_INTERVAL = 2.0  # ColumnarRecorder's default; sets the rows per chunk
+BOOT_MONOTONIC_NS = 120 * 10**9  # Monotonic clock at the first row: two minutes after boot
+
+# Track: a closed curve around TRACK_CENTRE, about 1.1 km a lap with a hairpin and fast sweepers
+TRACK_RADIUS_M = 140.0
+TRACK_HARMONICS = ((2, 0.35, 0.0), (3, 0.22, 1.1), (5, 0.12, 0.4), (7, 0.05, 2.0))  # (order, relative amplitude, phase)
+TRACK_POINTS = 2000
+
+# Vehicle
+G = 9.81
+LATERAL_LIMIT = 1.4 * G  # m/s^2
+ACCEL_LIMIT = 0.5 * G
+BRAKE_LIMIT = 1.2 * G
+TOP_SPEED = 30.0  # m/s
+LAP_TIME_SPREAD = 0.015  # Relative standard deviation of lap times
+WHEEL_CIRCUMFERENCE = 1.6  # m
+GEAR_RATIOS = (2.75, 2.0, 1.67, 1.44, 1.28, 1.17)
+FINAL_DRIVE = 8.72
+SHIFT_RPM = 11500
+IDLE_RPM = 3000
+
+# Dropouts per source: (per hour, mean length in seconds)
+DROPOUTS = {"IMU Data": (2, 1.0), "Serial Data": (4, 2.0), "RS232 Data": (6, 3.0), "GPS Data": (3, 20.0)}
+
+
+def racing_line():
+    """Reference lap: distance, x/y (m), curvature (1/m), speed (m/s) and lap time (s) at each point."""
+    theta = np.linspace(0, 2 * np.pi, TRACK_POINTS, endpoint=False)
+    radius = TRACK_RADIUS_M * (1 + sum(a * np.cos(k * theta + phase) for k, a, phase in TRACK_HARMONICS))
+    x, y = radius * np.cos(theta), radius * np.sin(theta)
+    # Derivatives over three laps so the ends of the middle one see their neighbours
+    x3, y3 = np.tile(x, 3), np.tile(y, 3)
+    dx, dy = np.gradient(x3), np.gradient(y3)
+    ddx, ddy = np.gradient(dx), np.gradient(dy)
+    curvature3 = np.abs(dx * ddy - dy * ddx) / np.maximum((dx ** 2 + dy ** 2) ** 1.5, 1e-9)
+    step3 = np.hypot(np.diff(x3, append=x3[0]), np.diff(y3, append=y3[0]))
+    distance3 = np.concatenate(([0.0], np.cumsum(step3[:-1])))
+
+    # Speed: the cornering limit, then the fastest profile reachable under the acceleration
+    # limit (forward) and the braking limit (backward); v^2 grows at most linearly with distance
+    limit2 = np.minimum(TOP_SPEED ** 2, LATERAL_LIMIT / np.maximum(curvature3, 1e-9))
+    forward = 2 * ACCEL_LIMIT * distance3 + np.minimum.accumulate(limit2 - 2 * ACCEL_LIMIT * distance3)
+    remaining = distance3[-1] - distance3
+    backward = (2 * BRAKE_LIMIT * remaining
+                + np.minimum.accumulate((limit2 - 2 * BRAKE_LIMIT * remaining)[::-1])[::-1])
+    speed3 = np.sqrt(np.minimum(forward, backward))
+
+    middle = slice(TRACK_POINTS, 2 * TRACK_POINTS)
+    distance = distance3[middle] - distance3[TRACK_POINTS]
+    step = step3[middle]
+    speed = speed3[middle]
+    lap_time = np.concatenate(([0.0], np.cumsum(step[:-1] / speed[:-1])))
+    return {"distance": distance, "x": x, "y": y, "curvature": curvature3[middle], "speed": speed,
+            "lap time": lap_time, "lap length": distance[-1] + step[-1], "lap duration": lap_time[-1] + step[-1] / speed[-1]}
+
+
+def dropout_mask(t, per_hour, mean_length, rng):
+    """True where a source is out; windows start as a Poisson process with exponential lengths."""
+    count = rng.poisson(per_hour * t[-1] / 3600) if len(t) else 0
+    starts = rng.uniform(0, t[-1], count)
+    ends = starts + rng.exponential(mean_length, count)
+    edges = np.zeros(len(t) + 1, dtype=np.int64)
+    np.add.at(edges, np.searchsorted(t, starts), 1)
+    np.add.at(edges, np.searchsorted(t, ends), -1)
+    return np.cumsum(edges[:-1]) > 0
+
+
+def sample_times(t, rate, out, rng):
+    """Capture time of each source's newest sample at every row: its own sample grid, frozen while out."""
+    phase = rng.uniform(0, 1 / rate)
+    capture = np.floor((t - phase) * rate) / rate + phase
+    capture = np.maximum(capture, 0.0)
+    return np.maximum.accumulate(np.where(out, -np.inf, capture)).clip(min=0.0)
+
+
+def moving_average(values, window):
+    window = max(1, int(window))
+    sums = np.cumsum(np.concatenate(([0.0], values)))
+    counts = np.minimum(np.arange(1, len(values) + 1), window)
+    return (sums[1:] - sums[np.maximum(np.arange(1, len(values) + 1) - window, 0)]) / counts
+
+
+def generate(duration, rate=PUBLISH_RATE, seed=0, dropouts=True, start_wall=None):
+    """Columns of a `duration`-second session at `rate` rows per second, as {flattened name: array}."""
+    rng = np.random.default_rng(seed)
+    start_wall = time.time() - duration if start_wall is None else start_wall
+    t = np.arange(int(duration * rate)) / rate
+
+    # Position on the reference lap, with every lap a little faster or slower than it
+    line = racing_line()
+    laps = int(duration / line["lap duration"] / (1 - 4 * LAP_TIME_SPREAD)) + 2
+    scales = 1 + LAP_TIME_SPREAD * rng.standard_normal(laps)
+    lap_starts = np.concatenate(([0.0], np.cumsum(line["lap duration"] * scales)))
+    lap = np.searchsorted(lap_starts, t, side="right") - 1
+    phase = (t - lap_starts[lap]) / scales[lap]
+    distance = np.interp(phase, line["lap time"], line["distance"])
+    speed = np.interp(distance, line["distance"], line["speed"]) / scales[lap]
+    curvature = np.interp(distance, line["distance"], line["curvature"])
+    x = np.interp(distance, line["distance"], line["x"], period=line["lap length"])
+    y = np.interp(distance, line["distance"], line["y"], period=line["lap length"])
+
+    # Drivetrain: the lowest gear that keeps the engine under the shift point
+    accel = np.gradient(speed, t) if len(t) > 1 else np.zeros_like(t)
+    wheel_rpm = speed / WHEEL_CIRCUMFERENCE * 60
+    gear_rpm = wheel_rpm[:, None] * np.array(GEAR_RATIOS) * FINAL_DRIVE
+    below_shift = gear_rpm <= SHIFT_RPM
+    gear = np.where(below_shift.any(axis=1), below_shift.argmax(axis=1), len(GEAR_RATIOS) - 1)
+    rpm = np.maximum(gear_rpm[np.arange(len(t)), gear], IDLE_RPM) + rng.normal(0, 40, len(t))
+    gear = gear + 1
+    kmh = speed * 3.6
+    throttle = np.clip(35 + 65 * accel / ACCEL_LIMIT, 0, 100)
+    load = moving_average(throttle / 100, 30 * rate)
+    engine_temp = 25 + 63 * (1 - np.exp(-t / 240)) + 6 * load + rng.normal(0, 0.15, len(t))
+    battery = 13.8 + 0.25 * np.clip((rpm - 6000) / 6000, -1, 1) - 0.1 * t / 3600 + rng.normal(0, 0.02, len(t))
+    lambda1 = 1.0 - 0.12 * throttle / 100 + rng.normal(0, 0.01, len(t))
+    lateral = speed ** 2 * curvature
+
+    # Each source as it was last sampled at every row
+    held = {}
+    for source, source_rate in SOURCE_RATES.items():
+        per_hour, mean_length = DROPOUTS[source]
+        out = dropout_mask(t, per_hour, mean_length, rng) if dropouts else np.zeros(len(t), dtype=bool)
+        held[source] = sample_times(t, source_rate, out, rng)
+
+    def at(source, values):
+        return np.interp(held[source], t, values)
+
+    imu_g = np.sqrt(at("IMU Data", lateral) ** 2 + at("IMU Data", accel) ** 2 + G ** 2) / G
+    ecu_kmh = at("RS232 Data", kmh)
+    lat = TRACK_CENTRE[0] + (y + rng.normal(0, 1.0, len(t))) / 111320
+    lon = TRACK_CENTRE[1] + (x + rng.normal(0, 1.0, len(t))) / (111320 * np.cos(np.radians(TRACK_CENTRE[0])))
+    anchor = np.floor(t / CLOCK_ANCHOR_INTERVAL) * CLOCK_ANCHOR_INTERVAL
+    local = np.datetime64(0, "s") + (start_wall + t + time.localtime(start_wall).tm_gmtoff).astype("timedelta64[s]")
+
+    columns = {
+        recorder.RECEIVE_TIME_COLUMN: start_wall + t + 0.03 + rng.exponential(0.01, len(t)),
+        "Timestamp": np.char.replace(np.datetime_as_string(local, unit="s"), "T", " "),
+        "Capture Time": BOOT_MONOTONIC_NS + (t * 1e9).astype(np.int64),
+        "IMU Data.Linear Acceleration": np.char.mod("%.2f Gs", imu_g),
+        "IMU Data.Gyro X": np.char.mod("%.2f", at("IMU Data", rng.normal(0, 0.02, len(t)))),
+        "IMU Data.Gyro Y": np.char.mod("%.2f", at("IMU Data", rng.normal(0, 0.02, len(t)))),
+        "IMU Data.Gyro Z": np.char.mod("%.2f", at("IMU Data", speed * curvature)),
+        "IMU Data.Temperature": np.char.mod("%.2f°C", at("IMU Data", 25 + 8 * (1 - np.exp(-t / 900)))),
+        "Serial Data.Wheel Speed": np.char.mod("%d", at("Serial Data", kmh * 10).astype(np.int64)),
+        "Serial Data.Neutral Flag": np.where(at("Serial Data", kmh) < 1, "1", "0"),
+        "Serial Data.Killswitch": np.full(len(t), "0"),
+        "RS232 Data.RPM": at("RS232 Data", rpm).round(),
+        "RS232 Data.Throttle Position": at("RS232 Data", throttle).round(1),
+        "RS232 Data.Engine Temperature": at("RS232 Data", engine_temp).round(1),
+        "RS232 Data.Battery Voltage": at("RS232 Data", battery).round(2),
+        "RS232 Data.Lambda 1": at("RS232 Data", lambda1).round(3),
+        "RS232 Data.Drive Speed": (ecu_kmh * (1 + 0.02 * at("RS232 Data", throttle) / 100)).round(1),
+        "RS232 Data.Ground Speed": ecu_kmh.round(1),
+        "RS232 Data.Gear": np.char.mod("%d", np.interp(held["RS232 Data"], t, gear).astype(np.int64)),
+        "GPS Data.Latitude": at("GPS Data", lat),
+        "GPS Data.Longitude": at("GPS Data", lon),
+        "GPS Data.UTC Time": start_wall + held["GPS Data"],
+    }
+    for source in SOURCE_RATES:
+        columns[source + ".Capture Time"] = BOOT_MONOTONIC_NS + (held[source] * 1e9).astype(np.int64)
+    for source in SOURCE_RATES:
+        age = ((t - held[source]) * 1000).round(1)
+        for name in [name for name in columns if name.startswith(source + ".")]:
+            columns["Staleness." + name] = age
+    columns["Clock Anchor.Monotonic"] = BOOT_MONOTONIC_NS + (anchor * 1e9).astype(np.int64)
+    columns["Clock Anchor.Wall Time"] = ((start_wall + anchor) * 1e9).astype(np.int64)
+    return columns
+
+
+def chunk_values(array, start, stop):
+    """Python values for rows [start, stop) of a column, NaN as None, as the recorder expects."""
+    values = array[start:stop].tolist()
+    if array.dtype.kind == "f" and np.isnan(array[start:stop]).any():
+        values = [None if v != v else v for v in values]
+    return values
+
+
+def write_recording(columns, path, segmented=True, chunk_rows=None):
+    """Write the columns as a segmented session directory, or a single .daq file, in chunks."""
+    times = columns[recorder.RECEIVE_TIME_COLUMN]
+    rows = len(times)
+    if chunk_rows is None:
+        chunk_rows = max(1, int(FLUSH_INTERVAL * PUBLISH_RATE))
+    if segmented:
+        os.makedirs(path, exist_ok=True)
+        segment_of = ((times - times[0]) // SEGMENT_SECONDS).astype(np.int64) if rows else times
+        index = {"session": os.path.basename(os.path.normpath(path)), "segments": []}
+    f = None
+    segment = -1
+    try:
+        for start in range(0, rows, chunk_rows):
+            stop = min(start + chunk_rows, rows)
+            if segmented and segment_of[start] != segment:
+                if f:
+                    f.close()
+                segment = segment_of[start]
+                name = recorder.SEGMENT_PATTERN.format(len(index["segments"]) + 1)
+                index["segments"].append({"file": name, "first_time": None, "last_time": None, "rows": 0, "channels": {}})
+                f = open(os.path.join(path, name), "wb")
+                f.write(recorder.MAGIC)
+            elif f is None:
+                f = open(path, "wb")
+                f.write(recorder.MAGIC)
+            chunk = {name: chunk_values(array, start, stop) for name, array in columns.items()}
+            recorder.write_chunk(f, chunk, stop - start)
+            if segmented:
+                recorder.merge_stats(index["segments"][-1], recorder.chunk_stats(chunk, stop - start))
+    finally:
+        if f:
+            f.close()
+    if segmented:
+        recorder.write_index(path, index)
+
+
+def write_csv(columns, path):
+    import pandas as pd
+    pd.DataFrame(columns).to_csv(path, index=False)
+
+
+def write_ecu_capture(columns, path, rng=None):
+    """Encode the ECU channels as the raw frame stream of the RS232 port, with noise in dropouts."""
+    rng = rng or np.random.default_rng(0)
+    times = columns[recorder.RECEIVE_TIME_COLUMN] - columns[recorder.RECEIVE_TIME_COLUMN][0]
+    frame_times = np.arange(0, times[-1], 1 / ECU_FRAME_RATE)
+    row = np.clip(np.searchsorted(times, frame_times), 0, len(times) - 1)
+    frames = np.zeros((len(frame_times), 144), dtype=np.uint8)
+
+    def put(offset, values):
+        words = np.clip(np.round(values), 0, 0xFFFF).astype(">u2")
+        frames[:, offset:offset + 2] = words.view(np.uint8).reshape(-1, 2)
+
+    def channel(name):
+        return np.asarray(columns["RS232 Data." + name], dtype=float)[row]
+
+    put(0, channel("RPM"))
+    put(2, channel("Throttle Position") * 10)
+    put(8, channel("Engine Temperature") * 10)
+    put(44, channel("Battery Voltage") * 100)
+    put(56, channel("Drive Speed") * 10)
+    put(58, channel("Ground Speed") * 10)
+    put(66, channel("Lambda 1") * 1000)
+    put(104, channel("Gear") * 10)
+    frames[:, 140:143] = np.frombuffer(b"\xfc\xfb\xfa", dtype=np.uint8)
+    frames[:, 143] = frames[:, :143].sum(axis=1) & 0xFF
+    # A frame is missing wherever the ECU source was stale by more than two frame periods
+    out = columns["Staleness.RS232 Data.RPM"][row] > 2000 / ECU_FRAME_RATE
+    frames[out] = rng.integers(0, 256, (int(out.sum()), 144), dtype=np.uint8)
+    with open(path, "wb") as f:
+        f.write(frames.tobytes())
+    return len(frame_times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic race session for benchmarks")
+    parser.add_argument("--hours", type=float, default=1.0)
+    parser.add_argument("--rate", type=float, default=PUBLISH_RATE, help="Rows per second")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-dropouts", action="store_true")
+    parser.add_argument("--session", help="Write a segmented session directory here")
+    parser.add_argument("--daq", help="Write a single .daq recording here")
+    parser.add_argument("--csv", help="Write a CSV recording here")
+    parser.add_argument("--ecu", help="Write a raw ECU capture here")
+    parser.add_argument("--chunk-rows", type=int, help="Rows per recording chunk (default: one recorder flush)")
+    args = parser.parse_args()
+    if not (args.session or args.daq or args.csv or args.ecu):
+        parser.error("give at least one of --session, --daq, --csv or --ecu")
+
+    started = time.perf_counter()
+    columns = generate(args.hours * 3600, args.rate, args.seed, not args.no_dropouts)
+    rows = len(columns["Capture Time"])
+    print(f"Generated {rows} rows x {len(columns)} columns in {time.perf_counter() - started:.1f} s")
+
+    outputs = [
+        (args.session, lambda path: write_recording(columns, path, True, args.chunk_rows)),
+        (args.daq, lambda path: write_recording(columns, path, False, args.chunk_rows)),
+        (args.csv, lambda path: write_csv(columns, path)),
+        (args.ecu, lambda path: write_ecu_capture(columns, path, np.random.default_rng(args.seed))),
+    ]
+    for path, write in outputs:
+        if path:
+            started = time.perf_counter()
+            write(path)
+            print(f"Wrote {path} in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
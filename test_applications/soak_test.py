@@ -0,0 +1,217 @@
+import argparse
+import csv
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+# Long-duration soak test: runs server.py's acquisition, black box and networking in this
+# process at accelerated rates, with clients connected (and optionally reconnecting), and
+# samples memory, threads and file descriptors as it goes:
+#
+#   python test_applications/soak_test.py --minutes 60 --speed 10 --clients 3 --churn 30
+#   python test_applications/soak_test.py --minutes 240 --hil --csv soak.csv
+#
+# tracemalloc follows Python allocations and RSS the whole process. After --warmup (buffers,
+# caches and the log ring filling up) the first sample is the baseline; the run fails if traced
+# memory or RSS grow beyond their budgets, or threads or descriptors keep accumulating, and a
+# failure prints the allocation sites that grew most. The slope over the run is reported in MB
+# per hour, which is what matters for a long test day.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+TRACE_FRAMES = 10  # Stack depth kept per allocation, for the growth report
+TOP_GROWTH = 15
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def open_fds():
+    return len(os.listdir("/proc/self/fd"))
+
+
+def sample(server, started):
+    traced, _ = tracemalloc.get_traced_memory()
+    return {
+        "seconds": round(time.monotonic() - started, 1),
+        "traced_mb": traced / 2**20,
+        "rss_mb": rss_mb(),
+        "threads": threading.active_count(),
+        "fds": open_fds(),
+        "ui_queue": server.sensor_data.qsize(),
+        "blackbox_pending": server.blackbox.pending() if server.blackbox else 0,
+    }
+
+
+def slope_per_hour(samples, key):
+    """Least-squares growth of `key` per hour over the samples."""
+    if len(samples) < 2:
+        return 0.0
+    xs = [s["seconds"] for s in samples]
+    ys = [s[key] for s in samples]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    var = sum((x - mean_x) ** 2 for x in xs)
+    if not var:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var * 3600
+
+
+def client_loop(port, stop_event, churn, counts, index):
+    """Read snapshots like a pitwall client; reconnect every `churn` seconds if set."""
+    while not stop_event.is_set():
+        try:
+            conn = socket.create_connection(("127.0.0.1", port), timeout=5)
+        except OSError:
+            stop_event.wait(1)
+            continue
+        reconnect_at = time.monotonic() + churn if churn else None
+        try:
+            stream = conn.makefile("rb")
+            while not stop_event.is_set() and (reconnect_at is None or time.monotonic() < reconnect_at):
+                if not stream.readline():
+                    break
+                counts[index] += 1
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+
+def start_server(args, workdir):
+    """Configure server.py for the soak and start its threads in this process."""
+    os.environ.pop("DISPLAY", None)
+    os.environ["DAQ_FRAMEBUFFER"] = os.path.join(workdir, "no-framebuffer")
+    simulator = None
+    if args.hil:
+        from hil_simulator import Simulator
+        simulator = Simulator(noise=0.01, corrupt=0.01, gps_fix_after=1.0).start()
+        os.environ.update(simulator.env())  # Read by sensor_reading when the drivers are loaded
+    import daq_logging
+    import server
+    daq_logging.LOG_DIR = os.path.join(workdir, "logs")
+    daq_logging.setup(level="WARNING")
+    server.TEST_MODE = not args.hil
+    server.TUNNEL = False
+    server.PORT = args.port
+    server.METRICS_PORT = None
+    server.BLACKBOX_ROOT = os.path.join(workdir, "blackbox")
+    server.SOURCE_RATES = {source: rate * args.speed for source, rate in server.SOURCE_RATES.items()}
+    server.PUBLISH_RATE *= args.speed
+    server.RESAMPLE_RATE *= args.speed
+    server.CLIENT_SEND_RATE = server.PUBLISH_RATE
+    server.start_acquisition()
+    threading.Thread(target=server.networking_thread, name="networking", daemon=True).start()
+    return server, simulator
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak-test server.py and watch for memory growth")
+    parser.add_argument("--minutes", type=float, default=30)
+    parser.add_argument("--speed", type=float, default=10, help="Multiplier on the source and publish rates")
+    parser.add_argument("--hil", action="store_true", help="Read the HIL simulator's ports instead of TEST_MODE mocks")
+    parser.add_argument("--clients", type=int, default=2)
+    parser.add_argument("--churn", type=float, default=0, help="Seconds between client reconnects (0: stay connected)")
+    parser.add_argument("--port", type=int, default=5077)
+    parser.add_argument("--interval", type=float, default=10, help="Seconds between samples")
+    parser.add_argument("--warmup", type=float, default=60, help="Seconds before the baseline sample")
+    parser.add_argument("--budget-mb", type=float, default=5, help="Allowed growth in traced Python memory")
+    parser.add_argument("--rss-budget-mb", type=float, default=20, help="Allowed growth in resident memory")
+    parser.add_argument("--max-thread-growth", type=int, default=2)
+    parser.add_argument("--max-fd-growth", type=int, default=4)
+    parser.add_argument("--csv", help="Write every sample to this CSV file")
+    args = parser.parse_args()
+
+    tracemalloc.start(TRACE_FRAMES)
+    workdir = tempfile.mkdtemp(prefix="daq_soak_")
+    server, simulator = start_server(args, workdir)
+    started = time.monotonic()
+    stop_clients = threading.Event()
+    counts = [0] * args.clients
+    for i in range(args.clients):
+        threading.Thread(target=client_loop, args=(args.port, stop_clients, args.churn, counts, i),
+                         name=f"soak-client-{i}", daemon=True).start()
+
+    samples = []
+    baseline = baseline_snapshot = None
+    end = started + args.minutes * 60
+    try:
+        while time.monotonic() < end:
+            time.sleep(min(args.interval, max(0.0, end - time.monotonic())))
+            current = sample(server, started)
+            samples.append(current)
+            if baseline is None and current["seconds"] >= args.warmup:
+                baseline_snapshot = tracemalloc.take_snapshot()
+                # Taking the snapshot raises RSS by tens of MB that the allocator keeps, so sample after it
+                baseline = current = sample(server, started)
+                samples[-1] = current
+                print(f"Baseline after warm-up: {current}", flush=True)
+            else:
+                print(current, flush=True)
+    except KeyboardInterrupt:
+        print("Interrupted; reporting what was collected")
+
+    final_snapshot = tracemalloc.take_snapshot()
+    stop_clients.set()
+    server.stop_event.set()
+    if server.blackbox:
+        server.blackbox.stop()
+    if simulator:
+        simulator.stop()
+
+    if args.csv and samples:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(samples[0]))
+            writer.writeheader()
+            writer.writerows(samples)
+
+    if baseline is None:
+        shutil.rmtree(workdir, ignore_errors=True)
+        sys.exit("The run ended before the warm-up did; nothing to compare")
+    last = samples[-1]
+    steady = [s for s in samples if s["seconds"] >= baseline["seconds"]]
+    growth = {key: last[key] - baseline[key] for key in ("traced_mb", "rss_mb", "threads", "fds")}
+    print(f"\nSoak of {last['seconds'] / 60:.1f} min at {args.speed:g}x, {sum(counts)} snapshots to {args.clients} clients")
+    print(f"  traced memory {baseline['traced_mb']:.2f} -> {last['traced_mb']:.2f} MB "
+          f"({slope_per_hour(steady, 'traced_mb'):+.2f} MB/h)")
+    print(f"  RSS           {baseline['rss_mb']:.1f} -> {last['rss_mb']:.1f} MB "
+          f"({slope_per_hour(steady, 'rss_mb'):+.1f} MB/h)")
+    print(f"  threads       {baseline['threads']} -> {last['threads']}")
+    print(f"  open fds      {baseline['fds']} -> {last['fds']}")
+    print(f"  UI queue      {last['ui_queue']}, black-box backlog {last['blackbox_pending']}")
+
+    failures = []
+    if growth["traced_mb"] > args.budget_mb:
+        failures.append(f"traced memory grew {growth['traced_mb']:.2f} MB (budget {args.budget_mb} MB)")
+    if growth["rss_mb"] > args.rss_budget_mb:
+        failures.append(f"RSS grew {growth['rss_mb']:.1f} MB (budget {args.rss_budget_mb} MB)")
+    if growth["threads"] > args.max_thread_growth:
+        failures.append(f"{growth['threads']} more threads than at the baseline")
+    if growth["fds"] > args.max_fd_growth:
+        failures.append(f"{growth['fds']} more open file descriptors than at the baseline")
+
+    if failures:
+        print("\nFAILED: " + "; ".join(failures))
+        print(f"\nTop {TOP_GROWTH} allocation sites by growth since the baseline:")
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap>")]
+        stats = final_snapshot.filter_traces(ignore).compare_to(baseline_snapshot.filter_traces(ignore), "traceback")
+        for stat in stats[:TOP_GROWTH]:
+            print(f"  {stat.size_diff / 1024:+9.1f} KiB  {stat.count_diff:+7d} blocks")
+            for line in stat.traceback.format(limit=4, most_recent_first=True):
+                print(f"      {line}")
+        print(f"\nServer logs and black box kept in {workdir}")
+        sys.exit(1)
+    print("\nPASSED")
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
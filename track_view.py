@@ -0,0 +1,110 @@
+import math
+import threading
+import numpy as np
+import pyqtgraph as pg
+from PyQt5.QtCore import QTimer
+
+EARTH_RADIUS_M = 6371000.0
+
+
+class PositionBuffer:
+    """Thread-safe GPS trail, stored as local east/north metres around the first fix.
+
+    The receive thread pushes fixes; the track view reads whatever arrived
+    since its last refresh. Repeated fixes (the GPS updates far slower than
+    telemetry arrives) are skipped so the trail only grows when the car moves.
+    """
+
+    def __init__(self, initial_capacity=4096):
+        self._x = np.empty(initial_capacity, dtype=np.float64)
+        self._y = np.empty(initial_capacity, dtype=np.float64)
+        self._length = 0
+        self._origin = None
+        self._last_fix = None
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self._length
+
+    def push(self, latitude, longitude):
+        """Append a fix; returns False if it was skipped as invalid or unchanged."""
+        if math.isnan(latitude) or math.isnan(longitude):
+            return False
+        with self.lock:
+            if (latitude, longitude) == self._last_fix:
+                return False
+            self._last_fix = (latitude, longitude)
+            if self._origin is None:
+                self._origin = (latitude, longitude, math.cos(math.radians(latitude)))
+            lat0, lon0, cos_lat0 = self._origin
+            if self._length == len(self._x):
+                self._x = np.resize(self._x, self._length * 2)
+                self._y = np.resize(self._y, self._length * 2)
+            self._x[self._length] = math.radians(longitude - lon0) * cos_lat0 * EARTH_RADIUS_M
+            self._y[self._length] = math.radians(latitude - lat0) * EARTH_RADIUS_M
+            self._length += 1
+            return True
+
+    def since(self, index):
+        """Return copies of the points from `index` onwards."""
+        with self.lock:
+            return self._x[index:self._length].copy(), self._y[index:self._length].copy()
+
+
+class TrackMapWidget(pg.PlotWidget):
+    """Native track view: the GPS trail as a growing polyline plus the car marker.
+
+    The trail is split into fixed-size segments. Full segments are left
+    untouched as static curve items, and only the newest one is rebuilt when
+    points arrive, so a refresh costs the same however long the session is.
+    Refreshes are driven by a display-rate timer and skipped when no new fix
+    has arrived, so nothing is drawn per received message.
+    """
+
+    segment_points = 512
+
+    def __init__(self, positions, refresh_hz=30, parent=None):
+        super().__init__(parent=parent)
+        self.positions = positions
+        self.setBackground("w")
+        self.setAspectLocked(True)
+        self.showGrid(x=True, y=True, alpha=0.3)
+        self.setLabel("left", "North (m)")
+        self.setLabel("bottom", "East (m)")
+
+        self._trail_pen = pg.mkPen(color="r", width=2)
+        self._segments = []
+        self._active_x = np.empty(0)
+        self._active_y = np.empty(0)
+        self._active_curve = None
+        self._drawn = 0  # points of the buffer already on screen
+
+        self.marker = pg.ScatterPlotItem(size=12, brush=pg.mkBrush(0, 160, 0), pen=pg.mkPen("k"))
+        self.marker.setZValue(10)
+        self.addItem(self.marker)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(int(1000 / refresh_hz))
+
+    def refresh(self):
+        if len(self.positions) == self._drawn:
+            return
+        x, y = self.positions.since(self._drawn)
+        self._drawn += len(x)
+        while len(x):
+            if self._active_curve is None:
+                self._active_curve = pg.PlotCurveItem(pen=self._trail_pen)
+                self.addItem(self._active_curve)
+            room = self.segment_points - len(self._active_x)
+            self._active_x = np.concatenate((self._active_x, x[:room]))
+            self._active_y = np.concatenate((self._active_y, y[:room]))
+            x, y = x[room:], y[room:]
+            self._active_curve.setData(self._active_x, self._active_y)
+            if len(self._active_x) >= self.segment_points:
+                # Freeze the full segment; the next one starts at its last point so the line stays joined
+                self._segments.append(self._active_curve)
+                self._active_curve = None
+                self._active_x = self._active_x[-1:]
+                self._active_y = self._active_y[-1:]
+        self.marker.setData([self._active_x[-1]], [self._active_y[-1]])